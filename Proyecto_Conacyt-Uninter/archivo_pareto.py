@@ -0,0 +1,198 @@
+# ================================================================
+# archivo_pareto.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Archivo persistente del mejor frente de Pareto conocido, uno por
+#     versión de los datos del problema (hash de estudiantes, docentes
+#     y clases). Cada ejecución inserta sus soluciones factibles con una
+#     actualización incremental de no dominancia (solo se comparan las
+#     nuevas contra el archivo) y el tamaño se acota descartando las de
+#     menor distancia de crowding. Lectura, unión y escritura se hacen
+#     con un bloqueo exclusivo (archivo .lock) entre procesos.
+# Dependencias:
+#     numpy, pymoo, logging
+# ================================================================
+
+import os
+import hashlib
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from pymoo.operators.survival.rank_and_crowding.metrics import calc_crowding_distance
+from pymoo.util.nds.non_dominated_sorting import find_non_dominated
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Directorio de los archivos de frentes (configurable por variable de entorno)
+ARCHIVO_DIR = Path(os.getenv("ARCHIVO_PARETO_DIR", Path(__file__).parent / "frentes"))
+
+# Tamaño máximo por defecto de un archivo
+MAX_SOLUCIONES = 500
+
+
+def clave_problema(problem) -> str:
+    """
+    Versión de los datos de un IntegratedProblem: hash de las coordenadas,
+    grados, turnos, capacidades y establecimientos que definen F y G.
+
+    Returns:
+        str: Hash hexadecimal (16 caracteres).
+    """
+    h = hashlib.sha1(b"frente-v1")
+    for arr in (problem.estudiantes[["lat", "lng"]].to_numpy(dtype=np.float64),
+                problem.docentes[["lat", "lng"]].to_numpy(dtype=np.float64),
+                problem.clases[["lat", "lng"]].to_numpy(dtype=np.float64),
+                problem._est_grado, problem._cls_grado, problem._cls_turno,
+                problem._cls_cap, problem._cls_estab):
+        arr = np.ascontiguousarray(arr)
+        h.update(str((arr.shape, arr.dtype.str)).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()[:16]
+
+
+def ruta_archivo(problem, nombre: str = "integrado") -> Path:
+    """Archivo .npz del frente para la versión de datos del problema."""
+    return ARCHIVO_DIR / f"{nombre}_{clave_problema(problem)}.npz"
+
+
+def _podar_por_crowding(F: np.ndarray, max_tamano: int) -> np.ndarray:
+    """
+    Índices a conservar: se quita de a una la solución de menor distancia de
+    crowding (recalculada tras cada baja) hasta quedar en max_tamano.
+    """
+    quedan = np.arange(len(F))
+    while len(quedan) > max_tamano:
+        cd = calc_crowding_distance(F[quedan])
+        quedan = np.delete(quedan, np.argmin(cd))
+    return quedan
+
+
+@contextmanager
+def _bloqueo(ruta: Path):
+    """
+    Bloqueo exclusivo entre procesos sobre "<ruta>.lock" (flock en Linux/macOS,
+    msvcrt.locking en Windows); espera a que lo libere quien lo tenga.
+    """
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta.with_name(ruta.name + ".lock"), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:   # LK_LOCK se rinde tras 10 intentos
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ArchivoPareto:
+    """
+    Frente no dominado persistente (X, F) en un .npz.
+
+    Args:
+        ruta (str | Path): Archivo del frente (ver ruta_archivo).
+        max_tamano (int): Máximo de soluciones que se conservan.
+    """
+    def __init__(self, ruta: Union[str, Path], max_tamano: int = MAX_SOLUCIONES):
+        self.ruta = Path(ruta)
+        self.max_tamano = int(max_tamano)
+        self.X = None
+        self.F = None
+        self.cargar()
+
+    def cargar(self):
+        """Lee el frente guardado (si existe)."""
+        if self.ruta.exists():
+            try:
+                with np.load(self.ruta) as datos:
+                    self.X, self.F = datos["X"], datos["F"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ Archivo de frente ilegible ({self.ruta.name}): {e}")
+
+    def __len__(self) -> int:
+        return 0 if self.F is None else len(self.F)
+
+    def insertar(self, X: np.ndarray, F: np.ndarray, G: Optional[np.ndarray] = None) -> int:
+        """
+        Agrega las soluciones factibles que no están dominadas por el archivo,
+        quita las del archivo que pasan a estar dominadas, poda por crowding
+        si se supera max_tamano y guarda. Todo el paso (releer el archivo,
+        combinar y escribir) se hace con el bloqueo exclusivo, así dos
+        ejecuciones que terminan a la vez no pierden las soluciones de la otra.
+
+        Args:
+            X (np.ndarray): Soluciones (n, n_var).
+            F (np.ndarray): Objetivos (n, n_obj), todos a minimizar.
+            G (np.ndarray, opcional): Restricciones (n, n_constr); solo entran
+                las soluciones con G <= 0.
+
+        Returns:
+            int: Soluciones nuevas que quedaron en el archivo.
+        """
+        X = np.atleast_2d(np.asarray(X)).astype(np.int32)
+        F = np.atleast_2d(np.asarray(F, dtype=float))
+        if G is not None:
+            factible = (np.atleast_2d(np.asarray(G, dtype=float)) <= 0).all(axis=1)
+            X, F = X[factible], F[factible]
+        if len(F) == 0:
+            return 0
+        with _bloqueo(self.ruta):
+            self.cargar()
+            return self._combinar(X, F)
+
+    def _combinar(self, X: np.ndarray, F: np.ndarray) -> int:
+        """Unión con el archivo ya leído (ver insertar); guarda y devuelve las nuevas."""
+        # Un punto por vector de objetivos, no dominados entre sí
+        _, unicos = np.unique(F, axis=0, return_index=True)
+        X, F = X[unicos], F[unicos]
+        nd = find_non_dominated(F)
+        X, F = X[nd], F[nd]
+
+        if len(self):
+            repetido = (F[:, None, :] == self.F[None]).all(axis=2).any(axis=1)
+            X, F = X[~repetido], F[~repetido]
+            nuevas = find_non_dominated(F, self.F) if len(F) else np.empty(0, dtype=int)
+            X, F = X[nuevas], F[nuevas]
+            if len(F) == 0:
+                return 0
+            siguen = find_non_dominated(self.F, F)
+            X = np.concatenate([self.X[siguen], X])
+            F = np.concatenate([self.F[siguen], F])
+            n_previas = len(siguen)
+        else:
+            n_previas = 0
+
+        quedan = _podar_por_crowding(F, self.max_tamano)
+        self.X, self.F = X[quedan], F[quedan]
+        self.guardar()
+        return int((quedan >= n_previas).sum())
+
+    def guardar(self):
+        """Escribe el archivo (temporal + rename, nunca queda a medias)."""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.ruta.with_suffix(f".{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp, X=self.X, F=self.F)
+        os.replace(tmp, self.ruta)
@@ -3,7 +3,7 @@
 -- Proyecto Conacyt-Uninter
 -- Tutor investigador: Dr. Fabio Lopez
 -- Investigador en formación: Ing. Eliana Telesca
--- Versión: 1.0
+-- Versión: 1.1
 -- ================================================================
 
 -- 1. Crear Base de Datos (ejecutar con privilegios)
@@ -90,7 +90,22 @@ CREATE TABLE asignacion_mec (
 );
 
 -- ================================================================
--- 3. INSERTS DE EJEMPLO (Datos mínimos para probar el proyecto)
+-- 3. ÍNDICES (filtros y paginación del visor)
+-- ================================================================
+
+-- Claves foráneas usadas en los JOIN de asignacion_mec
+CREATE INDEX idx_asignacion_estudiante ON asignacion_mec (estudiante_id);
+CREATE INDEX idx_asignacion_docente ON asignacion_mec (docente_id);
+CREATE INDEX idx_asignacion_establecimiento ON asignacion_mec (establecimiento_id);
+CREATE INDEX idx_asignacion_turno ON asignacion_mec (turno, id DESC);
+CREATE INDEX idx_establecimientos_institucion ON establecimientos (institucion_id);
+
+-- Filtros por destino (departamento / localidad / institución)
+CREATE INDEX idx_instituciones_ubicacion ON instituciones (departamento, localidad);
+CREATE INDEX idx_instituciones_nombre ON instituciones (nombre);
+
+-- ================================================================
+-- 4. INSERTS DE EJEMPLO (Datos mínimos para probar el proyecto)
 -- ================================================================
 
 -- INSTITUCIONES
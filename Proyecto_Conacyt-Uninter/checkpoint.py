@@ -0,0 +1,205 @@
+# ================================================================
+# checkpoint.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Puntos de control de NSGA-II: cada k generaciones se guarda la
+#     población (X, F, G), el estado de los generadores aleatorios, el
+#     contador de generaciones y el registro de métricas en un .npz
+#     comprimido, para reanudar una ejecución interrumpida.
+# Dependencias:
+#     numpy, pymoo
+# ================================================================
+
+import os
+import random
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+from pymoo.core.callback import Callback
+from pymoo.core.population import Population
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# ================================
+# GUARDAR / CARGAR
+# ================================
+def codificacion_problema(problem) -> str:
+    """
+    Etiqueta de la codificación del cromosoma: "completa" (IntegratedProblem)
+    o la de ProblemaCandidatos (hash de sus listas). Un checkpoint solo se
+    reanuda con la misma codificación.
+    """
+    return str(getattr(problem, "codificacion", "completa"))
+
+
+def guardar_checkpoint(ruta: Union[str, Path], algorithm, seed: Optional[int] = None,
+                       metricas=None):
+    """
+    Guarda el estado de la población actual del algoritmo.
+
+    El archivo se escribe en un temporal y se reemplaza de forma atómica,
+    así una caída durante la escritura no pierde el punto anterior.
+
+    Args:
+        ruta (str | Path): Archivo .npz de destino.
+        algorithm: Algoritmo de pymoo ya inicializado.
+        seed (int, opcional): Semilla original de la ejecución.
+        metricas (MetricasConvergencia, opcional): Registro de convergencia;
+                  se guardan su punto de referencia y sus filas.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    X, F, G = algorithm.pop.get("X", "F", "G")
+
+    _, claves, pos, has_gauss, gauss = np.random.get_state()
+    version, estado_py, gauss_py = random.getstate()
+    punto_ref = getattr(metricas, "punto_ref", None)
+
+    tmp = ruta.with_name(f"{ruta.stem}.{os.getpid()}.tmp.npz")
+    np.savez_compressed(
+        tmp,
+        X=np.asarray(X).astype(np.int32),
+        F=np.asarray(F, dtype=np.float64),
+        G=np.asarray(G, dtype=np.float64),
+        n_gen=np.int64(algorithm.n_gen),
+        n_eval=np.int64(algorithm.evaluator.n_eval),
+        seed=np.int64(-1 if seed is None else seed),
+        codificacion=np.str_(codificacion_problema(algorithm.problem)),
+        np_claves=claves,
+        np_pos=np.int64(pos),
+        np_gauss=np.array([has_gauss, gauss], dtype=np.float64),
+        py_version=np.int64(version),
+        py_estado=np.array(estado_py, dtype=np.uint64),
+        py_gauss=np.float64(np.nan if gauss_py is None else gauss_py),
+        metricas_punto_ref=np.empty(0) if punto_ref is None else np.asarray(punto_ref, dtype=np.float64),
+        metricas=np.empty((0, 0)) if metricas is None else metricas.arreglo,
+    )
+    os.replace(tmp, ruta)
+
+
+def cargar_checkpoint(ruta: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Lee un punto de control.
+
+    Returns:
+        dict | None: Arreglos guardados (X, F, G, n_gen, codificacion, ...) o
+                     None si no existe. Los checkpoints anteriores a la etiqueta
+                     de codificación se leen como "completa".
+    """
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return None
+    with np.load(ruta) as datos:
+        estado = {k: datos[k] for k in datos.files}
+    estado["codificacion"] = str(estado.get("codificacion", "completa"))
+    return estado
+
+
+def restaurar_aleatorios(estado: Dict[str, Any]):
+    """Devuelve numpy.random y random al estado guardado."""
+    has_gauss, gauss = estado["np_gauss"]
+    np.random.set_state(("MT19937", estado["np_claves"], int(estado["np_pos"]),
+                         int(has_gauss), float(gauss)))
+    gauss_py = float(estado["py_gauss"])
+    random.setstate((int(estado["py_version"]),
+                     tuple(int(v) for v in estado["py_estado"]),
+                     None if np.isnan(gauss_py) else gauss_py))
+
+
+def poblacion_checkpoint(estado: Dict[str, Any]) -> Population:
+    """
+    Población ya evaluada a partir del punto de control (se usa como
+    sampling del algoritmo al reanudar; no se vuelve a evaluar).
+    """
+    pop = Population.new("X", estado["X"], "F", estado["F"], "G", estado["G"])
+    for ind in pop:
+        ind.evaluated.update(["F", "G", "H"])
+    return pop
+
+
+# ================================
+# CALLBACKS
+# ================================
+class CadenaCallbacks(Callback):
+    """Llama en orden a varios callbacks (cada uno con su propio notify)."""
+    def __init__(self, *callbacks):
+        super().__init__()
+        self.callbacks = [c for c in callbacks if c is not None]
+
+    def notify(self, algorithm):
+        for c in self.callbacks:
+            c(algorithm)
+
+
+class Checkpointer(Callback):
+    """
+    Guarda un punto de control cada `cada` generaciones y en la última.
+    Con `metricas` (MetricasConvergencia) guarda también su registro; debe
+    ir antes que este callback en la cadena para incluir la generación actual.
+    """
+    def __init__(self, ruta: Union[str, Path], cada: int = 10, seed: Optional[int] = None,
+                 metricas=None):
+        super().__init__()
+        self.ruta = Path(ruta)
+        self.cada = max(1, int(cada))
+        self.seed = seed
+        self.metricas = metricas
+
+    def notify(self, algorithm):
+        if algorithm.n_gen % self.cada == 0 or algorithm.termination.has_terminated():
+            guardar_checkpoint(self.ruta, algorithm, self.seed, self.metricas)
+            logger.info(f"💾 Checkpoint generación {algorithm.n_gen}: {self.ruta.name}")
+
+
+# ================================
+# EJECUCIÓN CON REANUDACIÓN
+# ================================
+def ejecutar_nsga2(problem, algorithm, n_gen: int, seed: int = 42,
+                   estado: Optional[Dict[str, Any]] = None,
+                   callback: Optional[Callback] = None,
+                   save_history: bool = False, verbose: bool = True,
+                   metricas=None):
+    """
+    Equivalente a minimize(problem, algorithm, ('n_gen', n_gen), ...) que
+    además puede continuar desde un punto de control.
+
+    Con `estado`, el algoritmo debe haberse creado con
+    sampling=poblacion_checkpoint(estado). El primer paso solo ordena esa
+    población (sin evaluarla); después se restauran el contador de
+    generaciones, las evaluaciones y los generadores aleatorios, y se
+    siguen las generaciones que faltan. Si se da `metricas`
+    (MetricasConvergencia), continúa el registro y el punto de referencia
+    del hipervolumen guardados en el checkpoint.
+
+    Returns:
+        pymoo.optimize.Result: Resultado, con .algorithm como en minimize.
+    """
+    algorithm.setup(problem, termination=("n_gen", n_gen), seed=seed,
+                    verbose=verbose, save_history=save_history)
+
+    if estado is not None:
+        algorithm.next()
+        algorithm.n_iter = int(estado["n_gen"]) + 1
+        algorithm.evaluator.n_eval = int(estado["n_eval"])
+        algorithm.termination.update(algorithm)
+        restaurar_aleatorios(estado)
+        if metricas is not None:
+            metricas.restaurar(estado.get("metricas_punto_ref"), estado.get("metricas"))
+        logger.info(f"↩️ Reanudando desde la generación {int(estado['n_gen'])} de {n_gen}")
+
+    if callback is not None:
+        algorithm.callback = callback
+
+    while algorithm.has_next():
+        algorithm.next()
+
+    result = algorithm.result()
+    result.algorithm = algorithm
+    return result
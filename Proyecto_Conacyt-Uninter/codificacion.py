@@ -0,0 +1,280 @@
+# ================================================================
+# codificacion.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Codificación reducida por listas de candidatos del problema
+#     integrado. Cada estudiante elige entre sus k clases compatibles
+#     (mismo grado) más cercanas y cada clase entre sus k docentes más
+#     cercanos o "sin docente". Las listas se calculan una vez con un
+#     KD-tree sobre coordenadas en la esfera unitaria y se guardan como
+#     arreglos de índices int32; la evaluación y el guardado decodifican
+#     al cromosoma completo [XA | XD_class] de IntegratedProblem.
+#  - ProblemaCandidatos: problema de pymoo sobre la codificación reducida
+#  - Muestreo y mutación con reparación dentro de las listas
+# Dependencias:
+#     numpy, scipy, pymoo, logging
+# ================================================================
+
+import hashlib
+import logging
+import time
+
+import numpy as np
+from pymoo.core.mutation import Mutation
+from pymoo.core.problem import Problem
+from pymoo.core.sampling import Sampling
+from scipy.spatial import cKDTree
+
+from operadores import MuestreoAsignacion
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Tamaño por defecto de las listas de candidatos
+K_CLASES = 20
+K_DOCENTES = 40
+
+
+def _esfera(coords: np.ndarray) -> np.ndarray:
+    """
+    Lat/lng (grados) a puntos de la esfera unitaria: la distancia euclídea
+    (cuerda) crece con la haversine, así el orden de vecinos es el mismo.
+    """
+    lat, lng = np.radians(coords[:, 0]), np.radians(coords[:, 1])
+    return np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def _vecinos(origen: np.ndarray, destino: np.ndarray, k: int) -> np.ndarray:
+    """Índices (n_origen, k) de los k puntos de destino más cercanos a cada origen."""
+    _, idx = cKDTree(destino).query(origen, k=k)
+    return np.asarray(idx, dtype=np.int32).reshape(len(origen), k)
+
+
+def candidatos_clases(problem, k: int = K_CLASES):
+    """
+    Las k clases compatibles (mismo grado o sin grado) más cercanas a cada
+    estudiante, de la más cercana a la más lejana. Si un grado tiene menos
+    de k clases la lista se completa repitiendo la primera.
+
+    Args:
+        problem (IntegratedProblem): Problema completo.
+        k (int): Candidatos por estudiante.
+
+    Returns:
+        tuple: (candidatos (n_estudiantes, k) int32, n_validos (n_estudiantes,)).
+    """
+    est_xyz = _esfera(problem.estudiantes[["lat", "lng"]].to_numpy(dtype=float))
+    cls_xyz = _esfera(problem.clases[["lat", "lng"]].to_numpy(dtype=float))
+    candidatos = np.empty((problem.n_estudiantes, k), dtype=np.int32)
+    n_validos = np.empty(problem.n_estudiantes, dtype=np.int32)
+    for g in np.unique(problem._est_grado):
+        est = np.flatnonzero(problem._est_grado == g)
+        cls = np.flatnonzero((problem._cls_grado == g) | (problem._cls_grado < 0) | (g < 0))
+        if not len(cls):
+            cls = np.arange(problem.n_clases)
+        kk = min(k, len(cls))
+        candidatos[est, :kk] = cls[_vecinos(est_xyz[est], cls_xyz[cls], kk)]
+        candidatos[est, kk:] = candidatos[est, :1]
+        n_validos[est] = kk
+    return candidatos, n_validos
+
+
+def candidatos_docentes(problem, k: int = K_DOCENTES) -> np.ndarray:
+    """
+    Los k docentes más cercanos a cada clase más la opción "sin docente"
+    (n_docentes) en la última columna.
+
+    Returns:
+        np.ndarray: Índices (n_clases, k+1) int32, con k <= n_docentes.
+    """
+    k = min(k, problem.n_docentes)
+    cercanos = _vecinos(_esfera(problem.clases[["lat", "lng"]].to_numpy(dtype=float)),
+                        _esfera(problem.docentes[["lat", "lng"]].to_numpy(dtype=float)), k)
+    return np.column_stack([cercanos, np.full(problem.n_clases, problem.n_docentes, dtype=np.int32)])
+
+
+class ProblemaCandidatos(Problem):
+    """
+    IntegratedProblem con codificación por listas de candidatos.
+
+    Decisión (misma longitud y posiciones que el problema completo):
+      - estudiante s: posición en cand_clase[s] (0 = clase compatible más cercana)
+      - clase l: posición en cand_docente[l] (la última = "sin docente")
+    Objetivos y restricciones: los del problema base sobre la solución
+    decodificada (decodificar), por lo que F y G son comparables.
+
+    Args:
+        base (IntegratedProblem): Problema completo.
+        k_clases (int): Clases candidatas por estudiante.
+        k_docentes (int): Docentes candidatos por clase.
+    """
+
+    def __init__(self, base, k_clases: int = K_CLASES, k_docentes: int = K_DOCENTES):
+        inicio = time.perf_counter()
+        self.base = base
+        self.estudiantes, self.docentes, self.clases = base.estudiantes, base.docentes, base.clases
+        self.n_estudiantes, self.n_docentes, self.n_clases = base.n_estudiantes, base.n_docentes, base.n_clases
+        self.evaluador = None
+        self.tiempo_evaluacion = 0.0
+
+        self.cand_clase, self.n_cand_clase = candidatos_clases(base, k_clases)
+        self.cand_docente = candidatos_docentes(base, k_docentes)
+        self.sin_docente = self.cand_docente.shape[1] - 1   # posición de "sin docente"
+        # Etiqueta de la codificación (checkpoint.codificacion_problema)
+        h = hashlib.sha1(self.cand_clase.tobytes())
+        h.update(self.cand_docente.tobytes())
+        self.codificacion = f"candidatos-{h.hexdigest()[:12]}"
+
+        xu = np.concatenate([self.n_cand_clase - 1,
+                             np.full(self.n_clases, self.sin_docente, dtype=np.int32)])
+        super().__init__(
+            n_var=self.n_estudiantes + self.n_clases,
+            n_obj=3,
+            n_constr=5,
+            xl=np.zeros_like(xu),
+            xu=xu,
+            elementwise=False,
+            exclude_from_serialization=["evaluador"]
+        )
+        logger.info(f"🎯 Codificación por candidatos: {self.cand_clase.shape[1]} clases por estudiante, "
+                    f"{self.sin_docente} docentes por clase ({time.perf_counter() - inicio:.1f} s)")
+
+    def decodificar(self, X: np.ndarray) -> np.ndarray:
+        """
+        Cromosoma completo [XA | XD_class] de una o varias soluciones codificadas.
+
+        Args:
+            X (np.ndarray): Soluciones (n, n_var) o una sola (n_var,).
+
+        Returns:
+            np.ndarray: Cromosomas completos, con la misma forma que X.
+        """
+        X = np.asarray(X).astype(np.int64)
+        X2 = np.atleast_2d(X)
+        nE = self.n_estudiantes
+        XA = self.cand_clase[np.arange(nE), X2[:, :nE]]
+        XD_class = self.cand_docente[np.arange(self.n_clases), X2[:, nE:]]
+        completo = np.concatenate([XA, XD_class], axis=1).astype(np.int64)
+        return completo.reshape(X.shape)
+
+    def codificar(self, X: np.ndarray) -> np.ndarray:
+        """
+        Posiciones en las listas de candidatos de soluciones completas. Una
+        clase o docente fuera de la lista pasa al candidato más cercano.
+
+        Args:
+            X (np.ndarray): Cromosomas completos (n, n_var) o uno solo (n_var,).
+
+        Returns:
+            np.ndarray: Soluciones codificadas, con la misma forma que X.
+        """
+        X = np.asarray(X).astype(np.int64)
+        codificado = np.zeros(np.atleast_2d(X).shape, dtype=np.int64)
+        nE = self.n_estudiantes
+        for x, c in zip(np.atleast_2d(X), codificado):
+            c[:nE] = (self.cand_clase == x[:nE, None]).argmax(axis=1)
+            c[nE:] = (self.cand_docente == x[nE:, None]).argmax(axis=1)
+        return codificado.reshape(X.shape)
+
+    def reparar(self, x: np.ndarray):
+        """
+        Repara una solución codificada (en el lugar) sin salir de las listas:
+          - Clases sobre la capacidad (g1): el excedente pasa a su candidata
+            más cercana con cupo
+          - Docentes con más de 2 clases (g3) o turno repetido (g4): se libera
+            la clase (primero se validan las clases activas)
+          - Clases activas sin docente (g2): primer candidato disponible
+        """
+        base, nE, nD = self.base, self.n_estudiantes, self.n_docentes
+        cap, turno = base._cls_cap, base._cls_turno
+        clase = self.cand_clase[np.arange(nE), x[:nE]]
+        carga = np.bincount(clase, minlength=self.n_clases)
+        for l in np.flatnonzero(carga > cap):
+            for s in np.random.permutation(np.flatnonzero(clase == l))[:carga[l] - cap[l]]:
+                opciones = self.cand_clase[s, :self.n_cand_clase[s]]
+                libres = np.flatnonzero(carga[opciones] < cap[opciones])
+                if len(libres):
+                    x[s], clase[s] = libres[0], opciones[libres[0]]
+                    carga[l] -= 1
+                    carga[clase[s]] += 1
+
+        XD = x[nE:]
+        docente = self.cand_docente[np.arange(self.n_clases), XD]
+        n_clases = np.zeros(nD, dtype=int)
+        turno_doc = np.full(nD, -1)
+        activa = carga > 0
+        orden = np.concatenate([np.random.permutation(np.flatnonzero(activa)),
+                                np.random.permutation(np.flatnonzero(~activa))])
+        for l in orden:
+            d = docente[l]
+            if d == nD:
+                continue
+            if n_clases[d] >= 2 or turno_doc[d] == turno[l]:
+                XD[l], docente[l] = self.sin_docente, nD
+                continue
+            n_clases[d] += 1
+            turno_doc[d] = turno[l]
+
+        for l in np.flatnonzero(activa & (docente == nD)):
+            opciones = self.cand_docente[l, :self.sin_docente]
+            libres = np.flatnonzero((n_clases[opciones] == 0)
+                                    | ((n_clases[opciones] == 1) & (turno_doc[opciones] != turno[l])))
+            if len(libres):
+                d = opciones[libres[0]]
+                XD[l] = libres[0]
+                n_clases[d] += 1
+                turno_doc[d] = turno[l]
+
+    def usar_evaluador(self, evaluador):
+        """Como IntegratedProblem.usar_evaluador (el evaluador recibe X codificado)."""
+        self.evaluador = evaluador
+
+    def _evaluate(self, x, out, *args, **kwargs):
+        inicio = time.perf_counter()
+        if self.evaluador is not None:
+            out["F"], out["G"] = self.evaluador(x)
+        else:
+            self._evaluar_poblacion(x, out)
+        self.tiempo_evaluacion += time.perf_counter() - inicio
+
+    def _evaluar_poblacion(self, X, out):
+        """Decodifica y evalúa con el kernel vectorizado del problema base."""
+        self.base._evaluar_poblacion(self.decodificar(X), out)
+
+
+class MuestreoCandidatos(Sampling):
+    """
+    Población inicial: muestreo de operadores.py sobre el problema base,
+    codificado y reparado dentro de las listas de candidatos.
+    """
+    def _do(self, problem, n_samples, **kwargs):
+        X = problem.codificar(MuestreoAsignacion()._do(problem.base, n_samples))
+        for x in X:
+            problem.reparar(x)
+        return X
+
+
+class MutacionCandidatos(Mutation):
+    """
+    Cambia cada gen con probabilidad prob_var a otra posición de su lista
+    (al azar) y repara la solución (ProblemaCandidatos.reparar).
+
+    Args:
+        prob (float): Probabilidad de mutar cada individuo.
+        prob_var (float, opcional): Probabilidad por gen (por defecto 1/n_var).
+    """
+    def __init__(self, prob: float = 1.0, prob_var=None, **kwargs):
+        super().__init__(prob=prob, prob_var=prob_var, **kwargs)
+
+    def _do(self, problem, X, **kwargs):
+        prob_var = float(self.get_prob_var(problem))
+        xu = problem.xu.astype(np.int64)
+        X = np.asarray(X).astype(np.int64)
+        for x in X:
+            cambia = np.flatnonzero(np.random.random(problem.n_var) < prob_var)
+            x[cambia] = np.random.randint(0, xu[cambia] + 1)
+            problem.reparar(x)
+        return X
@@ -3,15 +3,19 @@
 # Proyecto Conacyt-Uninter
 # Tutor investigador: Dr. Fabio Lopez 
 # Investigador en formacion: Ing. Eliana Telesca
-# Versión: 1.1
+# Versión: 1.2
 # Descripción:
 #     Módulo para la conexión a la base de datos PostgreSQL y
 #     la carga de datos (estudiantes, docentes, clases, establecimientos).
+#  - Snapshot local en Parquet con refresco incremental por tabla
 # Dependencias:
-#     sqlalchemy, pandas, dotenv
+#     sqlalchemy, pandas, dotenv, pyarrow (snapshot)
 # ================================================================
 
 import os
+import json
+import hashlib
+from pathlib import Path
 from sqlalchemy import create_engine
 import pandas as pd
 import logging
@@ -43,10 +47,104 @@ DB_URI = (
 engine = create_engine(DB_URI)
 
 
-def cargar_datos_desde_db():
+# ================================
+# SNAPSHOT LOCAL (PARQUET)
+# ================================
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", Path(__file__).parent / "snapshot"))
+
+CONSULTAS = {
+    "estudiantes": """
+        SELECT 
+            id AS estudiante_id,
+            nombre, grado, lat, lng,
+            departamento, localidad, barrio
+        FROM estudiantes
+    """,
+    "docentes": """
+        SELECT 
+            id AS docente_id,
+            nombre, grado, lat, lng,
+            departamento, localidad, barrio
+        FROM docentes
+    """,
+    "clases": """
+        SELECT 
+            c.id AS clase_id,
+            c.grado, c.turno, c.capacidad,
+            c.establecimiento_id,
+            e.lat, e.lng,
+            i.nombre AS nombre_institucion,
+            e.institucion_id,
+            i.departamento, i.localidad
+        FROM clases c
+        JOIN establecimientos e ON c.establecimiento_id = e.id
+        JOIN instituciones i ON e.institucion_id = i.id
+    """,
+    "establecimientos": """
+        SELECT id, institucion_id, lat, lng
+        FROM establecimientos
+    """,
+}
+
+# Tablas de las que depende cada DataFrame (para decidir si se vuelve a consultar)
+DEPENDENCIAS = {
+    "estudiantes": ["estudiantes"],
+    "docentes": ["docentes"],
+    "clases": ["clases", "establecimientos", "instituciones"],
+    "establecimientos": ["establecimientos"],
+}
+
+
+def versiones_tablas() -> dict:
+    """
+    Obtiene la marca de versión de cada tabla (cantidad de filas, id máximo y
+    filas insertadas, actualizadas o borradas según pg_stat_user_tables) en
+    una sola consulta. El contador de pg_stat detecta los UPDATE que no
+    cambian filas ni id; si las estadísticas se reinician solo provoca una
+    recarga de más.
+
+    Returns:
+        dict: {tabla: [filas, max_id, cambios]}
+    """
+    tablas = sorted({t for deps in DEPENDENCIAS.values() for t in deps})
+    sql = " UNION ALL ".join(
+        f"SELECT '{t}' AS tabla, COUNT(*) AS filas, COALESCE(MAX(id), 0) AS max_id, "
+        f"(SELECT COALESCE(n_tup_ins + n_tup_upd + n_tup_del, 0) FROM pg_stat_user_tables "
+        f"WHERE relid = '{t}'::regclass) AS cambios FROM {t}"
+        for t in tablas
+    )
+    df = pd.read_sql(sql, engine)
+    return {r.tabla: [int(r.filas), int(r.max_id), int(r.cambios or 0)] for r in df.itertuples(index=False)}
+
+
+def _leer_manifiesto() -> dict:
+    ruta = SNAPSHOT_DIR / "version.json"
+    if not ruta.exists():
+        return {}
+    try:
+        return json.loads(ruta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_manifiesto(manifiesto: dict):
+    tmp = SNAPSHOT_DIR / f"version.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(manifiesto, indent=2), encoding="utf-8")
+    os.replace(tmp, SNAPSHOT_DIR / "version.json")
+
+
+def cargar_datos_desde_db(usar_snapshot: bool = True):
     """
     Carga estudiantes, docentes, clases y establecimientos con unión de instituciones.
 
+    Con usar_snapshot=True cada DataFrame se guarda en SNAPSHOT_DIR como
+    Parquet junto con la versión (filas, id máximo y cambios) de sus tablas; en las
+    siguientes cargas solo se vuelven a consultar los DataFrames cuyas
+    tablas cambiaron y el resto se lee del archivo local.
+
+    Args:
+        usar_snapshot (bool): Usar el snapshot local (requiere pyarrow).
+
     Returns:
         tuple: (estudiantes, docentes, clases, establecimientos) como DataFrames.
                Si ocurre un error, devuelve DataFrames vacíos.
@@ -54,45 +152,18 @@ def cargar_datos_desde_db():
     try:
         logger.info("Cargando datos desde la base de datos...")
 
-        estudiantes = pd.read_sql("""
-            SELECT 
-                id AS estudiante_id,
-                nombre, grado, lat, lng,
-                departamento, localidad, barrio
-            FROM estudiantes
-        """, engine)
-
-        docentes = pd.read_sql("""
-            SELECT 
-                id AS docente_id,
-                nombre, grado, lat, lng,
-                departamento, localidad, barrio
-            FROM docentes
-        """, engine)
-
-        clases = pd.read_sql("""
-            SELECT 
-                c.id AS clase_id,
-                c.grado, c.turno, c.capacidad,
-                c.establecimiento_id,
-                e.lat, e.lng,
-                i.nombre AS nombre_institucion,
-                e.institucion_id
-            FROM clases c
-            JOIN establecimientos e ON c.establecimiento_id = e.id
-            JOIN instituciones i ON e.institucion_id = i.id
-        """, engine)
-
-        establecimientos = pd.read_sql("""
-            SELECT id, institucion_id, lat, lng
-            FROM establecimientos
-        """, engine)
+        frames = {}
+        if usar_snapshot:
+            frames = _cargar_con_snapshot()
+        else:
+            for nombre, sql in CONSULTAS.items():
+                frames[nombre] = pd.read_sql(sql, engine)
 
         # ✅ Resetear índices para evitar problemas en iteraciones posteriores
-        estudiantes = estudiantes.reset_index(drop=True)
-        docentes = docentes.reset_index(drop=True)
-        clases = clases.reset_index(drop=True)
-        establecimientos = establecimientos.reset_index(drop=True)
+        estudiantes = frames["estudiantes"].reset_index(drop=True)
+        docentes = frames["docentes"].reset_index(drop=True)
+        clases = frames["clases"].reset_index(drop=True)
+        establecimientos = frames["establecimientos"].reset_index(drop=True)
 
         logger.info(
             f"Datos cargados correctamente: "
@@ -109,6 +180,44 @@ def cargar_datos_desde_db():
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
 
+def _cargar_con_snapshot() -> dict:
+    """
+    Devuelve los DataFrames de CONSULTAS, leyendo del snapshot Parquet los
+    que siguen vigentes y consultando (y guardando) los que cambiaron.
+    """
+    versiones = versiones_tablas()
+    manifiesto = _leer_manifiesto()
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+    frames = {}
+    for nombre, sql in CONSULTAS.items():
+        version = {t: versiones[t] for t in DEPENDENCIAS[nombre]}
+        version["consulta"] = hashlib.sha1(sql.encode()).hexdigest()[:12]   # cambia si se edita CONSULTAS
+        ruta = SNAPSHOT_DIR / f"{nombre}.parquet"
+
+        if manifiesto.get(nombre) == version and ruta.exists():
+            try:
+                frames[nombre] = pd.read_parquet(ruta)
+                logger.info(f"📦 {nombre}: leído del snapshot local")
+                continue
+            except Exception as e:
+                logger.warning(f"⚠️ Snapshot de {nombre} ilegible, se vuelve a consultar: {e}")
+
+        df = pd.read_sql(sql, engine)
+        try:
+            tmp = ruta.with_suffix(f".{os.getpid()}.tmp")
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, ruta)
+            manifiesto[nombre] = version
+        except ImportError as e:
+            logger.warning(f"⚠️ No se puede escribir Parquet (instale pyarrow): {e}")
+        frames[nombre] = df
+        logger.info(f"🔄 {nombre}: consultado en la base de datos")
+
+    _guardar_manifiesto(manifiesto)
+    return frames
+
+
 def test_conexion():
     """
     Verifica la conexión a la base de datos.
@@ -0,0 +1,377 @@
+# ================================================================
+# descomposicion.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Resolución por bloques del problema integrado. Cada bloque
+#     (estudiantes, clases y docentes) es un IntegratedProblem más
+#     chico que se resuelve en su propio proceso. Las soluciones se
+#     unen en el cromosoma completo; lo compartido entre bloques se
+#     coordina con una reparación (máx. 2 clases por docente, turnos
+#     distintos, capacidad) y una corrida corta de NSGA-II sobre el
+#     problema completo.
+#  - Por grado: estudiantes y clases de un grado; los docentes se
+#    reparten entre los grados (cada uno en un solo bloque)
+#  - Por región: departamento o clusters de establecimientos, con una
+#    conciliación de los estudiantes de frontera al unir
+# Dependencias:
+#     numpy, pandas, pymoo, logging
+# ================================================================
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from integrated_problem import IntegratedProblem
+from integrated_optimization import fork_seguro, run_integrated_optimization
+from operadores import reparar_asignacion
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Bloque: (índices de estudiantes, clases y docentes) del problema completo
+Bloque = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# Clases compatibles más cercanas que se miran para la frontera y la conciliación
+K_VECINAS = 5
+
+
+def repartir_docentes(problem, clases_bloque: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Reparte los docentes entre bloques que comparten el mismo territorio
+    (p. ej. grados), cada docente en un solo bloque, para que los límites
+    por docente (máx. 2 clases, turnos distintos) no choquen al unir.
+
+    Cupo de cada bloque: proporcional a los docentes que necesita como
+    mínimo (la mitad de sus clases o las clases de su turno más cargado);
+    después cada docente va al bloque con cupo cuya clase más cercana
+    está más cerca (pares docente-bloque en orden de distancia).
+
+    Args:
+        problem (IntegratedProblem): Problema completo.
+        clases_bloque (list): Índices de clases de cada bloque.
+
+    Returns:
+        list: Índices de docentes de cada bloque; si hay menos docentes que
+              bloques, los que quedan sin cupo reciben su docente más cercano.
+    """
+    nD, nB = problem.n_docentes, len(clases_bloque)
+    minimo = np.array([max(-(-len(cls) // 2),
+                           np.bincount(problem._cls_turno[cls]).max() if len(cls) else 0)
+                       for cls in clases_bloque], dtype=float)
+    ideal = nD * minimo / max(1.0, minimo.sum())
+    cupo = np.floor(ideal).astype(int)
+    cupo[np.argsort(cupo - ideal)[:nD - cupo.sum()]] += 1
+
+    dist = np.column_stack([np.asarray(problem.dist_doc_clase[:, cls]).min(axis=1)
+                            for cls in clases_bloque])
+    bloque_doc = np.full(nD, -1)
+    for par in np.argsort(dist, axis=None, kind="stable"):
+        d, b = divmod(int(par), nB)
+        if bloque_doc[d] < 0 and cupo[b] > 0:
+            bloque_doc[d] = b
+            cupo[b] -= 1
+
+    docentes = []
+    for b in range(nB):
+        doc = np.flatnonzero(bloque_doc == b)
+        docentes.append(doc if len(doc) else dist[:, b].argsort()[:1])
+    return docentes
+
+
+def bloques_por_grado(problem) -> List[Bloque]:
+    """
+    Un bloque por grado con clases: sus estudiantes, sus clases y los
+    docentes que le tocan en repartir_docentes. Las clases sin grado forman
+    un bloque con los estudiantes sin grado. Los estudiantes de un grado
+    sin clases no entran en ningún bloque (se ubican al unir, ver
+    unir_soluciones).
+
+    Args:
+        problem (IntegratedProblem): Problema completo.
+
+    Returns:
+        list: Bloques (idx_estudiantes, idx_clases, idx_docentes) no vacíos.
+    """
+    grados = []
+    for g in np.unique(problem._cls_grado):
+        est = np.flatnonzero(problem._est_grado == g)
+        cls = np.flatnonzero(problem._cls_grado == g)
+        if len(est):
+            grados.append((est, cls))
+    docentes = repartir_docentes(problem, [cls for _, cls in grados])
+    return [(est, cls, doc) for (est, cls), doc in zip(grados, docentes)]
+
+
+def clases_vecinas(problem, k: int = K_VECINAS) -> np.ndarray:
+    """
+    Las k clases compatibles (mismo grado o sin grado) más cercanas a
+    cada estudiante, de la más cercana a la más lejana.
+
+    Returns:
+        np.ndarray: Índices de clases (n_estudiantes, k); -1 si hay menos de k.
+    """
+    vecinas = np.full((problem.n_estudiantes, k), -1, dtype=np.int64)
+    for g in np.unique(problem._est_grado):
+        est = np.flatnonzero(problem._est_grado == g)
+        cls = np.flatnonzero((problem._cls_grado == g) | (problem._cls_grado < 0) | (g < 0))
+        if not len(cls):
+            cls = np.arange(problem.n_clases)
+        d = np.asarray(problem.dist_est_clase[np.ix_(est, cls)])
+        kk = min(k, len(cls))
+        cerca = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+        orden = np.take_along_axis(d, cerca, axis=1).argsort(axis=1)
+        vecinas[est, :kk] = cls[np.take_along_axis(cerca, orden, axis=1)]
+    return vecinas
+
+
+def regiones_por_departamento(problem) -> np.ndarray:
+    """Región de cada clase: el departamento de su institución (código entero)."""
+    if "departamento" not in problem.clases.columns:
+        raise ValueError("❌ Las clases no tienen la columna 'departamento'")
+    codigos, _ = pd.factorize(problem.clases["departamento"])
+    return codigos
+
+
+def regiones_por_cluster(problem, n_regiones: int = 8, n_iter: int = 50, seed: int = 42) -> np.ndarray:
+    """
+    Región de cada clase: k-means (Lloyd) sobre las coordenadas de los
+    establecimientos, con centros iniciales elegidos por k-means++.
+
+    Returns:
+        np.ndarray: Código de región (0..n_regiones-1) por clase.
+    """
+    coords = problem.clases[["lat", "lng"]].to_numpy(dtype=float)
+    # Coordenadas planas aproximadas (longitud escalada por el coseno de la latitud)
+    puntos = np.column_stack([coords[:, 0], coords[:, 1] * np.cos(np.radians(coords[:, 0].mean()))])
+    unicos, inversa = np.unique(puntos, axis=0, return_inverse=True)
+    n_regiones = max(1, min(n_regiones, len(unicos)))
+
+    rng = np.random.default_rng(seed)
+    centros = unicos[[rng.integers(len(unicos))]]
+    while len(centros) < n_regiones:
+        d2 = ((unicos[:, None, :] - centros[None]) ** 2).sum(axis=2).min(axis=1)
+        centros = np.vstack([centros, unicos[rng.choice(len(unicos), p=d2 / d2.sum())]])
+
+    for _ in range(n_iter):
+        etiqueta = ((unicos[:, None, :] - centros[None]) ** 2).sum(axis=2).argmin(axis=1)
+        nuevos = np.array([unicos[etiqueta == c].mean(axis=0) if (etiqueta == c).any() else centros[c]
+                           for c in range(n_regiones)])
+        if np.allclose(nuevos, centros):
+            break
+        centros = nuevos
+    return etiqueta[inversa.ravel()]
+
+
+def bloques_por_region(problem, region_cls: np.ndarray, vecinas: np.ndarray) -> List[Bloque]:
+    """
+    Un bloque por región: sus clases, los estudiantes cuya clase compatible
+    más cercana está en ella y los docentes cuya clase más cercana está en
+    ella. Si a una región no le queda ningún docente se le prestan los más
+    cercanos (tantos como clases); esos se coordinan al unir.
+
+    Args:
+        problem (IntegratedProblem): Problema completo.
+        region_cls (np.ndarray): Región de cada clase.
+        vecinas (np.ndarray): Resultado de clases_vecinas.
+
+    Returns:
+        list: Bloques (idx_estudiantes, idx_clases, idx_docentes).
+    """
+    region_est = region_cls[vecinas[:, 0]]
+    region_doc = region_cls[np.asarray(problem.dist_doc_clase).argmin(axis=1)]
+    bloques = []
+    for r in np.unique(region_cls):
+        cls = np.flatnonzero(region_cls == r)
+        est = np.flatnonzero(region_est == r)
+        if not len(est):
+            continue
+        doc = np.flatnonzero(region_doc == r)
+        if not len(doc):
+            d = np.asarray(problem.dist_doc_clase[:, cls]).min(axis=1)
+            doc = np.sort(np.argsort(d)[:len(cls)])
+        bloques.append((est, cls, doc))
+    return bloques
+
+
+def _resolver_bloque(args):
+    """Resuelve un bloque en el proceso del pool; devuelve la población final (X, F, G)."""
+    estudiantes, docentes, clases, pop_size, n_gen, cache_dir = args
+    sub = IntegratedProblem(estudiantes, docentes, clases, vectorizado=True, cache_dir=cache_dir)
+    result = run_integrated_optimization(sub, pop_size=pop_size, n_gen=n_gen, n_procs=1)
+    return result.pop.get("X", "F", "G")
+
+
+def resolver_bloques(problem, bloques: List[Bloque], pop_size: int, n_gen: int,
+                     n_procs: int = 4, cache_dir=None) -> list:
+    """
+    Resuelve los bloques en paralelo (un proceso por bloque, hasta n_procs).
+
+    Returns:
+        list: Por bloque, (X, F, G) de su población final con índices locales.
+    """
+    tareas = [(problem.estudiantes.iloc[est], problem.docentes.iloc[doc], problem.clases.iloc[cls],
+               pop_size, n_gen, cache_dir) for est, cls, doc in bloques]
+    n_procs = max(1, min(n_procs, len(tareas)))
+    if n_procs == 1:
+        return [_resolver_bloque(t) for t in tareas]
+
+    ctx = multiprocessing.get_context("fork" if fork_seguro() else "spawn")
+    logger.info(f"🧩 Resolviendo {len(tareas)} bloques en {n_procs} procesos")
+    with ProcessPoolExecutor(max_workers=n_procs, mp_context=ctx) as pool:
+        return list(pool.map(_resolver_bloque, tareas))
+
+
+def unir_soluciones(problem, bloques: List[Bloque], soluciones: list, n: int) -> np.ndarray:
+    """
+    Arma n soluciones completas: la i-ésima toma, de cada bloque, su
+    i-ésima solución (ordenadas por violación de restricciones y F1).
+    Las clases de un bloque conservan el docente elegido en él; los
+    estudiantes que no están en ningún bloque van a su clase más cercana.
+    Lo compartido entre bloques (docentes repetidos, capacidad) queda para
+    reparar_asignacion.
+
+    Returns:
+        np.ndarray: Soluciones (n, n_var) del problema completo.
+    """
+    nE = problem.n_estudiantes
+    X = np.empty((n, problem.n_var), dtype=np.int64)
+    en_bloque = np.zeros(nE, dtype=bool)
+    for est, _, _ in bloques:
+        en_bloque[est] = True
+    sueltos = np.flatnonzero(~en_bloque)
+    if len(sueltos):
+        logger.warning(f"⚠️ {len(sueltos)} estudiantes sin clases de su grado")
+    X[:, sueltos] = np.asarray(problem.dist_est_clase[sueltos]).argmin(axis=1)
+    X[:, nE:] = problem.n_docentes
+
+    for (est, cls, doc), (Xb, Fb, Gb) in zip(bloques, soluciones):
+        cv = np.maximum(0, Gb).sum(axis=1)
+        orden = np.lexsort((Fb[:, 0], cv))
+        filas = Xb[orden[np.arange(n) % len(orden)]].astype(np.int64)
+        X[:, est] = cls[filas[:, :len(est)]]
+        XD = filas[:, len(est):]
+        X[:, nE + cls] = np.where(XD < len(doc), doc[np.minimum(XD, len(doc) - 1)], problem.n_docentes)
+    return X
+
+
+def estudiantes_frontera(region_cls: np.ndarray, vecinas: np.ndarray) -> np.ndarray:
+    """
+    Estudiantes de frontera: alguna de sus clases compatibles más cercanas
+    está en otra región que la más cercana (la de su bloque).
+    """
+    region = np.where(vecinas >= 0, region_cls[vecinas], -1)
+    return np.flatnonzero(((region != region[:, :1]) & (vecinas >= 0)).any(axis=1))
+
+
+def conciliar_frontera(problem, X: np.ndarray, frontera: np.ndarray, vecinas: np.ndarray) -> np.ndarray:
+    """
+    Pasada sobre los estudiantes de frontera de cada solución unida: cada
+    uno pasa a la clase vecina más cercana (de cualquier región) que esté
+    más cerca que la actual y tenga cupo. Los docentes de las clases que
+    quedan activas se resuelven después con reparar_asignacion.
+
+    Returns:
+        np.ndarray: Copia de X con los estudiantes de frontera movidos.
+    """
+    X = np.array(X, dtype=np.int64)
+    nE = problem.n_estudiantes
+    dist = problem.dist_est_clase
+    for x in X:
+        XA = x[:nE]
+        carga = np.bincount(XA, minlength=problem.n_clases)
+        for s in frontera:
+            a = XA[s]
+            for c in vecinas[s]:
+                if c < 0 or dist[s, c] >= dist[s, a]:
+                    break
+                if carga[c] < problem._cls_cap[c]:
+                    carga[a] -= 1
+                    carga[c] += 1
+                    XA[s] = c
+                    break
+    return X
+
+
+def optimizar_por_bloques(
+    problem,
+    bloques: List[Bloque],
+    pop_size: int = 100,
+    n_gen: int = 50,
+    n_procs: int = 4,
+    n_gen_final: int = 10,
+    cache_dir=None,
+    frontera: Optional[np.ndarray] = None,
+    vecinas: Optional[np.ndarray] = None,
+    **kwargs
+):
+    """
+    Resuelve los bloques en paralelo, une sus soluciones y termina con
+    n_gen_final generaciones de NSGA-II sobre el problema completo, que
+    parte de la población unida.
+
+    Args:
+        problem (IntegratedProblem): Problema completo.
+        bloques (list): Bloques (idx_estudiantes, idx_clases).
+        pop_size (int): Tamaño de la población (bloques y corrida final).
+        n_gen (int): Generaciones de cada bloque.
+        n_procs (int): Procesos para los bloques y la corrida final.
+        n_gen_final (int): Generaciones sobre el problema completo.
+        cache_dir (str | Path, opcional): Caché de distancias de los bloques.
+        frontera (np.ndarray, opcional): Estudiantes a conciliar al unir
+                  (ver estudiantes_frontera); requiere vecinas.
+        vecinas (np.ndarray, opcional): Resultado de clases_vecinas.
+        **kwargs: Demás argumentos de run_integrated_optimization (db_config,
+                  archivo, callback, ...).
+
+    Returns:
+        pymoo.optimize.Result: Resultado de la corrida final.
+    """
+    soluciones = resolver_bloques(problem, bloques, pop_size, n_gen, n_procs, cache_dir)
+    X = unir_soluciones(problem, bloques, soluciones, pop_size)
+    if frontera is not None:
+        X = conciliar_frontera(problem, X, frontera, vecinas)
+    X = reparar_asignacion(problem, X)
+    logger.info(f"🧩 {len(bloques)} bloques unidos; corrida final de {n_gen_final} generaciones")
+    return run_integrated_optimization(problem, pop_size=pop_size, n_gen=max(1, n_gen_final),
+                                       n_procs=n_procs, poblacion_inicial=X, **kwargs)
+
+
+def optimizar_por_grado(problem, pop_size: int = 100, n_gen: int = 50, n_procs: int = 4,
+                        n_gen_final: int = 10, cache_dir=None, **kwargs):
+    """optimizar_por_bloques con un bloque por grado (ver bloques_por_grado)."""
+    return optimizar_por_bloques(problem, bloques_por_grado(problem), pop_size, n_gen,
+                                 n_procs, n_gen_final, cache_dir, **kwargs)
+
+
+def optimizar_por_region(problem, regiones: str = "departamento", n_regiones: int = 8,
+                         pop_size: int = 100, n_gen: int = 50, n_procs: int = 4,
+                         n_gen_final: int = 10, cache_dir=None, **kwargs):
+    """
+    optimizar_por_bloques con un bloque por región y conciliación de los
+    estudiantes de frontera.
+
+    Args:
+        regiones (str): "departamento" (de la institución de cada clase) o
+                        "cluster" (k-means sobre los establecimientos).
+        n_regiones (int): Cantidad de clusters con regiones="cluster".
+    """
+    if regiones == "departamento":
+        region_cls = regiones_por_departamento(problem)
+    elif regiones == "cluster":
+        region_cls = regiones_por_cluster(problem, n_regiones)
+    else:
+        raise ValueError(f"❌ Regiones desconocidas: {regiones}")
+
+    vecinas = clases_vecinas(problem)
+    bloques = bloques_por_region(problem, region_cls, vecinas)
+    frontera = estudiantes_frontera(region_cls, vecinas)
+    logger.info(f"🗺️ {len(bloques)} regiones ({regiones}); {len(frontera)} estudiantes de frontera")
+    return optimizar_por_bloques(problem, bloques, pop_size, n_gen, n_procs, n_gen_final,
+                                 cache_dir, frontera=frontera, vecinas=vecinas, **kwargs)
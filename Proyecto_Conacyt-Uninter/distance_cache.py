@@ -0,0 +1,141 @@
+# ================================================================
+# distance_cache.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Matrices de distancias precalculadas (haversine, km, float32)
+#     estudiante->clase y docente->clase. Se calculan por bloques de
+#     filas y se guardan como .npy mapeados en memoria, con nombre
+#     derivado de un hash de las coordenadas, para reutilizarlas entre
+#     ejecuciones y desde el visor.
+# Dependencias:
+#     numpy, logging
+# ================================================================
+
+import os
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+RADIO_TIERRA_KM = 6371.0
+
+# Directorio de caché por defecto (configurable por variable de entorno)
+CACHE_DIR = Path(os.getenv("DISTANCIAS_CACHE_DIR", Path(__file__).parent / "cache"))
+
+# Filas calculadas por bloque (acota la memoria temporal en instancias grandes)
+FILAS_POR_BLOQUE = 2048
+
+# Versión del formato: cambiarla invalida los archivos existentes
+_VERSION_CACHE = b"hav-f32-v1"
+
+
+def haversine_rad(lat1, lon1, lat2, lon2):
+    """
+    Distancia haversine (km) sobre arreglos de coordenadas en radianes.
+
+    Args:
+        lat1, lon1, lat2, lon2: Escalares o arreglos NumPy compatibles por broadcasting.
+
+    Returns:
+        np.ndarray: Distancias en kilómetros.
+    """
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
+    c = 2*np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return RADIO_TIERRA_KM*c
+
+
+def clave_coordenadas(origen: np.ndarray, destino: np.ndarray) -> str:
+    """
+    Calcula la clave de caché a partir de las coordenadas de origen y destino.
+
+    Args:
+        origen (np.ndarray): Arreglo (n_o, 2) con lat/lng en grados.
+        destino (np.ndarray): Arreglo (n_d, 2) con lat/lng en grados.
+
+    Returns:
+        str: Hash hexadecimal (16 caracteres).
+    """
+    h = hashlib.sha1(_VERSION_CACHE)
+    for arr in (origen, destino):
+        arr = np.ascontiguousarray(arr, dtype=np.float64)
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()[:16]
+
+
+def _llenar_por_bloques(M, origen: np.ndarray, destino: np.ndarray, filas: int):
+    """Escribe en M las distancias origen x destino, un bloque de filas por vez."""
+    lat_o, lng_o = np.radians(origen[:, 0]), np.radians(origen[:, 1])
+    lat_d, lng_d = np.radians(destino[:, 0]), np.radians(destino[:, 1])
+    for ini in range(0, len(origen), filas):
+        fin = min(ini + filas, len(origen))
+        M[ini:fin] = haversine_rad(lat_o[ini:fin, None], lng_o[ini:fin, None],
+                                   lat_d[None, :], lng_d[None, :])
+
+
+def matriz_distancias(
+    origen,
+    destino,
+    nombre: str = "dist",
+    cache_dir: Optional[Union[str, Path]] = None,
+    filas_por_bloque: int = FILAS_POR_BLOQUE
+) -> np.ndarray:
+    """
+    Devuelve la matriz float32 de distancias origen x destino.
+
+    Sin cache_dir la matriz se calcula en memoria. Con cache_dir se busca
+    el archivo "<nombre>_<hash>.npy"; si existe se abre mapeado en memoria
+    (solo lectura) y si no, se calcula por bloques directamente sobre el
+    archivo y luego se abre del mismo modo.
+
+    Args:
+        origen: Arreglo (n_o, 2) con lat/lng en grados.
+        destino: Arreglo (n_d, 2) con lat/lng en grados.
+        nombre (str): Prefijo del archivo de caché.
+        cache_dir (str | Path, opcional): Directorio de caché en disco.
+        filas_por_bloque (int): Filas calculadas por bloque.
+
+    Returns:
+        np.ndarray: Matriz (n_o, n_d) float32 (np.memmap si se usa caché).
+    """
+    origen = np.asarray(origen, dtype=np.float64).reshape(-1, 2)
+    destino = np.asarray(destino, dtype=np.float64).reshape(-1, 2)
+    forma = (len(origen), len(destino))
+
+    if cache_dir is None:
+        M = np.empty(forma, dtype=np.float32)
+        _llenar_por_bloques(M, origen, destino, filas_por_bloque)
+        return M
+
+    cache_dir = Path(cache_dir)
+    ruta = cache_dir / f"{nombre}_{clave_coordenadas(origen, destino)}.npy"
+
+    if ruta.exists():
+        try:
+            M = np.load(ruta, mmap_mode="r")
+            if M.shape == forma and M.dtype == np.float32:
+                logger.info(f"📦 Distancias '{nombre}' leídas de caché: {ruta.name}")
+                return M
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Caché de distancias ilegible ({ruta.name}): {e}")
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_suffix(f".{os.getpid()}.tmp")
+    M = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=forma)
+    _llenar_por_bloques(M, origen, destino, filas_por_bloque)
+    M.flush()
+    del M
+    os.replace(tmp, ruta)
+    logger.info(f"💾 Distancias '{nombre}' calculadas y guardadas: {ruta.name} {forma}")
+
+    return np.load(ruta, mmap_mode="r")
@@ -3,23 +3,31 @@
 # Proyecto Conacyt-Uninter
 # Tutor investigador: Dr. Fabio Lopez 
 # Investigador en formacion: Ing. Eliana Telesca
-# Versión: 1.2
+# Versión: 1.4
 # Descripción:
 #     Script principal para ejecutar la optimización de asignaciones
 #     educativas. Carga datos desde la base de datos, define el
 #     problema de optimización y guarda los resultados.
 # Dependencias:
-#     pandas, logging, database, integrated_problem, integrated_optimization
+#     pandas, logging, database, integrated_problem, integrated_optimization,
+#     resumenes, archivo_pareto, descomposicion, codificacion
 # ================================================================
 
+import os
 import sys
+import argparse
 from pathlib import Path
 import logging
 import pandas as pd
 from database import engine, cargar_datos_desde_db
 from integrated_problem import IntegratedProblem
+from distance_cache import CACHE_DIR
 from integrated_optimization import run_integrated_optimization
 from integrated_optimization import select_best_individual
+from archivo_pareto import ruta_archivo
+from descomposicion import optimizar_por_grado, optimizar_por_region
+from codificacion import ProblemaCandidatos
+from resumenes import build_summaries, kpis_globales
 
 # ================================
 # CONFIGURACIÓN LOGGING
@@ -30,6 +38,9 @@ logger.setLevel(logging.INFO)
 PROJECT_ROOT = Path(__file__).parent
 sys.path.append(str(PROJECT_ROOT))
 
+# Punto de control de la optimización por consola (ver --reanudar)
+CHECKPOINT = Path(os.getenv("CHECKPOINT_PATH", PROJECT_ROOT / "checkpoints" / "integrated.npz"))
+
 
 def cargar_asignaciones():
     """
@@ -45,10 +56,22 @@ def cargar_asignaciones():
         return pd.DataFrame()
 
 
-def main():
+def main(reanudar: bool = False, descomposicion: str = "ninguna", candidatos: int = 0):
     """
     Función principal para cargar datos, ejecutar la optimización
     y mostrar los resultados en consola.
+
+    Args:
+        reanudar (bool): Continuar desde el último punto de control (CHECKPOINT)
+                         en lugar de empezar desde una población nueva.
+        descomposicion (str): "ninguna" (un solo problema), "grado" (un
+                         subproblema por grado en paralelo) o "departamento" /
+                         "cluster" (un subproblema por región, con conciliación
+                         de la frontera); ver descomposicion.py.
+        candidatos (int): Sin descomposición y > 0, usa la codificación por
+                         listas de candidatos (codificacion.py) con esa
+                         cantidad de clases por estudiante (y el doble de
+                         docentes por clase); 0 = codificación completa.
     """
     # ================================
     # CARGAR DATOS DESDE BD
@@ -69,23 +92,58 @@ def main():
     # ================================
     # EJECUTAR OPTIMIZACIÓN
     # ================================
-    problem = IntegratedProblem(estudiantes, docentes, clases)
-
-    result = run_integrated_optimization(
-        problem,
-        pop_size=50,    # Ajustable: tamaño de la población
-        n_gen=30,       # Ajustable: número de generaciones
-        n_procs=4,      # Ajustable: número de procesos paralelos
-        db_config={
-            "user": "postgres",
-            "password": "Admin.123",
-            "host": "localhost",
-            "port": "5432",
-            "database": "Asignacion_MEC"
-        }
-    )
+    problem = IntegratedProblem(estudiantes, docentes, clases, cache_dir=CACHE_DIR)
+    archivo = ruta_archivo(problem)
+    db_config = {
+        "user": "postgres",
+        "password": "Admin.123",
+        "host": "localhost",
+        "port": "5432",
+        "database": "Asignacion_MEC"
+    }
+
+    if descomposicion == "grado":
+        result = optimizar_por_grado(
+            problem,
+            pop_size=50,    # Ajustable: tamaño de la población
+            n_gen=30,       # Ajustable: generaciones de cada grado
+            n_procs=4,      # Ajustable: procesos (grados en paralelo)
+            n_gen_final=10, # Ajustable: generaciones sobre el problema completo
+            cache_dir=CACHE_DIR,
+            archivo=archivo,
+            db_config=db_config
+        )
+    elif descomposicion in ("departamento", "cluster"):
+        result = optimizar_por_region(
+            problem,
+            regiones=descomposicion,
+            n_regiones=8,   # Ajustable: clusters de establecimientos (modo "cluster")
+            pop_size=50,
+            n_gen=30,       # Ajustable: generaciones de cada región
+            n_procs=4,      # Ajustable: procesos (regiones en paralelo)
+            n_gen_final=10,
+            cache_dir=CACHE_DIR,
+            archivo=archivo,
+            db_config=db_config
+        )
+    else:
+        if candidatos:
+            problem = ProblemaCandidatos(problem, k_clases=candidatos, k_docentes=2 * candidatos)
+        result = run_integrated_optimization(
+            problem,
+            pop_size=50,    # Ajustable: tamaño de la población
+            n_gen=30,       # Ajustable: número de generaciones
+            n_procs=4,      # Ajustable: número de procesos paralelos
+            checkpoint=CHECKPOINT,
+            checkpoint_cada=10,
+            reanudar=reanudar,
+            archivo=archivo,
+            db_config=db_config
+        )
 
     logger.info("✅ Optimización completada")   
+    if result.archivo is not None:
+        print(f"🗂️ Mejor frente conocido: {len(result.archivo)} soluciones ({result.archivo.ruta.name})")
     try:
         _, _, best_F = select_best_individual(result)
         if best_F is not None:
@@ -102,6 +160,36 @@ def main():
     except Exception as e:
             logger.error(f"No se pudo resumir la mejor solución: {e}")
 
+    # ================================
+    # RESÚMENES POR CLASE Y DOCENTE
+    # ================================
+    try:
+        _, best_X, _ = select_best_individual(result)
+        df_classes, df_teachers = build_summaries(problem, best_X)
+        kpis = kpis_globales(df_classes, df_teachers)
+        print("🏫 Resumen por clase / 👩‍🏫 por docente:")
+        print(f"   ➤ Alumnos faltantes bajo mínimo: {kpis['alumnos_bajo_minimo']}")
+        print(f"   ➤ Alumnos excedidos sobre máximo: {kpis['alumnos_sobre_maximo']}")
+        print(f"   ➤ Clases con alumnos sin docente: {kpis['clases_sin_docente']}")
+        print(f"   ➤ Docentes con más de 2 clases: {kpis['docentes_mas_de_2_clases']}")
+        print(f"   ➤ Docentes con turno repetido: {kpis['docentes_turno_repetido']}")
+    except Exception as e:
+        logger.error(f"No se pudieron calcular los resúmenes: {e}")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Optimización integrada AEEE-ADEE")
+    parser.add_argument("--reanudar", action="store_true",
+                        help="continuar desde el último punto de control")
+    parser.add_argument("--descomposicion", choices=["ninguna", "grado", "departamento", "cluster"],
+                        default="ninguna",
+                        help="resolver subproblemas (por grado o región) en paralelo y unirlos")
+    parser.add_argument("--candidatos", type=int, default=0, metavar="K",
+                        help="codificación reducida: K clases cercanas por estudiante (0 = completa)")
+    args = parser.parse_args()
+    # La descomposición no usa checkpoint ni codificación por candidatos
+    if args.descomposicion != "ninguna" and args.reanudar:
+        parser.error("--reanudar no se puede combinar con --descomposicion")
+    if args.descomposicion != "ninguna" and args.candidatos:
+        parser.error("--candidatos no se puede combinar con --descomposicion")
+    main(reanudar=args.reanudar, descomposicion=args.descomposicion, candidatos=args.candidatos)
@@ -3,24 +3,44 @@
 # Proyecto Conacyt-Uninter
 # Tutor investigador: Dr. Fabio Lopez
 # Investigador en formación: Ing. Eliana Telesca
-# Versión: 1.2
+# Versión: 1.3
 # Descripción:
 #     Contiene la lógica de optimización multiobjetivo utilizando
 #     algoritmos evolutivos (NSGA-II) y la gestión de guardado de
 #     resultados en la base de datos.
+#  - Evaluación paralela por bloques (procesos con fork o hilos)
+#  - Puntos de control / reanudación
+#  - Métricas de convergencia por generación en lugar de save_history
+#  - Operadores enteros propios del cromosoma (operadores.py)
+#  - Archivo persistente del mejor frente conocido (archivo_pareto.py)
+#  - Codificación reducida por listas de candidatos (codificacion.py)
 # Dependencias:
 #     pymoo, psycopg2, logging
 # ================================================================
 
 import logging
+import platform
+import threading
+import multiprocessing
 import uuid
 import numpy as np 
-from typing import Dict, Any, Optional
+import pandas as pd
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
 from pymoo.algorithms.moo.nsga2 import NSGA2
-from pymoo.optimize import minimize
+from pymoo.core.callback import Callback
 import psycopg2
 import psycopg2.extras
 
+from archivo_pareto import ArchivoPareto
+from codificacion import MuestreoCandidatos, MutacionCandidatos, ProblemaCandidatos
+from checkpoint import (CadenaCallbacks, Checkpointer, cargar_checkpoint, codificacion_problema,
+                        ejecutar_nsga2, poblacion_checkpoint)
+from metricas import MetricasConvergencia
+from operadores import CruceEstablecimiento, MuestreoAsignacion, MutacionAsignacion
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -71,64 +91,175 @@ class DatabaseManager:
         * XA[i] = índice de clase asignada al estudiante i
         * XD_class[l] = índice de docente asignado a la clase l
                          (o == n_docentes para "sin docente")
+
+        Las filas se arman en bloque (construir_asignaciones) y se envían con
+        COPY FROM STDIN; TRUNCATE + COPY se confirman en una sola transacción.
         """
         try:
             # 1) Elegir mejor individuo (robusto si result.F es None)
             best_idx, best_solution, best_F = select_best_individual(result)
 
             # 2) Decodificar cromosoma según tu IntegratedProblem
-            nE = problem.n_estudiantes
-            XA = best_solution[:nE].astype(int)               # estudiante -> clase
-            XD_class = best_solution[nE:].astype(int)         # docente por clase
+            filas = construir_asignaciones(problem, best_solution)
+
+            buffer = StringIO()
+            filas.to_csv(buffer, sep="\t", header=False, index=False)
+            buffer.seek(0)
 
             with self.conn.cursor() as cursor:
                 cursor.execute("TRUNCATE asignacion_mec RESTART IDENTITY")
-
-                for i, est in problem.estudiantes.iterrows():
-                    # clase del estudiante i
-                    clase_idx = int(XA[i])
-                    cls = problem.clases.iloc[clase_idx]
-
-                    # docente asignado a esa clase
-                    docente_idx = int(XD_class[clase_idx])
-
-                    if docente_idx >= problem.n_docentes:
-                        # Fallback: si la clase está activa pero quedó "sin docente",
-                        # elegir el docente más cercano al establecimiento de la clase.
-                        best_j, best_d = 0, float("inf")
-                        for j, doc in problem.docentes.iterrows():
-                            d = problem._hav((doc["lat"], doc["lng"]), (cls["lat"], cls["lng"]))
-                            if d < best_d:
-                                best_d, best_j = d, j
-                        docente_idx = int(best_j)
-
-                    docente = problem.docentes.iloc[docente_idx]
-
-                    # Distancia estudiante -> establecimiento de la clase
-                    distancia = problem._hav((est["lat"], est["lng"]), (cls["lat"], cls["lng"]))
-
-                    cursor.execute("""
-                        INSERT INTO asignacion_mec
-                        (estudiante_id, docente_id, establecimiento_id, institucion_id, grado, seccion, turno, distancia)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        int(est["estudiante_id"]),
-                        int(docente["docente_id"]),
-                        int(cls["establecimiento_id"]),
-                        int(cls["institucion_id"]),
-                        cls["grado"],
-                        "A",
-                        cls["turno"],
-                        float(distancia)
-                    ))
+                cursor.copy_expert(
+                    f"COPY asignacion_mec ({', '.join(COLUMNAS_ASIGNACION)}) "
+                    "FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t')",
+                    buffer
+                )
             self.conn.commit()
-            logger.info("✅ Asignaciones guardadas correctamente en asignacion_mec")
+            logger.info(f"✅ {len(filas)} asignaciones guardadas correctamente en asignacion_mec")
         except Exception as e:
             if self.conn:
                 self.conn.rollback()
             logger.error(f"❌ Error al guardar asignaciones: {e}", exc_info=True)
             raise
 
+
+COLUMNAS_ASIGNACION = [
+    "estudiante_id", "docente_id", "establecimiento_id", "institucion_id",
+    "grado", "seccion", "turno", "distancia"
+]
+
+
+def construir_asignaciones(problem, best_solution) -> pd.DataFrame:
+    """
+    Decodifica un cromosoma en las filas de asignacion_mec (una por estudiante).
+
+    Las clases con alumnos que quedaron "sin docente" reciben el docente más
+    cercano a su establecimiento, calculado una vez por clase.
+
+    Args:
+        problem (IntegratedProblem | ProblemaCandidatos): Problema con DataFrames
+                 y matrices de distancias (o su codificación por candidatos).
+        best_solution (np.ndarray): Cromosoma [XA, XD_class] (codificado si
+                 problem es un ProblemaCandidatos).
+
+    Returns:
+        pd.DataFrame: Columnas COLUMNAS_ASIGNACION, en el orden de los estudiantes.
+    """
+    if isinstance(problem, ProblemaCandidatos):
+        best_solution, problem = problem.decodificar(best_solution), problem.base
+
+    nE = problem.n_estudiantes
+    XA = np.asarray(best_solution[:nE]).astype(int)          # estudiante -> clase
+    XD_class = np.asarray(best_solution[nE:]).astype(int)    # docente por clase
+
+    # Fallback: docente más cercano para las clases activas sin docente
+    docente_por_clase = XD_class.copy()
+    activas_sin_doc = np.intersect1d(np.unique(XA), np.flatnonzero(XD_class >= problem.n_docentes))
+    if len(activas_sin_doc) > 0:
+        docente_por_clase[activas_sin_doc] = np.argmin(problem.dist_doc_clase[:, activas_sin_doc], axis=0)
+
+    cls = problem.clases
+    return pd.DataFrame({
+        "estudiante_id": problem.estudiantes["estudiante_id"].astype(int).to_numpy(),
+        "docente_id": problem.docentes["docente_id"].astype(int).to_numpy()[docente_por_clase[XA]],
+        "establecimiento_id": cls["establecimiento_id"].astype(int).to_numpy()[XA],
+        "institucion_id": cls["institucion_id"].astype(int).to_numpy()[XA],
+        "grado": cls["grado"].to_numpy()[XA],
+        "seccion": "A",
+        "turno": cls["turno"].to_numpy()[XA],
+        # Distancia estudiante -> establecimiento de la clase (precalculada)
+        "distancia": np.asarray(problem.dist_est_clase[np.arange(nE), XA], dtype=float),
+    }, columns=COLUMNAS_ASIGNACION)
+
+# Problema heredado por cada proceso del pool (fork: no se serializa)
+_PROBLEMA_WORKER = None
+
+
+def _init_worker(problem):
+    global _PROBLEMA_WORKER
+    _PROBLEMA_WORKER = problem
+
+
+def _evaluar_bloque(X):
+    out = {}
+    _PROBLEMA_WORKER._evaluar_poblacion(X, out)
+    return out["F"], out["G"]
+
+
+def fork_seguro() -> bool:
+    """
+    Indica si es seguro crear procesos con fork: requiere que el sistema
+    lo soporte, no ser Windows/macOS y estar en el hilo principal (Streamlit
+    ejecuta el script en un hilo secundario).
+
+    Returns:
+        bool: True si se puede usar un pool de procesos con fork.
+    """
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and platform.system() not in ("Windows", "Darwin")
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+class EvaluadorParalelo:
+    """
+    Evalúa la población por bloques de filas en paralelo usando el kernel
+    vectorizado del problema (IntegratedProblem._evaluar_poblacion).
+
+    Modos:
+      - "procesos": pool de procesos con fork; el problema (y sus matrices
+        de distancias) se hereda una vez, sin serializarse por generación.
+      - "hilos": pool de hilos en el mismo proceso (NumPy libera el GIL en
+        las operaciones sobre arreglos grandes); seguro en Windows/Streamlit.
+      - "auto": procesos si fork_seguro(), si no hilos.
+    """
+
+    def __init__(self, problem, n_procs: int, modo: str = "auto"):
+        """
+        Args:
+            problem (IntegratedProblem): Problema a evaluar.
+            n_procs (int): Número de procesos/hilos.
+            modo (str): "auto", "procesos" o "hilos".
+        """
+        if modo == "auto":
+            modo = "procesos" if fork_seguro() else "hilos"
+        if modo not in ("procesos", "hilos"):
+            raise ValueError(f"❌ Modo de evaluación paralela desconocido: {modo}")
+
+        self.problem = problem
+        self.n_procs = n_procs
+        self.modo = modo
+        if modo == "procesos":
+            ctx = multiprocessing.get_context("fork")
+            self.pool = ctx.Pool(n_procs, initializer=_init_worker, initargs=(problem,))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=n_procs)
+        logger.info(f"⚙️ Evaluación paralela: {n_procs} {modo}")
+
+    def _evaluar_local(self, X):
+        out = {}
+        self.problem._evaluar_poblacion(X, out)
+        return out["F"], out["G"]
+
+    def __call__(self, X):
+        bloques = [b for b in np.array_split(np.asarray(X), self.n_procs) if len(b) > 0]
+        if self.modo == "procesos":
+            resultados = self.pool.map(_evaluar_bloque, bloques)
+        else:
+            resultados = list(self.pool.map(self._evaluar_local, bloques))
+        F = np.concatenate([r[0] for r in resultados])
+        G = np.concatenate([r[1] for r in resultados])
+        return F, G
+
+    def close(self):
+        """Libera el pool de procesos/hilos."""
+        if self.modo == "procesos":
+            self.pool.close()
+            self.pool.join()
+        else:
+            self.pool.shutdown()
+
+
 def _extract_FX(result):
     """
     Devuelve (F, X) desde result.F/result.X o, si vienen None,
@@ -169,34 +300,123 @@ def run_integrated_optimization(
     n_procs: int = 4,
     db_config: Optional[Dict[str, Any]] = None,
     run_id: Optional[str] = None,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    modo_paralelo: str = "auto",
+    callback: Optional[Callback] = None,
+    checkpoint: Optional[Union[str, Path]] = None,
+    checkpoint_cada: int = 10,
+    reanudar: bool = False,
+    historial: str = "resumen",
+    muestras_cada: int = 0,
+    frente_referencia: Optional[np.ndarray] = None,
+    operadores: str = "asignacion",
+    archivo: Optional[Union[str, Path]] = None,
+    poblacion_inicial: Optional[np.ndarray] = None
 ):
     """
     Ejecuta el algoritmo evolutivo NSGA-II para optimizar el problema.
 
     Args:
-        problem (IntegratedProblem): Problema de optimización a resolver.
+        problem (IntegratedProblem | ProblemaCandidatos): Problema de
+                 optimización a resolver (con ProblemaCandidatos, result.X
+                 queda codificado; ver ProblemaCandidatos.decodificar).
         pop_size (int): Tamaño de la población.
         n_gen (int): Número de generaciones.
-        n_procs (int): Número de procesos paralelos (actualmente no utilizado en n_jobs=1).
+        n_procs (int): Número de procesos/hilos para evaluar la población por
+                       bloques (1 = evaluación en serie).
         db_config (dict, opcional): Configuración de BD para guardar resultados.
         run_id (str, opcional): Identificador único de la ejecución.
         metadata (dict, opcional): Datos adicionales para rastreo.
+        modo_paralelo (str): "auto", "procesos" o "hilos" (ver EvaluadorParalelo).
+        callback (pymoo Callback, opcional): Se llama al final de cada generación
+                  (progreso de trabajos en segundo plano, cancelación).
+        checkpoint (str | Path, opcional): Archivo .npz de puntos de control.
+        checkpoint_cada (int): Generaciones entre puntos de control.
+        reanudar (bool): Continuar desde `checkpoint` si existe y corresponde al problema.
+        historial (str): "resumen" (métricas por generación en result.metricas,
+                         ver MetricasConvergencia) o "completo" (además
+                         save_history de pymoo; memoria lineal en n_gen).
+        muestras_cada (int): Con historial "resumen", guarda X/F/G de la
+                             población cada k generaciones (0 = nunca).
+        frente_referencia (np.ndarray, opcional): Frente para calcular el IGD.
+        operadores (str): "asignacion" (muestreo, cruce y mutación enteros de
+                          operadores.py, o los de codificacion.py si el
+                          problema usa candidatos) o "pymoo" (SBX/PM reales
+                          por defecto).
+        archivo (str | Path, opcional): Archivo del frente de Pareto persistente
+                  (ver archivo_pareto.ruta_archivo) donde se agregan las
+                  soluciones factibles del frente final (decodificadas);
+                  queda en result.archivo.
+        poblacion_inicial (np.ndarray, opcional): Soluciones (n, n_var) que
+                  reemplazan al muestreo inicial (p. ej. unión de subproblemas,
+                  ver descomposicion.py), en la codificación del problema. Se ignora al reanudar un checkpoint.
 
     Returns:
         pymoo.optimize.Result: Resultados de la optimización.
     """
-    algorithm = NSGA2(pop_size=pop_size, eliminate_duplicates=True)
-
-    result = minimize(
-        problem,
-        algorithm,
-        ('n_gen', n_gen),
-        seed=42,
-        verbose=True,
-        save_history=True,
-        n_jobs=1
-    )
+    if historial not in ("completo", "resumen"):
+        raise ValueError(f"historial desconocido: {historial}")
+    if operadores not in ("asignacion", "pymoo"):
+        raise ValueError(f"operadores desconocidos: {operadores}")
+
+    estado = cargar_checkpoint(checkpoint) if (checkpoint and reanudar) else None
+    if estado is not None and (estado["X"].shape[1] != problem.n_var
+                               or (estado["X"] > problem.xu).any()
+                               or estado["codificacion"] != codificacion_problema(problem)):
+        logger.warning("⚠️ El checkpoint no corresponde a este problema o a su codificación; "
+                       "se inicia desde cero")
+        estado = None
+
+    kwargs_nsga2 = {}
+    if operadores == "asignacion" and isinstance(problem, ProblemaCandidatos):
+        kwargs_nsga2 = dict(sampling=MuestreoCandidatos(),
+                            crossover=CruceEstablecimiento(),
+                            mutation=MutacionCandidatos())
+    elif operadores == "asignacion":
+        kwargs_nsga2 = dict(sampling=MuestreoAsignacion(),
+                            crossover=CruceEstablecimiento(),
+                            mutation=MutacionAsignacion())
+    if estado is not None:
+        kwargs_nsga2["sampling"] = poblacion_checkpoint(estado)
+    elif poblacion_inicial is not None:
+        kwargs_nsga2["sampling"] = np.asarray(poblacion_inicial)
+    algorithm = NSGA2(pop_size=pop_size, eliminate_duplicates=True, **kwargs_nsga2)
+
+    metricas = MetricasConvergencia(frente_referencia=frente_referencia,
+                                    muestras_cada=muestras_cada)
+    guardado = Checkpointer(checkpoint, checkpoint_cada, seed=42, metricas=metricas) if checkpoint else None
+
+    evaluador = None
+    if n_procs and n_procs > 1:
+        evaluador = EvaluadorParalelo(problem, n_procs, modo=modo_paralelo)
+        problem.usar_evaluador(evaluador)
+
+    try:
+        result = ejecutar_nsga2(
+            problem,
+            algorithm,
+            n_gen,
+            seed=42,
+            estado=estado,
+            callback=CadenaCallbacks(metricas, guardado, callback),
+            save_history=(historial == "completo"),
+            metricas=metricas
+        )
+        result.metricas = metricas
+    finally:
+        if evaluador is not None:
+            problem.usar_evaluador(None)
+            evaluador.close()
+
+    result.archivo = None
+    if archivo and result.opt is not None:
+        result.archivo = ArchivoPareto(archivo)
+        X, F, G = result.opt.get("X", "F", "G")
+        if isinstance(problem, ProblemaCandidatos):
+            X = problem.decodificar(X)
+        nuevas = result.archivo.insertar(X, F, G)
+        logger.info(f"🗂️ Frente archivado: {nuevas} soluciones nuevas, "
+                    f"{len(result.archivo)} en {Path(archivo).name}")
 
     if db_config:
         db_manager = DatabaseManager(db_config)
@@ -3,23 +3,27 @@
 # Proyecto Conacyt-Uninter
 # Tutor investigador: Dr. Fabio Lopez 
 # Investigador en formacion: Ing. Eliana Telesca
-# Versión: 1.1
+# Versión: 1.2
 # Descripción:
 #     Define el problema de optimización multiobjetivo para la
 #     asignación de estudiantes a docentes y clases, minimizando
 #     distancias y balanceando cargas.
+#  - Modo vectorizado: evalúa la población completa con NumPy
+#  - Matrices de distancias precalculadas (distance_cache)
 # Dependencias:
-#     numpy, pandas, pymoo, logging
+#     numpy, pandas, pymoo, logging, distance_cache
 # ================================================================
+import time
 import numpy as np
-from pymoo.core.problem import ElementwiseProblem
+from pymoo.core.problem import Problem
 import logging
 import pandas as pd
+from distance_cache import matriz_distancias
 
 logger = logging.getLogger("integrated_problem")
 logger.setLevel(logging.INFO)
 
-class IntegratedProblem(ElementwiseProblem):
+class IntegratedProblem(Problem):
     """
     Decisión:
       - XA: n_estudiantes enteros en [0, n_clases-1]  => estudiante -> clase
@@ -35,9 +39,17 @@ class IntegratedProblem(ElementwiseProblem):
       - g3: Docentes con más de 2 clases asignadas
       - g4: Si un docente tiene 2 clases, turnos deben ser distintos
       - g5: Incompatibilidades grado (estudiante != grado clase)
+    Modos de evaluación:
+      - vectorizado=False: un individuo por llamada (ElementwiseProblem clásico)
+      - vectorizado=True: la población completa por llamada (elementwise=False),
+        mismos valores de F y G que el modo por individuo
+    Distancias:
+      - dist_est_clase (n_est x n_clases) y dist_doc_clase (n_doc x n_clases),
+        float32, calculadas una vez al construir el problema; con cache_dir
+        se guardan/leen como .npy mapeados en memoria
     """
 
-    def __init__(self, estudiantes, docentes, clases):
+    def __init__(self, estudiantes, docentes, clases, vectorizado: bool = False, cache_dir=None):
         if estudiantes.empty or docentes.empty or clases.empty:
             raise ValueError("❌ Los DataFrames de entrada no pueden estar vacíos")
 
@@ -54,6 +66,12 @@ class IntegratedProblem(ElementwiseProblem):
         self.n_estudiantes = len(estudiantes)
         self.n_docentes = len(docentes)
         self.n_clases = len(clases)
+        self.vectorizado = vectorizado
+        self.evaluador = None
+        self.tiempo_evaluacion = 0.0   # segundos acumulados en _evaluate (métricas)
+
+        self._precalcular_arreglos()
+        self._precalcular_distancias(cache_dir)
 
         # Vector de decisión: XA (n_est), XD_class (n_clases)
         n_var = self.n_estudiantes + self.n_clases
@@ -73,7 +91,8 @@ class IntegratedProblem(ElementwiseProblem):
             n_constr=5,
             xl=xl,
             xu=xu,
-            elementwise=True
+            elementwise=not vectorizado,
+            exclude_from_serialization=["evaluador"]
         )
 
     def _validar_dataframes(self, estudiantes, docentes, clases):
@@ -95,7 +114,77 @@ class IntegratedProblem(ElementwiseProblem):
         if errores:
             raise ValueError("❌ " + " | ".join(errores))
 
+    def _precalcular_arreglos(self):
+        """
+        Precalcula los arreglos NumPy usados por la evaluación vectorizada:
+        capacidades y códigos enteros de turno, grado y establecimiento
+        (evita .iloc dentro de la evaluación).
+        """
+        est, cls = self.estudiantes, self.clases
+
+        self._cls_cap = cls["capacidad"].astype(int).to_numpy()
+
+        # Turno: código entero por valor distinto
+        self._cls_turno, turnos = pd.factorize(cls["turno"], use_na_sentinel=False)
+        self._n_turnos = max(1, len(turnos))
+
+        # Grado: mismo código para el mismo texto (sin espacios); -1 si es nulo
+        grados_est = est["grado"].where(est["grado"].isna(), est["grado"].astype(str).str.strip())
+        grados_cls = cls["grado"].where(cls["grado"].isna(), cls["grado"].astype(str).str.strip())
+        codigos, _ = pd.factorize(pd.concat([grados_est, grados_cls], ignore_index=True))
+        self._est_grado = codigos[:self.n_estudiantes]
+        self._cls_grado = codigos[self.n_estudiantes:]
+
+        # Establecimiento: id entero; un código negativo único por clase si es nulo
+        estab = cls["establecimiento_id"]
+        self._cls_estab = np.where(
+            estab.notna().to_numpy(),
+            estab.fillna(0).astype(float).astype(np.int64).to_numpy(),
+            -np.arange(1, self.n_clases + 1, dtype=np.int64)
+        )
+
+    def _precalcular_distancias(self, cache_dir=None):
+        """
+        Construye las matrices de distancias estudiante->clase y
+        docente->clase (km, float32).
+
+        Args:
+            cache_dir (str | Path, opcional): Directorio de caché en disco.
+        """
+        coords_cls = self.clases[["lat", "lng"]].to_numpy(dtype=float)
+        self.dist_est_clase = matriz_distancias(
+            self.estudiantes[["lat", "lng"]].to_numpy(dtype=float), coords_cls,
+            nombre="est_clase", cache_dir=cache_dir
+        )
+        self.dist_doc_clase = matriz_distancias(
+            self.docentes[["lat", "lng"]].to_numpy(dtype=float), coords_cls,
+            nombre="doc_clase", cache_dir=cache_dir
+        )
+
+    def usar_evaluador(self, evaluador):
+        """
+        Delega la evaluación de la población en un evaluador externo
+        (p. ej. EvaluadorParalelo), que recibe X y devuelve (F, G). Mientras
+        está activo se evalúa por población; con None se vuelve al modo
+        elegido al construir el problema.
+
+        Args:
+            evaluador (callable | None): Evaluador de poblaciones o None.
+        """
+        self.evaluador = evaluador
+        self.elementwise = not self.vectorizado if evaluador is None else False
+
     def _evaluate(self, x, out, *args, **kwargs):
+        inicio = time.perf_counter()
+        if self.elementwise:
+            self._evaluar_individuo(x, out)
+        elif self.evaluador is not None:
+            out["F"], out["G"] = self.evaluador(x)
+        else:
+            self._evaluar_poblacion(x, out)
+        self.tiempo_evaluacion += time.perf_counter() - inicio
+
+    def _evaluar_individuo(self, x, out):
         try:
             nE = self.n_estudiantes
             XA = x[:nE].astype(int)              # estudiante -> clase
@@ -153,20 +242,14 @@ class IntegratedProblem(ElementwiseProblem):
             g5 = incompat
 
             # --- FO1: distancias ---
-            dist_est_prom = 0.0
-            for i, clase_idx in enumerate(XA):
-                est = self.estudiantes.iloc[i]
-                cls = self.clases.iloc[clase_idx]
-                dist_est_prom += self._hav((est["lat"], est["lng"]), (cls["lat"], cls["lng"]))
-            dist_est_prom /= max(1, self.n_estudiantes)
+            d_est = self.dist_est_clase[np.arange(nE), XA].astype(float)
+            dist_est_prom = d_est.sum() / max(1, self.n_estudiantes)
 
             total_doc = 0.0
             cnt_doc = 0
             for l in range(self.n_clases):
                 if clase_activa[l] and XD_class[l] < self.n_docentes:
-                    cls = self.clases.iloc[l]
-                    doc = self.docentes.iloc[int(XD_class[l])]
-                    total_doc += self._hav((doc["lat"], doc["lng"]), (cls["lat"], cls["lng"]))
+                    total_doc += float(self.dist_doc_clase[int(XD_class[l]), l])
                     cnt_doc += 1
             dist_doc_prom = total_doc / max(1, cnt_doc)
             F1 = dist_est_prom + dist_doc_prom
@@ -194,13 +277,82 @@ class IntegratedProblem(ElementwiseProblem):
             out["F"] = [1e10, 1e10, 1e10]
             out["G"] = [1e10, 1e10, 1e10, 1e10, 1e10]
 
-    @staticmethod
-    def _hav(loc1, loc2):
-        R = 6371.0
-        lat1, lon1 = np.radians(loc1)
-        lat2, lon2 = np.radians(loc2)
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = np.sin(dlat/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
-        c = 2*np.arctan2(np.sqrt(a), np.sqrt(1-a))
-        return R*c
+    def _evaluar_poblacion(self, X, out):
+        """
+        Evalúa la población completa (una fila por individuo) con operaciones
+        NumPy sobre la matriz de decisión. Reproduce F1-F3 y g1-g5 de
+        _evaluar_individuo.
+        """
+        n_pop = len(X)
+        try:
+            nE, nC, nD = self.n_estudiantes, self.n_clases, self.n_docentes
+            X = np.asarray(X)
+            XA = X[:, :nE].astype(int)              # estudiante -> clase
+            XD_class = X[:, nE:].astype(int)        # docente por clase (nD = sin docente)
+            filas = np.arange(n_pop)[:, None]
+
+            # --- Cargas por clase y activación ---
+            clase_alumnos = np.bincount(
+                (filas * nC + XA).ravel(), minlength=n_pop * nC
+            ).reshape(n_pop, nC)
+            clase_activa = clase_alumnos > 0
+            con_docente = XD_class < nD
+
+            # --- g1: capacidad ---
+            g1 = np.maximum(0, clase_alumnos - self._cls_cap).sum(axis=1)
+
+            # --- g2: clase activa sin docente ---
+            g2 = (clase_activa & ~con_docente).sum(axis=1)
+
+            # --- g3: máx 2 clases por docente (columna nD = sin docente) ---
+            clases_por_docente = np.bincount(
+                (filas * (nD + 1) + XD_class).ravel(), minlength=n_pop * (nD + 1)
+            ).reshape(n_pop, nD + 1)[:, :nD]
+            g3 = np.maximum(0, clases_por_docente - 2).sum(axis=1)
+
+            # --- g4: turno repetido entre las clases de un docente ---
+            nT = self._n_turnos
+            turnos = np.broadcast_to(self._cls_turno, XD_class.shape)
+            hist_turno = np.bincount(
+                ((filas * (nD + 1) + XD_class) * nT + turnos).ravel(),
+                minlength=n_pop * (nD + 1) * nT
+            ).reshape(n_pop, nD + 1, nT)[:, :nD, :]
+            g4 = (hist_turno >= 2).any(axis=2).sum(axis=1)
+
+            # --- g5: compatibilidad grado ---
+            grado_c = self._cls_grado[XA]
+            g5 = ((self._est_grado >= 0) & (grado_c >= 0) & (self._est_grado != grado_c)).sum(axis=1)
+
+            # --- FO1: distancias ---
+            d_est = self.dist_est_clase[np.arange(nE), XA].astype(float)
+            dist_est_prom = d_est.sum(axis=1) / max(1, nE)
+
+            doc_idx = np.where(con_docente, XD_class, 0)
+            d_doc = self.dist_doc_clase[doc_idx, np.arange(nC)].astype(float)
+            activas_doc = clase_activa & con_docente
+            total_doc = np.where(activas_doc, d_doc, 0.0).sum(axis=1)
+            cnt_doc = activas_doc.sum(axis=1)
+            F1 = dist_est_prom + total_doc / np.maximum(1, cnt_doc)
+
+            # --- FO2: balance ---
+            F2 = np.std(clase_alumnos, axis=1)
+
+            # --- FO3: docentes con 2 clases en el mismo establecimiento ---
+            claves = (filas * (nD + 1) + XD_class).ravel()
+            estab = np.broadcast_to(self._cls_estab, XD_class.shape).ravel()
+            est_min = np.full(n_pop * (nD + 1), np.iinfo(np.int64).max, dtype=np.int64)
+            est_max = np.full(n_pop * (nD + 1), np.iinfo(np.int64).min, dtype=np.int64)
+            np.minimum.at(est_min, claves, estab)
+            np.maximum.at(est_max, claves, estab)
+            est_min = est_min.reshape(n_pop, nD + 1)[:, :nD]
+            est_max = est_max.reshape(n_pop, nD + 1)[:, :nD]
+            same_school = ((clases_por_docente == 2) & (est_min == est_max) & (est_min >= 0)).sum(axis=1)
+            F3 = - (same_school / max(1, nD))
+
+            out["F"] = np.column_stack([F1, F2, F3]).astype(float)
+            out["G"] = np.column_stack([g1, g2, g3, g4, g5]).astype(float)
+
+        except Exception as e:
+            logger.error(f"❌ Error en evaluación vectorizada: {e}", exc_info=True)
+            out["F"] = np.full((n_pop, 3), 1e10)
+            out["G"] = np.full((n_pop, 5), 1e10)
@@ -3,12 +3,16 @@
 # Proyecto Conacyt-Uninter
 # Tutor investigador: Dr. Fabio Lopez
 # Investigador en formación: Ing. Eliana Telesca
-# Versión: 1.2
+# Versión: 1.3
 #  - Filtros + tabla + mapa en Optimización
+#  - Filtros y paginación resueltos en SQL (consultas parametrizadas)
+#  - Excel de la página o, bajo demanda, de todo lo filtrado (por bloques)
+#  - Mapas con agregación en grilla por zoom por encima de un umbral de puntos
+#  - Resúmenes por clase/docente en resumenes.py (vectorizados)
+#  - Optimización como trabajo en segundo plano (progreso, cancelación, cola)
 #  - Fix turno string/int, width="stretch" en dataframes
 # ================================================================
 
-import platform
 import numpy as np
 import pandas as pd
 import streamlit as st
@@ -16,11 +20,14 @@ import folium
 from folium.plugins import MarkerCluster
 from streamlit_folium import st_folium
 from io import BytesIO
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from integrated_problem import IntegratedProblem
-from integrated_optimization import run_integrated_optimization, select_best_individual
+from distance_cache import CACHE_DIR
+import trabajos
 from database import cargar_datos_desde_db, engine
+from resumenes import build_summaries, kpis_globales
 
 # ================================
 # CONFIGURACIÓN INICIAL
@@ -31,32 +38,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# ================================
-# UTILIDADES DE TURNO (robustas)
-# ================================
-TURNOS_TO_ID = {
-    "mañana": 0, "tarde": 1, "noche": 2,
-    "manana": 0,               # sin tilde
-    0: 0, 1: 1, 2: 2
-}
-ID_TO_TURNO = {0: "Mañana", 1: "Tarde", 2: "Noche"}
-
-def to_turno_id(x):
-    if pd.isna(x):
-        return 0
-    if isinstance(x, (int, np.integer)):
-        return TURNOS_TO_ID.get(int(x), 0)
-    s = str(x).strip().lower()
-    return TURNOS_TO_ID.get(s, 0)
-
-def turno_label(x):
-    return ID_TO_TURNO.get(to_turno_id(x), str(x))
-
-def turno_color(turno_text: str):
-    """Color estable por turno (para líneas)."""
-    t = to_turno_id(turno_text)
-    return {0: "blue", 1: "orange", 2: "purple"}.get(t, "blue")
-
 # ================================
 # CARGA INICIAL DE DATOS (CACHÉ)
 # ================================
@@ -70,174 +51,367 @@ if estudiantes.empty or docentes.empty or clases.empty:
     st.stop()
 
 # ================================
-# CARGAR ASIGNACIONES (dos formatos)
+# CARGAR ASIGNACIONES (filtradas y paginadas en la BD)
 # ================================
+FROM_ASIGNACIONES = """
+    FROM asignacion_mec a
+    JOIN estudiantes e     ON a.estudiante_id      = e.id
+    JOIN docentes d        ON a.docente_id         = d.id
+    JOIN establecimientos es ON a.establecimiento_id = es.id
+    JOIN instituciones i   ON es.institucion_id    = i.id
+"""
+
+COLUMNAS_SIMPLE = """
+    a.id,
+    e.nombre AS estudiante,
+    d.nombre AS docente,
+    i.nombre AS institucion,
+    a.grado,
+    a.seccion,
+    a.turno,
+    a.distancia
+"""
+
+COLUMNAS_FULL = """
+    a.id,
+    a.grado, a.seccion, a.turno, a.distancia,
+    -- Estudiante (origen)
+    e.id        AS estudiante_id,
+    e.nombre    AS estudiante,
+    e.departamento AS est_departamento,
+    e.localidad AS est_localidad,
+    e.barrio    AS est_barrio,
+    e.lat       AS est_lat,
+    e.lng       AS est_lng,
+    -- Docente
+    d.id        AS docente_id,
+    d.nombre    AS docente,
+    d.departamento AS doc_departamento,
+    d.localidad AS doc_localidad,
+    d.barrio    AS doc_barrio,
+    d.lat       AS doc_lat,
+    d.lng       AS doc_lng,
+    -- Establecimiento / Institución (destino)
+    es.id       AS establecimiento_id,
+    es.lat      AS estb_lat,
+    es.lng      AS estb_lng,
+    i.id        AS institucion_id,
+    i.nombre    AS institucion,
+    i.departamento AS inst_departamento,
+    i.localidad AS inst_localidad,
+    i.barrio    AS inst_barrio
+"""
+
+# Filtro de la UI -> columna SQL (los valores siempre van como parámetros)
+COLUMNAS_FILTRO = {
+    "departamento": "i.departamento",
+    "localidad": "i.localidad",
+    "turno": "a.turno",
+    "institucion": "i.nombre",
+}
+
+def where_filtros(filtros: tuple):
+    """
+    Arma la cláusula WHERE parametrizada.
+    filtros: tupla de pares (clave, valor) con claves de COLUMNAS_FILTRO;
+    se omiten los valores None/"Todos".
+    """
+    condiciones, params = [], {}
+    for clave, valor in filtros:
+        if valor is None or valor == "Todos":
+            continue
+        condiciones.append(f"{COLUMNAS_FILTRO[clave]} = :{clave}")
+        params[clave] = valor
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, params
+
 @st.cache_data(ttl=600)
-def cargar_asignaciones_simple():
+def contar_asignaciones(filtros: tuple = ()):
+    where, params = where_filtros(filtros)
     try:
-        return pd.read_sql("""
-            SELECT 
-                a.id,
-                e.nombre AS estudiante,
-                d.nombre AS docente,
-                i.nombre AS institucion,
-                a.grado,
-                a.seccion,
-                a.turno,
-                a.distancia
-            FROM asignacion_mec a
-            JOIN estudiantes e ON a.estudiante_id = e.id
-            JOIN docentes d ON a.docente_id = d.id
-            JOIN establecimientos es ON a.establecimiento_id = es.id
-            JOIN instituciones i ON es.institucion_id = i.id
+        with engine.connect() as conn:
+            return int(conn.execute(text(f"SELECT COUNT(*) {FROM_ASIGNACIONES} {where}"), params).scalar())
+    except SQLAlchemyError as e:
+        st.error(f"❌ Error contando asignaciones: {e}")
+        return 0
+
+@st.cache_data(ttl=600)
+def cargar_asignaciones_simple(limite: int = 100, offset: int = 0):
+    """Una página de asignaciones (id descendente)."""
+    try:
+        return pd.read_sql(text(f"""
+            SELECT {COLUMNAS_SIMPLE}
+            {FROM_ASIGNACIONES}
             ORDER BY a.id DESC
-        """, engine)
+            LIMIT :limite OFFSET :offset
+        """), engine, params={"limite": limite, "offset": offset})
     except SQLAlchemyError as e:
         st.error(f"❌ Error cargando asignaciones: {e}")
         return pd.DataFrame()
 
 @st.cache_data(ttl=600)
-def cargar_asignaciones_full():
-    """Incluye coordenadas para trazar líneas y filtros por destino."""
+def cargar_asignaciones_full(filtros: tuple = (), limite: int = 100, offset: int = 0):
+    """Una página filtrada, con coordenadas para el mapa y filtros por destino."""
+    where, params = where_filtros(filtros)
     try:
-        return pd.read_sql("""
-            SELECT 
-                a.id,
-                a.grado, a.seccion, a.turno, a.distancia,
-                -- Estudiante (origen)
-                e.id        AS estudiante_id,
-                e.nombre    AS estudiante,
-                e.departamento AS est_departamento,
-                e.localidad AS est_localidad,
-                e.barrio    AS est_barrio,
-                e.lat       AS est_lat,
-                e.lng       AS est_lng,
-                -- Docente
-                d.id        AS docente_id,
-                d.nombre    AS docente,
-                d.departamento AS doc_departamento,
-                d.localidad AS doc_localidad,
-                d.barrio    AS doc_barrio,
-                d.lat       AS doc_lat,
-                d.lng       AS doc_lng,
-                -- Establecimiento / Institución (destino)
-                es.id       AS establecimiento_id,
-                es.lat      AS estb_lat,
-                es.lng      AS estb_lng,
-                i.id        AS institucion_id,
-                i.nombre    AS institucion,
-                i.departamento AS inst_departamento,
-                i.localidad AS inst_localidad,
-                i.barrio    AS inst_barrio
-            FROM asignacion_mec a
-            JOIN estudiantes e     ON a.estudiante_id      = e.id
-            JOIN docentes d        ON a.docente_id         = d.id
-            JOIN establecimientos es ON a.establecimiento_id = es.id
-            JOIN instituciones i   ON es.institucion_id    = i.id
+        return pd.read_sql(text(f"""
+            SELECT {COLUMNAS_FULL}
+            {FROM_ASIGNACIONES}
+            {where}
             ORDER BY a.id DESC
-        """, engine)
+            LIMIT :limite OFFSET :offset
+        """), engine, params={**params, "limite": limite, "offset": offset})
     except SQLAlchemyError as e:
         st.error(f"❌ Error cargando asignaciones (full): {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=600)
+def opciones_filtros():
+    """Valores distintos para los selectbox (solo instituciones con asignaciones)."""
+    try:
+        return pd.read_sql("""
+            SELECT DISTINCT i.departamento, i.localidad, i.nombre AS institucion
+            FROM instituciones i
+            WHERE EXISTS (
+                SELECT 1 FROM establecimientos es
+                JOIN asignacion_mec a ON a.establecimiento_id = es.id
+                WHERE es.institucion_id = i.id
+            )
+        """, engine)
+    except SQLAlchemyError as e:
+        st.error(f"❌ Error cargando filtros: {e}")
+        return pd.DataFrame(columns=["departamento", "localidad", "institucion"])
+
+def paginador(total: int, key: str):
+    """Selector de tamaño y número de página; devuelve (limite, offset)."""
+    c1, c2, c3 = st.columns([1, 1, 2])
+    limite = c1.selectbox("Filas por página", [50, 100, 250, 500], index=1, key=f"{key}_limite")
+    paginas = max(1, -(-total // limite))
+    pagina = c2.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key=f"{key}_pagina")
+    c3.caption(f"{total} asignaciones · página {pagina} de {paginas}")
+    return limite, (int(pagina) - 1) * limite
+
 # ================================
 # EXPORTAR A EXCEL
 # ================================
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+FILAS_POR_HOJA = 1_048_575   # límite de filas de una hoja de Excel (sin el encabezado)
+
 def exportar_excel(df: pd.DataFrame) -> bytes:
     output = BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
         df.to_excel(writer, index=False, sheet_name="Asignaciones")
     return output.getvalue()
 
-# ================================
-# HELPERS RESÚMENES (KPIs)
-# ================================
-def build_summaries(problem: IntegratedProblem, best_X: np.ndarray):
+def exportar_excel_consulta(filtros: tuple = (), chunksize: int = 50000):
     """
-    Cromosoma:
-      - best_X = [ XA(0..N-1), XD_class(0..C-1) ]
-    Devuelve: df_classes, df_teachers
+    Excel con todas las asignaciones que cumplen los filtros (COLUMNAS_SIMPLE),
+    leídas de la BD en bloques de `chunksize` filas que se escriben a medida
+    en la hoja; al llegar al límite de filas de Excel sigue en otra hoja.
+    Devuelve None si falla la consulta.
     """
-    N = problem.n_estudiantes
-    C = problem.n_clases
-
-    XA = best_X[:N].astype(int)          # estudiante -> clase
-    XD_class = best_X[N:].astype(int)    # docente por clase
+    where, params = where_filtros(filtros)
+    output = BytesIO()
+    try:
+        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+            hoja, fila = 1, 0
+            for bloque in pd.read_sql(text(f"""
+                SELECT {COLUMNAS_SIMPLE}
+                {FROM_ASIGNACIONES}
+                {where}
+                ORDER BY a.id DESC
+            """), engine, params=params, chunksize=chunksize):
+                while len(bloque):
+                    if fila == FILAS_POR_HOJA:
+                        hoja, fila = hoja + 1, 0
+                    parte = bloque.iloc[:FILAS_POR_HOJA - fila]
+                    bloque = bloque.iloc[len(parte):]
+                    nombre = "Asignaciones" if hoja == 1 else f"Asignaciones {hoja}"
+                    parte.to_excel(writer, index=False, sheet_name=nombre,
+                                   header=(fila == 0), startrow=fila + (fila > 0))
+                    fila += len(parte)
+            if hoja == 1 and fila == 0:
+                pd.DataFrame().to_excel(writer, index=False, sheet_name="Asignaciones")
+    except SQLAlchemyError as e:
+        st.error(f"❌ Error exportando asignaciones: {e}")
+        return None
+    return output.getvalue()
 
-    class_load = np.bincount(XA, minlength=C)
-    docente_por_clase = XD_class.copy()
-    tiene_docente = docente_por_clase < problem.n_docentes
-    docentes_unicos = tiene_docente.astype(int)
+def boton_exportar_todo(filtros: tuple, nombre_archivo: str, key: str):
+    """
+    Exportación bajo demanda de todas las asignaciones filtradas (no solo la
+    página): el Excel se arma al pulsar el botón y se ofrece mientras no
+    cambien los filtros.
+    """
+    if st.button("📦 Preparar Excel con todas las asignaciones filtradas", key=f"{key}_preparar"):
+        with st.spinner("Exportando asignaciones..."):
+            st.session_state[key] = (filtros, exportar_excel_consulta(filtros))
+    preparado = st.session_state.get(key)
+    if preparado is not None and preparado[0] == filtros and preparado[1] is not None:
+        st.download_button(
+            label="📥 Descargar todas las asignaciones",
+            data=preparado[1],
+            file_name=nombre_archivo,
+            mime=MIME_EXCEL,
+            key=f"{key}_descargar"
+        )
 
-    cls_df = problem.clases.reset_index(drop=True).copy()
+# ================================
+# MAPAS (agregación por grilla según zoom)
+# ================================
+CENTRO_MAPA = [-25.3, -57.6]
+ZOOM_INICIAL = 7
+UMBRAL_MARCADORES = 1500   # por capa y dentro de la vista; por encima se agrega en grilla
+PIXELES_CELDA = 64         # tamaño aproximado de cada celda agregada en pantalla
 
-    if hasattr(problem, "cap_min") and problem.cap_min is not None:
-        cap_min = np.asarray(problem.cap_min, dtype=int)
-    elif "cap_min" in cls_df.columns:
-        cap_min = cls_df["cap_min"].fillna(0).astype(int).values
-    else:
-        cap_min = np.zeros(C, dtype=int)
+def vista_mapa(key: str):
+    """
+    Centro/zoom/bounds actuales del mapa `key`. st_folium guarda su último
+    valor en st.session_state[key] antes de la recarga que dispara un
+    movimiento o zoom, así el mapa se arma ya con la vista nueva.
+    """
+    salida = st.session_state.get(key) or {}
+    centro = salida.get("center") or {}
+    return {
+        "center": [centro.get("lat", CENTRO_MAPA[0]), centro.get("lng", CENTRO_MAPA[1])],
+        "zoom": int(salida.get("zoom") or ZOOM_INICIAL),
+        "bounds": salida.get("bounds"),
+    }
+
+def dentro_de_vista(lat: np.ndarray, lng: np.ndarray, bounds) -> np.ndarray:
+    """Máscara de puntos dentro de los bounds (con un margen de media vista)."""
+    ok = ~(np.isnan(lat) | np.isnan(lng))
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        dlat = (ne["lat"] - sw["lat"]) / 2
+        dlng = (ne["lng"] - sw["lng"]) / 2
+        ok &= (lat >= sw["lat"] - dlat) & (lat <= ne["lat"] + dlat)
+        ok &= (lng >= sw["lng"] - dlng) & (lng <= ne["lng"] + dlng)
+    except (TypeError, KeyError):
+        pass
+    return ok
+
+def agregar_en_grilla(lat: np.ndarray, lng: np.ndarray, zoom: int):
+    """
+    Agrupa los puntos en celdas de ~PIXELES_CELDA px para el zoom dado.
+    Devuelve (lat_media, lng_media, cantidad) por celda no vacía.
+    """
+    celda = 360.0 / (2 ** zoom) * PIXELES_CELDA / 256.0
+    fila = np.floor(lat / celda).astype(np.int64)
+    col = np.floor(lng / celda).astype(np.int64)
+    _, grupo, cantidad = np.unique(np.stack([fila, col], axis=1), axis=0,
+                                   return_inverse=True, return_counts=True)
+    grupo = grupo.ravel()
+    lat_m = np.bincount(grupo, weights=lat) / cantidad
+    lng_m = np.bincount(grupo, weights=lng) / cantidad
+    return lat_m, lng_m, cantidad
+
+def capa_puntos(mapa, lat, lng, etiquetas, nombre: str, color: str, vista: dict,
+                icono: str = None, umbral: int = UMBRAL_MARCADORES):
+    """
+    Agrega al mapa una capa con los puntos visibles: marcadores individuales
+    (agrupados con MarkerCluster) si son pocos, o círculos por celda de
+    grilla con la cantidad de puntos si superan el umbral.
+    """
+    lat = pd.to_numeric(pd.Series(lat), errors="coerce").to_numpy(dtype=float)
+    lng = pd.to_numeric(pd.Series(lng), errors="coerce").to_numpy(dtype=float)
+    etiquetas = np.asarray(etiquetas, dtype=object)
+    visibles = dentro_de_vista(lat, lng, vista["bounds"])
+    lat, lng, etiquetas = lat[visibles], lng[visibles], etiquetas[visibles]
+
+    capa = folium.FeatureGroup(name=f"{nombre} ({len(lat)})").add_to(mapa)
+    if len(lat) <= umbral:
+        cluster = MarkerCluster().add_to(capa)
+        for la, ln, txt in zip(lat, lng, etiquetas):
+            if icono:
+                folium.Marker([la, ln], popup=txt,
+                              icon=folium.Icon(color=color, icon=icono)).add_to(cluster)
+            else:
+                folium.CircleMarker([la, ln], radius=3, color=color, fill=True,
+                                    fill_opacity=0.8, popup=txt).add_to(cluster)
+        return
+
+    for la, ln, n in zip(*agregar_en_grilla(lat, lng, vista["zoom"])):
+        folium.CircleMarker(
+            [la, ln], radius=float(4 + 3 * np.log2(n)), color=color, weight=1,
+            fill=True, fill_opacity=0.5, tooltip=f"{nombre}: {n}",
+        ).add_to(capa)
+
+def nuevo_mapa(vista: dict):
+    return folium.Map(location=vista["center"], zoom_start=vista["zoom"])
 
-    if hasattr(problem, "cap_max") and problem.cap_max is not None:
-        cap_max = np.asarray(problem.cap_max, dtype=int)
-    elif "capacidad" in cls_df.columns:
-        cap_max = cls_df["capacidad"].fillna(10**9).astype(int).values
+# ================================
+# TRABAJOS EN SEGUNDO PLANO
+# ================================
+@st.cache_resource
+def gestor_trabajos():
+    """Un único pool de trabajos por servidor, compartido por todas las sesiones."""
+    return trabajos.GestorTrabajos()
+
+@st.fragment(run_every=2)
+def seguir_trabajo(trabajo_id: str):
+    """Consulta el progreso cada 2 s; al terminar recarga la página completa."""
+    trabajo = trabajos.obtener(trabajo_id)
+    if trabajo is None or trabajo["estado"] not in trabajos.ACTIVOS:
+        st.rerun(scope="app")
+
+    n_gen = trabajo["n_gen"] or 1
+    gen = trabajo["gen_actual"] or 0
+    if trabajo["estado"] == trabajos.EN_COLA:
+        st.info("⏳ Optimización en cola, espera por favor...")
     else:
-        cap_max = np.full(C, 10**9, dtype=int)
-
-    viol_min = np.maximum(0, cap_min - class_load)
-    viol_max = np.maximum(0, class_load - cap_max)
-    ok = (viol_min == 0) & (viol_max == 0) & tiene_docente
-
-    if "turno" in cls_df.columns and not np.issubdtype(cls_df["turno"].dtype, np.number):
-        turnos_id = cls_df["turno"].map(to_turno_id).astype(int).values
+        st.progress(min(gen / n_gen, 1.0), text=f"⏳ Generación {gen}/{n_gen}")
+    if trabajo["cv_min"] is not None:
+        st.caption(f"Factibilidad (población actual): "
+                   f"cv_min={trabajo['cv_min']:.2f} | cv_avg={trabajo['cv_avg']:.2f} | "
+                   f"factibles={trabajo['factibles']}/{trabajo['n_pop']}")
+    if trabajo["mejor_f"]:
+        st.caption("Mejor F por objetivo: " + " | ".join(
+            f"f{i}={v:.4f}" for i, v in enumerate(trabajo["mejor_f"])))
+    if st.button("Cancelar optimización", key=f"cancelar_{trabajo_id}"):
+        trabajos.solicitar_cancelacion(trabajo_id)
+        st.toast("🛑 Cancelación solicitada; se detiene al terminar la generación en curso.")
+
+def mostrar_resultados(trabajo: dict):
+    """KPIs y resúmenes de la mejor solución de un trabajo completado."""
+    best_X, best_F, metricas = trabajos.cargar_resultado(trabajo["id"])
+
+    # KPIs
+    st.subheader("📊 Mejor solución")
+    if best_F is not None:
+        cols = st.columns(min(len(best_F), 4))
+        for i, v in enumerate(best_F[:4]):
+            cols[i].metric(f"f{i}", f"{v:.4f}")
     else:
-        turnos_id = cls_df.get("turno", pd.Series([0]*C)).fillna(0).astype(int).values
-
-    df_classes = pd.DataFrame({
-        "clase_id": cls_df["id"].values if "id" in cls_df.columns else np.arange(C),
-        "establecimiento_id": cls_df.get("establecimiento_id", pd.Series([-1]*C)).values,
-        "turno": [turno_label(t) for t in turnos_id],
-        "cap_min": cap_min,
-        "cap_max": cap_max,
-        "carga_est": class_load,
-        "docente_asignado_idx": docente_por_clase,
-        "docentes_unicos": docentes_unicos,
-        "tiene_docente": tiene_docente,
-        "viol_min": viol_min,
-        "viol_max": viol_max,
-        "ok": ok
-    }).sort_values(by=["ok", "viol_max", "viol_min"], ascending=[True, False, False]).reset_index(drop=True)
-
-    estab_por_clase = cls_df.get("establecimiento_id", pd.Series([0]*C)).values
-    rows = []
-    for j in range(problem.n_docentes):
-        cls_set = {int(c) for c in range(C) if docente_por_clase[c] == j}
-        k = len(cls_set)
-
-        turns = sorted({int(turnos_id[c]) for c in cls_set})
-        rep_turno = 0
-        for t in (0, 1, 2):
-            rep = sum(1 for c in cls_set if int(turnos_id[c]) == t)
-            if rep > 1:
-                rep_turno += (rep - 1)
-
-        estabs = sorted({int(estab_por_clase[c]) for c in cls_set}) if k > 0 else []
-        rows.append({
-            "docente_id": j,
-            "n_clases_asignadas": k,
-            "turnos": ", ".join(turno_label(t) for t in turns) if turns else "",
-            "rep_turno": rep_turno,
-            "mas_de_2_clases": max(0, k - 2),
-            "establecimientos_distintos": len(estabs),
-        })
-
-    df_teachers = pd.DataFrame(rows).sort_values(
-        by=["mas_de_2_clases", "rep_turno", "n_clases_asignadas"],
-        ascending=[False, False, False]
-    ).reset_index(drop=True)
-
-    return df_classes, df_teachers
+        st.info("Se seleccionó la mejor solución por menor violación de restricciones (F no disponible).")
+
+    # Resúmenes (métricas por generación registradas durante la ejecución)
+    if not metricas.empty:
+        ultima = metricas.iloc[-1]
+        st.caption(f"Factibilidad (población final): "
+                   f"cv_min={ultima['cv_min']:.2f} | cv_avg={ultima['cv_avg']:.2f} | "
+                   f"factibles={int(ultima['factibles'])}/{int(ultima['n_pop'])}")
+        with st.expander("📈 Convergencia por generación"):
+            conv = metricas.set_index("n_gen")
+            if conv["hv"].notna().any():
+                st.line_chart(conv[["hv"]])
+            st.line_chart(conv[["cv_min", "cv_avg"]])
+            st.dataframe(metricas, width="stretch", height=240)
+
+    problem = IntegratedProblem(estudiantes, docentes, clases, cache_dir=CACHE_DIR)
+    df_classes, df_teachers = build_summaries(problem, best_X)
+
+    st.subheader("🏫 Resumen por Clase")
+    st.dataframe(df_classes, width="stretch", height=320)
+
+    kpis = kpis_globales(df_classes, df_teachers)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Alumnos faltantes bajo mínimo", f"{kpis['alumnos_bajo_minimo']}")
+    c2.metric("Alumnos excedidos sobre máximo", f"{kpis['alumnos_sobre_maximo']}")
+    c3.metric("Clases con alumnos sin docente", f"{kpis['clases_sin_docente']}")
+
+    st.subheader("👩‍🏫 Resumen por Docente")
+    st.dataframe(df_teachers, width="stretch", height=280)
 
 # ================================
 # UI CON TABS
@@ -249,48 +423,44 @@ tabs = st.tabs(["🔍 Visualización Actual", "🚀 Optimización"])
 # -------------------------------
 with tabs[0]:
     st.success(f"✅ Datos cargados: {len(estudiantes)} estudiantes, {len(docentes)} docentes, {len(clases)} clases")
-    asignaciones = cargar_asignaciones_simple()
 
     st.subheader("📋 Asignaciones Actuales")
+    limite, offset = paginador(contar_asignaciones(), key="pag_actual")
+    asignaciones = cargar_asignaciones_simple(limite, offset)
     st.dataframe(asignaciones, width="stretch", height=420)
 
     excel_bytes = exportar_excel(asignaciones)
     st.download_button(
-        label="📥 Exportar Asignaciones a Excel",
+        label="📥 Exportar página a Excel",
         data=excel_bytes,
         file_name="asignaciones_actuales.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        mime=MIME_EXCEL
     )
+    boton_exportar_todo((), "asignaciones_actuales_completo.xlsx", key="excel_actual")
 
     st.subheader("🗺️ Mapa de Estudiantes, Docentes e Instituciones")
-    mapa = folium.Map(location=[-25.3, -57.6], zoom_start=7)
-    marker_cluster = MarkerCluster().add_to(mapa)
-
-    for _, est in estudiantes.iterrows():
-        folium.Marker(
-            [est["lat"], est["lng"]],
-            popup=f"🎓 Estudiante: {est.get('nombre', est.get('id', ''))}",
-            icon=folium.Icon(color="blue", icon="user"),
-        ).add_to(marker_cluster)
-
-    for _, doc in docentes.iterrows():
-        folium.Marker(
-            [doc["lat"], doc["lng"]],
-            popup=f"👩‍🏫 Docente: {doc.get('nombre', doc.get('id', ''))}",
-            icon=folium.Icon(color="green", icon="user"),
-        ).add_to(marker_cluster)
+    umbral = st.number_input("Máx. marcadores individuales por capa", 100, 20000,
+                             UMBRAL_MARCADORES, step=100, key="umbral_mapas")
+    vista = vista_mapa("mapa_actual")
+    mapa = nuevo_mapa(vista)
+
+    capa_puntos(mapa, estudiantes["lat"], estudiantes["lng"],
+                "🎓 Estudiante: " + estudiantes["nombre"].astype(str),
+                "Estudiantes", "blue", vista, icono="user", umbral=umbral)
+    capa_puntos(mapa, docentes["lat"], docentes["lng"],
+                "👩‍🏫 Docente: " + docentes["nombre"].astype(str),
+                "Docentes", "green", vista, icono="user", umbral=umbral)
 
     if {"lat", "lng"}.issubset(clases.columns):
-        for _, cls in clases.iterrows():
-            folium.Marker(
-                [cls["lat"], cls["lng"]],
-                popup=(f"🏫 {cls.get('nombre_institucion', '')}<br>"
-                       f"Grado: {cls.get('grado', '')}<br>"
-                       f"Turno: {cls.get('turno', '')}"),
-                icon=folium.Icon(color="red", icon="education"),
-            ).add_to(marker_cluster)
+        capa_puntos(mapa, clases["lat"], clases["lng"],
+                    ("🏫 " + clases["nombre_institucion"].astype(str)
+                     + "<br>Grado: " + clases["grado"].astype(str)
+                     + "<br>Turno: " + clases["turno"].astype(str)),
+                    "Clases", "red", vista, icono="education", umbral=umbral)
 
-    st_folium(mapa, width=1000, height=500, key="mapa_actual")
+    folium.LayerControl().add_to(mapa)
+    st_folium(mapa, width=1000, height=500, key="mapa_actual",
+              returned_objects=["center", "zoom", "bounds"])
 
 # -------------------------------
 # 2) OPTIMIZACIÓN
@@ -301,141 +471,106 @@ with tabs[1]:
     # Sliders
     pop_size  = st.slider("Tamaño de población", 10, 200, 50)
     n_gen     = st.slider("Generaciones", 10, 200, 30)
-    n_jobs_ui = st.slider("Procesos paralelos (solo Linux/macOS)", 1, 8, 1)
+    n_jobs    = st.slider("Procesos paralelos", 1, 8, 1)
 
-    # Forzar n_jobs=1 en Windows/Streamlit para evitar 'ReleaseSemaphore failed'
-    n_jobs = 1 if platform.system() == "Windows" else n_jobs_ui
-    if platform.system() == "Windows" and n_jobs_ui != 1:
-        st.info("ℹ️ En Windows + Streamlit, se fuerza n_jobs=1 para evitar errores de semáforo del sistema.")
+    # El trabajo corre en su propio proceso: ahí la evaluación paralela puede usar fork
+    if n_jobs > 1:
+        st.caption("ℹ️ La evaluación paralela usa procesos en Linux e hilos en Windows/macOS.")
 
     # Estado para mostrar resultados
-    if "asignaciones_opt_full" not in st.session_state:
-        st.session_state.asignaciones_opt_full = pd.DataFrame()
+    if "hay_resultados_opt" not in st.session_state:
+        st.session_state.hay_resultados_opt = False
 
-    # Botón ejecutar
+    # Botón ejecutar: encola el trabajo y vuelve enseguida
     if st.button("Ejecutar Optimización", type="primary", use_container_width=True):
-        with st.status("⏳ Ejecutando optimización, espera por favor...", expanded=False) as status:
-            try:
-                problem = IntegratedProblem(estudiantes, docentes, clases)
-                result = run_integrated_optimization(
-                    problem, pop_size, n_gen, n_jobs,
-                    db_config={"user": "postgres","password": "Admin.123","host": "localhost","port": "5432","database": "Asignacion_MEC"}
-                )
-                best_idx, best_X, best_F = select_best_individual(result)
-
-                status.update(label="✅ Optimización completada", state="complete")
-                st.success("Optimización finalizada y resultados guardados en la BD.")
-
-                # KPIs
-                st.subheader("📊 Mejor solución")
-                if best_F is not None:
-                    cols = st.columns(min(len(best_F), 4))
-                    for i, v in enumerate(best_F[:4]):
-                        cols[i].metric(f"f{i}", f"{v:.4f}")
-                else:
-                    st.info("Se seleccionó la mejor solución por menor violación de restricciones (F no disponible).")
-
-                # Resúmenes
-                pop = getattr(result, "pop", None)
-                if pop is None and getattr(result, "history", None):
-                    pop = result.history[-1].pop
-                if pop is not None and pop.get("G") is not None:
-                    G = pop.get("G")
-                    cv = np.maximum(0, G).sum(axis=1)
-                    st.caption(f"Factibilidad (población final): "
-                               f"cv_min={cv.min():.2f} | cv_avg={cv.mean():.2f} | factibles={(cv==0).sum()}/{len(cv)}")
-
-                df_classes, df_teachers = build_summaries(problem, best_X)
-
-                st.subheader("🏫 Resumen por Clase")
-                st.dataframe(df_classes, width="stretch", height=320)
-
-                total_viol_min = int(df_classes["viol_min"].sum())
-                total_viol_max = int(df_classes["viol_max"].sum())
-                sin_docente = int((~df_classes["tiene_docente"] & (df_classes["carga_est"] > 0)).sum())
-                c1, c2, c3 = st.columns(3)
-                c1.metric("Alumnos faltantes bajo mínimo", f"{total_viol_min}")
-                c2.metric("Alumnos excedidos sobre máximo", f"{total_viol_max}")
-                c3.metric("Clases con alumnos sin docente", f"{sin_docente}")
-
-                st.subheader("👩‍🏫 Resumen por Docente")
-                st.dataframe(df_teachers, width="stretch", height=280)
-
-                # Cargar asignaciones optimizadas
-                st.session_state.asignaciones_opt_full = cargar_asignaciones_full()
-
-            except Exception as e:
-                status.update(label="❌ Error durante la optimización", state="error")
-                st.error(f"❌ Error durante la optimización: {e}")
+        st.session_state.trabajo_id = gestor_trabajos().lanzar({
+            "pop_size": pop_size, "n_gen": n_gen, "n_procs": n_jobs
+        })
+        st.session_state.trabajo_mostrado = None
+
+    trabajo_id = st.session_state.get("trabajo_id")
+    trabajo = trabajos.obtener(trabajo_id) if trabajo_id else None
+
+    if trabajo is not None and trabajo["estado"] in trabajos.ACTIVOS:
+        seguir_trabajo(trabajo_id)
+    elif trabajo is not None and trabajo["estado"] == trabajos.COMPLETADO:
+        st.success("Optimización finalizada y resultados guardados en la BD.")
+        if st.session_state.get("trabajo_mostrado") != trabajo_id:
+            # Las asignaciones optimizadas se leen de la BD por página
+            contar_asignaciones.clear()
+            cargar_asignaciones_simple.clear()
+            cargar_asignaciones_full.clear()
+            opciones_filtros.clear()
+            st.session_state.hay_resultados_opt = True
+            st.session_state.trabajo_mostrado = trabajo_id
+        try:
+            mostrar_resultados(trabajo)
+        except Exception as e:
+            st.error(f"❌ No se pudieron mostrar los resultados: {e}")
+    elif trabajo is not None and trabajo["estado"] == trabajos.CANCELADO:
+        st.warning("🛑 Optimización cancelada.")
+    elif trabajo is not None and trabajo["estado"] == trabajos.ERROR:
+        st.error(f"❌ Error durante la optimización: {trabajo['mensaje']}")
+
+    with st.expander("📜 Trabajos recientes"):
+        st.dataframe(trabajos.listar(), width="stretch", height=240)
 
     # ===== Vista tipo "Visualización Actual" para resultados optimizados =====
-    opt_df = st.session_state.asignaciones_opt_full
-    if not opt_df.empty:
+    if st.session_state.hay_resultados_opt:
         st.subheader("Filtros (Resultados Optimizados)")
+        opciones = opciones_filtros()
         col1, col2, col3, col4 = st.columns(4)
-        deptos = ["Todos"] + sorted(opt_df["inst_departamento"].dropna().unique().tolist())
-        locs   = ["Todos"] + sorted(opt_df["inst_localidad"].dropna().unique().tolist())
-        turns  = ["Todos"] + ["Mañana", "Tarde"]  # añade "Noche" si la usas
-        insts  = ["Todos"] + sorted(opt_df["institucion"].dropna().unique().tolist())
-
+        deptos = ["Todos"] + sorted(opciones["departamento"].dropna().unique().tolist())
         f_depto = col1.selectbox("Departamento", deptos, index=0)
+        if f_depto != "Todos":
+            opciones = opciones[opciones["departamento"] == f_depto]
+        locs   = ["Todos"] + sorted(opciones["localidad"].dropna().unique().tolist())
         f_local = col2.selectbox("Localidad", locs, index=0)
+        if f_local != "Todos":
+            opciones = opciones[opciones["localidad"] == f_local]
+        turns  = ["Todos"] + ["Mañana", "Tarde"]  # añade "Noche" si la usas
+        insts  = ["Todos"] + sorted(opciones["institucion"].dropna().unique().tolist())
+
         f_turno = col3.selectbox("Turno", turns, index=0)
         f_inst  = col4.selectbox("Institución", insts, index=0)
 
-        dff = opt_df.copy()
-        if f_depto != "Todos":
-            dff = dff[dff["inst_departamento"] == f_depto]
-        if f_local != "Todos":
-            dff = dff[dff["inst_localidad"] == f_local]
-        if f_turno != "Todos":
-            dff = dff[dff["turno"] == f_turno]
-        if f_inst != "Todos":
-            dff = dff[dff["institucion"] == f_inst]
+        filtros = (("departamento", f_depto), ("localidad", f_local),
+                   ("turno", f_turno), ("institucion", f_inst))
 
         # Tabla
         cols_show = ["id", "estudiante", "docente", "institucion", "grado", "seccion", "turno", "distancia"]
         st.subheader("📋 Asignaciones Optimizadas (BD)")
+        limite, offset = paginador(contar_asignaciones(filtros), key="pag_opt")
+        dff = cargar_asignaciones_full(filtros, limite, offset)
+        if dff.empty:
+            dff = pd.DataFrame(columns=cols_show + ["est_lat", "est_lng", "doc_lat", "doc_lng", "estb_lat", "estb_lng"])
         st.dataframe(dff[cols_show], width="stretch", height=420)
 
         excel_opt_bytes = exportar_excel(dff[cols_show])
         st.download_button(
-            label="📥 Exportar Asignaciones Optimizadas a Excel",
+            label="📥 Exportar página a Excel",
             data=excel_opt_bytes,
             file_name="asignaciones_optimizadas.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=MIME_EXCEL
         )
+        boton_exportar_todo(filtros, "asignaciones_optimizadas_completo.xlsx", key="excel_opt")
 
         # Controles de líneas
         st.subheader("🗺️ Mapa de Estudiantes, Docentes e Instituciones")
         
         # Mapa
-        mapa_opt = folium.Map(location=[-25.3, -57.6], zoom_start=7)
-        cluster_opt = MarkerCluster().add_to(mapa_opt)
-
-        # Marcadores y líneas (con submuestreo/limitador)
-        line_count = 0
-        for idx, row in dff.iterrows():
-            # Marcadores
-            if pd.notna(row["est_lat"]) and pd.notna(row["est_lng"]):
-                folium.CircleMarker(
-                    [row["est_lat"], row["est_lng"]],
-                    radius=3, color="blue", fill=True, fill_opacity=0.8,
-                    popup=f"🎓 {row['estudiante']}",
-                ).add_to(cluster_opt)
-
-            if pd.notna(row["doc_lat"]) and pd.notna(row["doc_lng"]):
-                folium.CircleMarker(
-                    [row["doc_lat"], row["doc_lng"]],
-                    radius=3, color="green", fill=True, fill_opacity=0.8,
-                    popup=f"👩‍🏫 {row['docente']}",
-                ).add_to(cluster_opt)
-
-            if pd.notna(row["estb_lat"]) and pd.notna(row["estb_lng"]):
-                folium.Marker(
-                    [row["estb_lat"], row["estb_lng"]],
-                    popup=f"🏫 {row['institucion']}",
-                    icon=folium.Icon(color="red", icon="education"),
-                ).add_to(cluster_opt)
-           
-        st_folium(mapa_opt, width=1000, height=520, key="mapa_opt_lineas")
+        vista_opt = vista_mapa("mapa_opt_lineas")
+        mapa_opt = nuevo_mapa(vista_opt)
+        umbral = st.session_state.get("umbral_mapas", UMBRAL_MARCADORES)
+
+        capa_puntos(mapa_opt, dff["est_lat"], dff["est_lng"], "🎓 " + dff["estudiante"].astype(str),
+                    "Estudiantes", "blue", vista_opt, umbral=umbral)
+        capa_puntos(mapa_opt, dff["doc_lat"], dff["doc_lng"], "👩‍🏫 " + dff["docente"].astype(str),
+                    "Docentes", "green", vista_opt, umbral=umbral)
+        estb = dff.drop_duplicates(subset=["estb_lat", "estb_lng"])
+        capa_puntos(mapa_opt, estb["estb_lat"], estb["estb_lng"], "🏫 " + estb["institucion"].astype(str),
+                    "Instituciones", "red", vista_opt, icono="education", umbral=umbral)
+
+        folium.LayerControl().add_to(mapa_opt)
+        st_folium(mapa_opt, width=1000, height=520, key="mapa_opt_lineas",
+                  returned_objects=["center", "zoom", "bounds"])
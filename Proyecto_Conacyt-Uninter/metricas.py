@@ -0,0 +1,140 @@
+# ================================================================
+# metricas.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Registro liviano de convergencia por generación (hipervolumen,
+#     IGD contra un frente de referencia, cv_min/cv_avg, factibles,
+#     tiempos) en un arreglo NumPy, con muestras opcionales de la
+#     población cada k generaciones. Reemplaza a save_history=True,
+#     que copia el algoritmo completo en cada generación.
+# Dependencias:
+#     numpy, pandas, pymoo
+# ================================================================
+
+import time
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pymoo.core.callback import Callback
+from pymoo.indicators.hv import HV
+from pymoo.indicators.igd import IGD
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+COLUMNAS_METRICAS = [
+    "n_gen", "n_eval", "t_gen", "t_eval",
+    "cv_min", "cv_avg", "factibles", "n_pop", "n_frente", "hv", "igd"
+]
+
+
+class MetricasConvergencia(Callback):
+    """
+    Callback de pymoo que agrega una fila de COLUMNAS_METRICAS por generación.
+
+    - hv: hipervolumen del frente factible. Si no se da punto_ref, se fija
+      con el primer frente factible (máximo por objetivo + 10% del rango)
+      y queda igual el resto de la ejecución para que los valores sean
+      comparables. Es NaN mientras no haya soluciones factibles.
+    - igd: distancia al frente de referencia (NaN si no se da uno).
+    - t_eval: segundos de evaluación en la generación (problem.tiempo_evaluacion).
+
+    Args:
+        punto_ref (np.ndarray, opcional): Punto de referencia del hipervolumen.
+        frente_referencia (np.ndarray, opcional): Frente para el IGD.
+        muestras_cada (int): Si es > 0, guarda X/F/G de la población cada k generaciones.
+        metricas_cada (int): Calcula hv/igd cada m generaciones (NaN en las demás).
+    """
+    def __init__(
+        self,
+        punto_ref: Optional[np.ndarray] = None,
+        frente_referencia: Optional[np.ndarray] = None,
+        muestras_cada: int = 0,
+        metricas_cada: int = 1
+    ):
+        super().__init__()
+        self.punto_ref = None if punto_ref is None else np.asarray(punto_ref, dtype=float)
+        self.igd = None if frente_referencia is None else IGD(np.asarray(frente_referencia, dtype=float))
+        self.muestras_cada = int(muestras_cada)
+        self.metricas_cada = max(1, int(metricas_cada))
+        self.muestras = []
+        self._log = np.full((64, len(COLUMNAS_METRICAS)), np.nan)
+        self._n = 0
+        self._t_prev = None
+        self._eval_prev = 0.0
+
+    def notify(self, algorithm):
+        ahora = time.perf_counter()
+        t_gen = np.nan if self._t_prev is None else ahora - self._t_prev
+        self._t_prev = ahora
+
+        t_eval_total = getattr(algorithm.problem, "tiempo_evaluacion", np.nan)
+        t_eval = t_eval_total - self._eval_prev
+        self._eval_prev = t_eval_total
+
+        pop = algorithm.pop
+        G = pop.get("G")
+        cv = np.maximum(0, G).sum(axis=1) if G is not None and G.size else np.zeros(len(pop))
+
+        opt = algorithm.opt
+        frente = np.empty((0, algorithm.problem.n_obj))
+        if opt is not None and len(opt):
+            factible = opt.get("FEAS").ravel()
+            frente = opt.get("F")[factible]
+
+        hv = igd = np.nan
+        if len(frente) and algorithm.n_gen % self.metricas_cada == 0:
+            if self.punto_ref is None:
+                rango = np.ptp(frente, axis=0)
+                self.punto_ref = frente.max(axis=0) + 0.1 * np.where(rango > 0, rango, 1.0)
+            hv = HV(ref_point=self.punto_ref)(frente)
+            if self.igd is not None:
+                igd = self.igd(frente)
+
+        self._agregar([algorithm.n_gen, algorithm.evaluator.n_eval, t_gen, t_eval,
+                       cv.min(), cv.mean(), (cv == 0).sum(), len(cv), len(frente), hv, igd])
+
+        if self.muestras_cada and algorithm.n_gen % self.muestras_cada == 0:
+            X, F = pop.get("X", "F")
+            self.muestras.append({"n_gen": algorithm.n_gen, "X": X.copy(), "F": F.copy(),
+                                  "G": None if G is None else G.copy()})
+
+    def restaurar(self, punto_ref: Optional[np.ndarray], arreglo: Optional[np.ndarray]):
+        """
+        Continúa un registro guardado en un checkpoint: sus filas y su punto
+        de referencia (si no se dio uno explícito), así el hipervolumen sigue
+        siendo comparable después de reanudar.
+
+        Args:
+            punto_ref (np.ndarray, opcional): Punto guardado (vacío si no se había fijado).
+            arreglo (np.ndarray, opcional): Filas guardadas (ver arreglo).
+        """
+        if self.punto_ref is None and punto_ref is not None and np.size(punto_ref):
+            self.punto_ref = np.asarray(punto_ref, dtype=float)
+        if arreglo is not None and np.size(arreglo):
+            arreglo = np.asarray(arreglo, dtype=float).reshape(-1, len(COLUMNAS_METRICAS))
+            self._log = np.vstack([arreglo, np.full((64, len(COLUMNAS_METRICAS)), np.nan)])
+            self._n = len(arreglo)
+
+    def _agregar(self, fila):
+        if self._n == len(self._log):
+            self._log = np.vstack([self._log, np.full_like(self._log, np.nan)])
+        self._log[self._n] = fila
+        self._n += 1
+
+    @property
+    def arreglo(self) -> np.ndarray:
+        """Matriz (n_generaciones, len(COLUMNAS_METRICAS))."""
+        return self._log[:self._n]
+
+    def como_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.arreglo, columns=COLUMNAS_METRICAS)
+
+    def ultima(self) -> dict:
+        """Última fila como dict (vacío si todavía no hay generaciones)."""
+        return dict(zip(COLUMNAS_METRICAS, self.arreglo[-1])) if self._n else {}
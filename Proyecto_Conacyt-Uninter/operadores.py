@@ -0,0 +1,280 @@
+# ================================================================
+# operadores.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Operadores enteros de NSGA-II para el cromosoma del problema
+#     integrado ([XA | XD_class]), en lugar de SBX/PM reales:
+#  - Muestreo: cada estudiante en una clase de su grado
+#  - Cruce por bloques de establecimiento
+#  - Mutación: reasignación respetando el grado, movimientos e
+#    intercambios según capacidad, intercambio de docentes entre
+#    clases de turnos distintos y reparación de docentes (g2-g4)
+#  - Reparación de soluciones completas (unión de subproblemas)
+# Dependencias:
+#     numpy, pymoo
+# ================================================================
+
+import logging
+
+import numpy as np
+from pymoo.core.crossover import Crossover
+from pymoo.core.mutation import Mutation
+from pymoo.core.sampling import Sampling
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class EstructuraAsignacion:
+    """
+    Datos fijos del problema que usan los operadores (se calculan una vez).
+
+      - compatibles[k]: clases que puede tomar el grupo de grado k
+        (mismo grado o grado nulo en la clase o en el estudiante)
+      - grupo_est: grupo de grado de cada estudiante (índice de compatibles)
+      - bloque: establecimiento de cada gen (0..n_bloques-1); el de un
+        estudiante es el de su clase compatible más cercana
+
+    Args:
+        problem (IntegratedProblem): Problema con los arreglos precalculados.
+    """
+    def __init__(self, problem):
+        self.nE, self.nC, self.nD = problem.n_estudiantes, problem.n_clases, problem.n_docentes
+        self.cap = problem._cls_cap
+        self.turno = problem._cls_turno
+        self.dist_est = problem.dist_est_clase
+        self.dist_doc = problem.dist_doc_clase
+
+        est_grado, cls_grado = problem._est_grado, problem._cls_grado
+        codigos = np.unique(est_grado)
+        self.grupo_est = np.searchsorted(codigos, est_grado)
+        self.compatibles = []
+        self.miembros = []
+        todas = np.arange(self.nC)
+        for g in codigos:
+            clases = todas if g < 0 else np.flatnonzero((cls_grado == g) | (cls_grado < 0))
+            self.compatibles.append(clases if len(clases) else todas)
+            self.miembros.append(np.flatnonzero(est_grado == g))
+
+        cercana = np.empty(self.nE, dtype=np.int64)
+        for clases, estudiantes in zip(self.compatibles, self.miembros):
+            d = np.asarray(self.dist_est[np.ix_(estudiantes, clases)])
+            cercana[estudiantes] = clases[np.argmin(d, axis=1)]
+        _, self.bloque = np.unique(
+            np.concatenate([problem._cls_estab[cercana], problem._cls_estab]), return_inverse=True
+        )
+        self.n_bloques = int(self.bloque.max()) + 1
+
+    def compatible(self, XA: np.ndarray) -> np.ndarray:
+        """Máscara de estudiantes cuya clase es de su grado."""
+        ok = np.zeros(self.nE, dtype=bool)
+        for clases, estudiantes in zip(self.compatibles, self.miembros):
+            ok[estudiantes] = np.isin(XA[estudiantes], clases)
+        return ok
+
+    def elegir_clase(self, s: int, carga: np.ndarray, permitidas=None) -> int:
+        """
+        Clase compatible para el estudiante s: entre dos candidatas al azar
+        (con cupo y entre las permitidas si las hay) se queda con la más cercana.
+        """
+        clases = self.compatibles[self.grupo_est[s]]
+        libres = carga[clases] < self.cap[clases]
+        if permitidas is not None:
+            libres &= permitidas[clases]
+        if libres.any():
+            clases = clases[libres]
+        a, b = clases[np.random.randint(len(clases), size=2)]
+        return a if self.dist_est[s, a] <= self.dist_est[s, b] else b
+
+
+def _mover(e: EstructuraAsignacion, XA, carga, s, permitidas=None):
+    """Reasigna el estudiante s a una clase compatible y actualiza la carga."""
+    carga[XA[s]] -= 1
+    XA[s] = e.elegir_clase(s, carga, permitidas)
+    carga[XA[s]] += 1
+
+
+def _reparar_estudiantes(e: EstructuraAsignacion, XA, prob_var: float):
+    """
+    - Estudiantes en una clase de otro grado (g5): se reasignan
+    - Reasignación al azar con probabilidad prob_var por estudiante
+    - Clases sobre la capacidad (g1): el excedente pasa a clases con cupo
+    """
+    carga = np.bincount(XA, minlength=e.nC)
+    mover = ~e.compatible(XA) | (np.random.random(e.nE) < prob_var)
+    for s in np.random.permutation(np.flatnonzero(mover)):
+        _mover(e, XA, carga, s)
+
+    for l in np.flatnonzero(carga > e.cap):
+        alumnos = np.flatnonzero(XA == l)
+        for s in np.random.permutation(alumnos)[:carga[l] - e.cap[l]]:
+            _mover(e, XA, carga, s)
+    return carga
+
+
+def _intercambiar_estudiantes(e: EstructuraAsignacion, XA, n_intercambios: int):
+    """
+    Intercambia las clases de pares de estudiantes del mismo grado (la carga
+    de cada clase no cambia); se acepta si no aumenta la distancia del par.
+    """
+    for s in np.random.randint(e.nE, size=n_intercambios):
+        miembros = e.miembros[e.grupo_est[s]]
+        t = miembros[np.random.randint(len(miembros))]
+        a, b = XA[s], XA[t]
+        if a != b and e.dist_est[s, b] + e.dist_est[t, a] <= e.dist_est[s, a] + e.dist_est[t, b]:
+            XA[s], XA[t] = b, a
+
+
+def _reparar_docentes(e: EstructuraAsignacion, XD, carga, prob_var: float):
+    """
+    - Intercambio de docentes entre clases de turnos distintos (prob_var por clase)
+    - Se liberan las clases que dan a un docente más de 2 clases (g3) o dos
+      clases en el mismo turno (g4)
+    - Clases activas sin docente (g2): docente con 0 clases o con 1 clase en
+      otro turno (el más cercano de dos candidatos)
+    """
+    nD = e.nD
+    for l in np.flatnonzero(np.random.random(e.nC) < prob_var):
+        m = np.random.randint(e.nC)
+        if e.turno[l] != e.turno[m]:
+            XD[l], XD[m] = XD[m], XD[l]
+
+    n_clases = np.zeros(nD, dtype=int)
+    turno_doc = np.full(nD, -1)
+    for l in np.random.permutation(e.nC):
+        d = XD[l]
+        if d == nD:
+            continue
+        if n_clases[d] >= 2 or turno_doc[d] == e.turno[l]:
+            XD[l] = nD
+            continue
+        n_clases[d] += 1
+        turno_doc[d] = e.turno[l]
+
+    for l in np.flatnonzero((carga > 0) & (XD == nD)):
+        disponibles = np.flatnonzero((n_clases == 0) | ((n_clases == 1) & (turno_doc != e.turno[l])))
+        if not len(disponibles):
+            break
+        a, b = disponibles[np.random.randint(len(disponibles), size=2)]
+        d = a if e.dist_doc[a, l] <= e.dist_doc[b, l] else b
+        XD[l] = d
+        n_clases[d] += 1
+        turno_doc[d] = e.turno[l]
+
+
+def _vaciar_sin_docente(e: EstructuraAsignacion, XA, XD, carga):
+    """
+    Los estudiantes de clases activas que quedaron sin docente (g2) pasan a
+    clases compatibles con docente y cupo; si no hay, se quedan donde están.
+    """
+    con_docente = XD < e.nD
+    for l in np.flatnonzero((carga > 0) & ~con_docente):
+        for s in np.flatnonzero(XA == l):
+            clases = e.compatibles[e.grupo_est[s]]
+            if (con_docente[clases] & (carga[clases] < e.cap[clases])).any():
+                _mover(e, XA, carga, s, con_docente)
+
+
+def reparar_asignacion(problem, X: np.ndarray) -> np.ndarray:
+    """
+    Repara soluciones completas sin cambios al azar: grado y capacidad de
+    los estudiantes, docentes con más de 2 clases o turno repetido y clases
+    activas sin docente. Se usa al unir soluciones de subproblemas.
+
+    Args:
+        problem (IntegratedProblem): Problema de las soluciones.
+        X (np.ndarray): Soluciones (n, n_var) o una sola (n_var,).
+
+    Returns:
+        np.ndarray: Copia reparada, con la misma forma que X.
+    """
+    e = EstructuraAsignacion(problem)
+    X = np.array(X, dtype=np.int64)
+    for x in np.atleast_2d(X):
+        XA, XD = x[:e.nE], x[e.nE:]
+        carga = _reparar_estudiantes(e, XA, 0.0)
+        _reparar_docentes(e, XD, carga, 0.0)
+        _vaciar_sin_docente(e, XA, XD, carga)
+    return X
+
+
+class _OperadorAsignacion:
+    """
+    Guarda la EstructuraAsignacion del último problema visto (la del
+    problema base si usa codificación por candidatos, ver codificacion.py).
+    """
+    _problema = None
+    _estructura = None
+
+    def estructura(self, problem) -> EstructuraAsignacion:
+        if self._problema is not problem:
+            self._estructura = EstructuraAsignacion(getattr(problem, "base", problem))
+            self._problema = problem
+        return self._estructura
+
+
+class MuestreoAsignacion(_OperadorAsignacion, Sampling):
+    """
+    Población inicial: cada estudiante en una clase compatible (con cupo y
+    cercana si es posible) y un docente disponible en cada clase activa.
+    """
+    def _do(self, problem, n_samples, **kwargs):
+        e = self.estructura(problem)
+        X = np.empty((n_samples, e.nE + e.nC), dtype=np.int64)
+        for i in range(n_samples):
+            XA = np.random.randint(e.nC, size=e.nE)
+            XD = np.full(e.nC, e.nD)
+            carga = _reparar_estudiantes(e, XA, 0.0)
+            _reparar_docentes(e, XD, carga, 0.0)
+            _vaciar_sin_docente(e, XA, XD, carga)
+            X[i] = np.concatenate([XA, XD])
+        return X
+
+
+class CruceEstablecimiento(_OperadorAsignacion, Crossover):
+    """
+    Cruce por bloques: cada establecimiento (sus clases con su docente y
+    los estudiantes cuya clase compatible más cercana está en él) se copia
+    entero de uno de los dos padres. Solo usa posiciones de genes, así que
+    sirve también para la codificación por candidatos.
+    """
+    def __init__(self, prob: float = 0.9, **kwargs):
+        super().__init__(2, 2, prob=prob, **kwargs)
+
+    def _do(self, problem, X, **kwargs):
+        e = self.estructura(problem)
+        _, n_matings, _ = X.shape
+        de_p1 = (np.random.random((n_matings, e.n_bloques)) < 0.5)[:, e.bloque]
+        return np.stack([np.where(de_p1, X[0], X[1]), np.where(de_p1, X[1], X[0])])
+
+
+class MutacionAsignacion(_OperadorAsignacion, Mutation):
+    """
+    Mutación y reparación del cromosoma entero.
+
+    Args:
+        prob (float): Probabilidad de mutar cada individuo.
+        prob_var (float, opcional): Probabilidad de reasignar cada estudiante
+            y de intercambiar el docente de cada clase (por defecto 1/n_var).
+        n_intercambios (int, opcional): Intercambios de estudiantes del mismo
+            grado por individuo (por defecto 1% de los estudiantes).
+    """
+    def __init__(self, prob: float = 1.0, prob_var=None, n_intercambios=None, **kwargs):
+        super().__init__(prob=prob, prob_var=prob_var, **kwargs)
+        self.n_intercambios = n_intercambios
+
+    def _do(self, problem, X, **kwargs):
+        e = self.estructura(problem)
+        prob_var = float(self.get_prob_var(problem))
+        n_intercambios = self.n_intercambios or max(1, e.nE // 100)
+        X = np.asarray(X).astype(np.int64)
+        for x in X:
+            XA, XD = x[:e.nE], x[e.nE:]
+            carga = _reparar_estudiantes(e, XA, prob_var)
+            _intercambiar_estudiantes(e, XA, n_intercambios)
+            _reparar_docentes(e, XD, carga, prob_var)
+            _vaciar_sin_docente(e, XA, XD, carga)
+        return X
@@ -0,0 +1,181 @@
+# ================================================================
+# resumenes.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Resúmenes (KPIs) por clase y por docente de una solución del
+#     problema integrado, calculados de forma vectorizada (bincount e
+#     histograma docente x turno). Compartido por el visor Streamlit y
+#     la ejecución por consola.
+# Dependencias:
+#     numpy, pandas
+# ================================================================
+
+import numpy as np
+import pandas as pd
+
+# ================================
+# UTILIDADES DE TURNO (robustas)
+# ================================
+TURNOS_TO_ID = {
+    "mañana": 0, "tarde": 1, "noche": 2,
+    "manana": 0,               # sin tilde
+    0: 0, 1: 1, 2: 2
+}
+ID_TO_TURNO = {0: "Mañana", 1: "Tarde", 2: "Noche"}
+
+def to_turno_id(x):
+    if pd.isna(x):
+        return 0
+    if isinstance(x, (int, np.integer)):
+        return TURNOS_TO_ID.get(int(x), 0)
+    s = str(x).strip().lower()
+    return TURNOS_TO_ID.get(s, 0)
+
+def turno_label(x):
+    return ID_TO_TURNO.get(to_turno_id(x), str(x))
+
+def turno_color(turno_text: str):
+    """Color estable por turno (para líneas)."""
+    t = to_turno_id(turno_text)
+    return {0: "blue", 1: "orange", 2: "purple"}.get(t, "blue")
+
+# ================================
+# RESÚMENES (KPIs)
+# ================================
+def build_summaries(problem, best_X: np.ndarray):
+    """
+    Resumen por clase y por docente de una solución.
+
+    Cromosoma:
+      - best_X = [ XA(0..N-1), XD_class(0..C-1) ]
+
+    Args:
+        problem (IntegratedProblem): Problema con estudiantes, docentes y clases
+                 (o ProblemaCandidatos, con best_X codificado).
+        best_X (np.ndarray): Solución a resumir.
+
+    Returns:
+        tuple: (df_classes, df_teachers)
+    """
+    if hasattr(problem, "decodificar"):   # codificación por candidatos
+        best_X, problem = problem.decodificar(best_X), problem.base
+
+    N = problem.n_estudiantes
+    C = problem.n_clases
+    D = problem.n_docentes
+
+    XA = best_X[:N].astype(int)          # estudiante -> clase
+    XD_class = best_X[N:].astype(int)    # docente por clase
+
+    class_load = np.bincount(XA, minlength=C)
+    docente_por_clase = XD_class.copy()
+    tiene_docente = docente_por_clase < D
+    docentes_unicos = tiene_docente.astype(int)
+
+    cls_df = problem.clases.reset_index(drop=True).copy()
+
+    if hasattr(problem, "cap_min") and problem.cap_min is not None:
+        cap_min = np.asarray(problem.cap_min, dtype=int)
+    elif "cap_min" in cls_df.columns:
+        cap_min = cls_df["cap_min"].fillna(0).astype(int).values
+    else:
+        cap_min = np.zeros(C, dtype=int)
+
+    if hasattr(problem, "cap_max") and problem.cap_max is not None:
+        cap_max = np.asarray(problem.cap_max, dtype=int)
+    elif "capacidad" in cls_df.columns:
+        cap_max = cls_df["capacidad"].fillna(10**9).astype(int).values
+    else:
+        cap_max = np.full(C, 10**9, dtype=int)
+
+    viol_min = np.maximum(0, cap_min - class_load)
+    viol_max = np.maximum(0, class_load - cap_max)
+    ok = (viol_min == 0) & (viol_max == 0) & tiene_docente
+
+    if "turno" in cls_df.columns and not pd.api.types.is_numeric_dtype(cls_df["turno"]):
+        turnos_id = cls_df["turno"].map(to_turno_id).astype(int).values
+    else:
+        turnos_id = cls_df.get("turno", pd.Series([0]*C)).fillna(0).astype(int).values
+
+    df_classes = pd.DataFrame({
+        "clase_id": cls_df["id"].values if "id" in cls_df.columns else np.arange(C),
+        "establecimiento_id": cls_df.get("establecimiento_id", pd.Series([-1]*C)).values,
+        "turno": [turno_label(t) for t in turnos_id],
+        "cap_min": cap_min,
+        "cap_max": cap_max,
+        "carga_est": class_load,
+        "docente_asignado_idx": docente_por_clase,
+        "docentes_unicos": docentes_unicos,
+        "tiene_docente": tiene_docente,
+        "viol_min": viol_min,
+        "viol_max": viol_max,
+        "ok": ok
+    }).sort_values(by=["ok", "viol_max", "viol_min"], ascending=[True, False, False]).reset_index(drop=True)
+
+    # Solo clases con un docente válido (índices fuera de rango = sin docente)
+    estab_por_clase = cls_df.get("establecimiento_id", pd.Series([0]*C)).values
+    valida = tiene_docente & (docente_por_clase >= 0)
+    doc = docente_por_clase[valida]
+    turnos_doc = turnos_id[valida]
+    estab_doc = estab_por_clase[valida]
+
+    n_clases = np.bincount(doc, minlength=D)
+
+    # Histograma docente x turno
+    turnos_uniq, turno_idx = np.unique(turnos_doc, return_inverse=True)
+    T = len(turnos_uniq)
+    hist = np.bincount(doc * T + turno_idx.ravel(), minlength=D * T).reshape(D, T)
+
+    # Repeticiones de turno (solo Mañana/Tarde/Noche)
+    base = np.isin(turnos_uniq, (0, 1, 2))
+    rep_turno = np.maximum(hist[:, base] - 1, 0).sum(axis=1)
+
+    # Texto de turnos: una etiqueta por patrón distinto de presencia
+    presencia = hist > 0
+    patrones, patron_idx = np.unique(presencia, axis=0, return_inverse=True)
+    etiquetas = np.array(
+        [", ".join(turno_label(t) for t in turnos_uniq[p]) for p in patrones] if T else [""],
+        dtype=object
+    )
+    turnos_txt = etiquetas[patron_idx.ravel()] if T else np.full(D, "", dtype=object)
+
+    # Establecimientos distintos por docente
+    pares = pd.DataFrame({"docente": doc, "estab": estab_doc}).drop_duplicates()
+    estabs_distintos = np.bincount(pares["docente"].to_numpy(dtype=int), minlength=D)
+
+    df_teachers = pd.DataFrame({
+        "docente_id": np.arange(D),
+        "n_clases_asignadas": n_clases,
+        "turnos": turnos_txt,
+        "rep_turno": rep_turno,
+        "mas_de_2_clases": np.maximum(0, n_clases - 2),
+        "establecimientos_distintos": estabs_distintos,
+    }).sort_values(
+        by=["mas_de_2_clases", "rep_turno", "n_clases_asignadas"],
+        ascending=[False, False, False]
+    ).reset_index(drop=True)
+
+    return df_classes, df_teachers
+
+
+def kpis_globales(df_classes: pd.DataFrame, df_teachers: pd.DataFrame) -> dict:
+    """
+    Totales de los resúmenes, para mostrar como métricas.
+
+    Args:
+        df_classes (pd.DataFrame): Resumen por clase de build_summaries.
+        df_teachers (pd.DataFrame): Resumen por docente de build_summaries.
+
+    Returns:
+        dict: Totales de violaciones y de sobrecarga de docentes.
+    """
+    return {
+        "alumnos_bajo_minimo": int(df_classes["viol_min"].sum()),
+        "alumnos_sobre_maximo": int(df_classes["viol_max"].sum()),
+        "clases_sin_docente": int((~df_classes["tiene_docente"] & (df_classes["carga_est"] > 0)).sum()),
+        "docentes_mas_de_2_clases": int((df_teachers["mas_de_2_clases"] > 0).sum()),
+        "docentes_turno_repetido": int((df_teachers["rep_turno"] > 0).sum()),
+    }
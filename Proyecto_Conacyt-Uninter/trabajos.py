@@ -0,0 +1,303 @@
+# ================================================================
+# trabajos.py
+# Proyecto Conacyt-Uninter
+# Tutor investigador: Dr. Fabio Lopez
+# Investigador en formación: Ing. Eliana Telesca
+# Versión: 1.0
+# Descripción:
+#     Ejecución de optimizaciones en segundo plano para el visor.
+#     Cada trabajo se registra en una tabla SQLite (estado, progreso
+#     por generación, mejor F, cancelación) y se ejecuta en un pool de
+#     procesos local; el visor consulta la tabla periódicamente.
+# Dependencias:
+#     sqlite3, numpy, pymoo, database, integrated_problem,
+#     integrated_optimization
+# ================================================================
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import multiprocessing
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pymoo.core.callback import Callback
+
+from metricas import COLUMNAS_METRICAS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Directorio de la tabla de trabajos y de los resultados (.npz)
+TRABAJOS_DIR = Path(os.getenv("TRABAJOS_DIR", Path(__file__).parent / "trabajos"))
+
+# Optimizaciones ejecutándose a la vez; el resto espera en cola
+MAX_SIMULTANEOS = int(os.getenv("TRABAJOS_SIMULTANEOS", "1"))
+
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+ERROR = "error"
+ACTIVOS = (EN_COLA, EJECUTANDO)
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza desde el callback cuando se pidió cancelar el trabajo."""
+
+
+# ================================
+# TABLA DE TRABAJOS (SQLite)
+# ================================
+_SQL_TABLA = """
+    CREATE TABLE IF NOT EXISTS trabajos (
+        id TEXT PRIMARY KEY,
+        estado TEXT NOT NULL,
+        params TEXT NOT NULL,
+        creado REAL NOT NULL,
+        iniciado REAL,
+        terminado REAL,
+        n_gen INTEGER,
+        gen_actual INTEGER DEFAULT 0,
+        cv_min REAL,
+        cv_avg REAL,
+        factibles INTEGER,
+        n_pop INTEGER,
+        mejor_f TEXT,
+        mensaje TEXT,
+        cancelar INTEGER DEFAULT 0
+    )
+"""
+
+
+@contextmanager
+def _conectar() -> Iterator[sqlite3.Connection]:
+    """
+    Conexión a la tabla de trabajos. La crea si no existe (el visor la
+    consulta antes de lanzar el primer trabajo), confirma si el bloque
+    termina sin error y siempre cierra la conexión (el visor consulta
+    cada pocos segundos por sesión).
+    """
+    TRABAJOS_DIR.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(TRABAJOS_DIR / "trabajos.sqlite", timeout=30)) as conn:
+        conn.row_factory = sqlite3.Row
+        with conn:
+            conn.execute(_SQL_TABLA)
+            yield conn
+
+
+def crear_tabla():
+    """Crea la tabla de trabajos si no existe y activa el modo WAL."""
+    with _conectar() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+
+
+def _actualizar(trabajo_id: str, **campos):
+    asignaciones = ", ".join(f"{k} = ?" for k in campos)
+    with _conectar() as conn:
+        conn.execute(f"UPDATE trabajos SET {asignaciones} WHERE id = ?",
+                     (*campos.values(), trabajo_id))
+
+
+def encolar(params: Dict[str, Any]) -> str:
+    """
+    Registra un trabajo nuevo en estado "en_cola".
+
+    Args:
+        params (dict): Argumentos de run_integrated_optimization
+                       (pop_size, n_gen, n_procs). Se guardan en SQLite, por
+                       eso no llevan credenciales: la conexión la resuelve
+                       ejecutar_trabajo con database.DB_CONFIG (.env).
+
+    Returns:
+        str: Identificador del trabajo.
+    """
+    trabajo_id = uuid.uuid4().hex[:12]
+    with _conectar() as conn:
+        conn.execute(
+            "INSERT INTO trabajos (id, estado, params, creado, n_gen) VALUES (?, ?, ?, ?, ?)",
+            (trabajo_id, EN_COLA, json.dumps(params), time.time(), params.get("n_gen"))
+        )
+    return trabajo_id
+
+
+def obtener(trabajo_id: str) -> Optional[Dict[str, Any]]:
+    """Devuelve la fila del trabajo como dict (mejor_f ya decodificado) o None."""
+    with _conectar() as conn:
+        fila = conn.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+    if fila is None:
+        return None
+    trabajo = dict(fila)
+    trabajo["params"] = json.loads(trabajo["params"])
+    trabajo["mejor_f"] = json.loads(trabajo["mejor_f"]) if trabajo["mejor_f"] else None
+    return trabajo
+
+
+def listar(limite: int = 20) -> pd.DataFrame:
+    """Últimos trabajos (más recientes primero)."""
+    with _conectar() as conn:
+        return pd.read_sql_query(
+            "SELECT id, estado, gen_actual, n_gen, cv_min, factibles, n_pop, "
+            "datetime(creado, 'unixepoch', 'localtime') AS creado, mensaje "
+            "FROM trabajos ORDER BY creado DESC LIMIT ?",
+            conn, params=(limite,)
+        )
+
+
+def solicitar_cancelacion(trabajo_id: str):
+    """Marca el trabajo para cancelar; se detiene al terminar la generación en curso."""
+    _actualizar(trabajo_id, cancelar=1)
+
+
+def _cancelacion_pedida(trabajo_id: str) -> bool:
+    with _conectar() as conn:
+        fila = conn.execute("SELECT cancelar FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+    return bool(fila and fila["cancelar"])
+
+
+def ruta_resultado(trabajo_id: str) -> Path:
+    return TRABAJOS_DIR / f"{trabajo_id}.npz"
+
+
+def cargar_resultado(trabajo_id: str):
+    """
+    Lee la mejor solución y las métricas por generación guardadas por el trabajo.
+
+    Returns:
+        tuple: (best_X, best_F, metricas) donde best_F puede ser None y
+               metricas es un DataFrame con COLUMNAS_METRICAS.
+    """
+    with np.load(ruta_resultado(trabajo_id)) as datos:
+        best_F = datos["F"] if datos["F"].size else None
+        filas = datos["metricas"] if "metricas" in datos.files else np.empty(0)
+        metricas = pd.DataFrame(filas.reshape(-1, len(COLUMNAS_METRICAS)),
+                                columns=COLUMNAS_METRICAS)
+        return datos["X"], best_F, metricas
+
+
+# ================================
+# PROGRESO POR GENERACIÓN
+# ================================
+class ProgresoTrabajo(Callback):
+    """
+    Callback de pymoo que escribe en la tabla el progreso de cada
+    generación y corta la ejecución si se pidió cancelar.
+    """
+    def __init__(self, trabajo_id: str):
+        super().__init__()
+        self.trabajo_id = trabajo_id
+
+    def notify(self, algorithm):
+        pop = algorithm.pop
+        G = pop.get("G")
+        cv = np.maximum(0, G).sum(axis=1) if G is not None and G.size else np.zeros(len(pop))
+        opt = algorithm.opt
+        F = opt.get("F") if opt is not None and len(opt) else None
+        _actualizar(
+            self.trabajo_id,
+            gen_actual=int(algorithm.n_gen),
+            cv_min=float(cv.min()),
+            cv_avg=float(cv.mean()),
+            factibles=int((cv == 0).sum()),
+            n_pop=int(len(cv)),
+            mejor_f=json.dumps(F.min(axis=0).tolist()) if F is not None else None,
+        )
+        if _cancelacion_pedida(self.trabajo_id):
+            raise TrabajoCancelado(self.trabajo_id)
+
+
+# ================================
+# EJECUCIÓN (en el proceso del pool)
+# ================================
+def ejecutar_trabajo(trabajo_id: str):
+    """
+    Ejecuta un trabajo encolado: carga los datos, arma el problema,
+    corre la optimización (guardando en la BD de database.DB_CONFIG) y deja la
+    mejor solución en TRABAJOS_DIR/<id>.npz.
+    """
+    from database import DB_CONFIG, cargar_datos_desde_db
+    from distance_cache import CACHE_DIR
+    from integrated_problem import IntegratedProblem
+    from integrated_optimization import run_integrated_optimization, select_best_individual
+    from archivo_pareto import ruta_archivo
+
+    trabajo = obtener(trabajo_id)
+    if trabajo is None:
+        return
+    if trabajo["cancelar"]:
+        _actualizar(trabajo_id, estado=CANCELADO, terminado=time.time())
+        return
+
+    _actualizar(trabajo_id, estado=EJECUTANDO, iniciado=time.time())
+    params = trabajo["params"]
+    try:
+        estudiantes, docentes, clases, _ = cargar_datos_desde_db()
+        if estudiantes.empty or docentes.empty or clases.empty:
+            raise RuntimeError("No se pudieron cargar los datos desde la base de datos.")
+
+        problem = IntegratedProblem(estudiantes, docentes, clases, cache_dir=CACHE_DIR)
+        result = run_integrated_optimization(
+            problem,
+            pop_size=params["pop_size"],
+            n_gen=params["n_gen"],
+            n_procs=params.get("n_procs", 1),
+            db_config=DB_CONFIG,
+            run_id=trabajo_id,
+            archivo=ruta_archivo(problem),
+            callback=ProgresoTrabajo(trabajo_id)
+        )
+        _, best_X, best_F = select_best_individual(result)
+        np.savez(ruta_resultado(trabajo_id), X=np.asarray(best_X),
+                 F=np.asarray(best_F if best_F is not None else []),
+                 metricas=result.metricas.arreglo)
+        _actualizar(trabajo_id, estado=COMPLETADO, terminado=time.time())
+        logger.info(f"✅ Trabajo {trabajo_id} completado")
+
+    except TrabajoCancelado:
+        _actualizar(trabajo_id, estado=CANCELADO, terminado=time.time())
+        logger.info(f"🛑 Trabajo {trabajo_id} cancelado")
+    except Exception as e:
+        _actualizar(trabajo_id, estado=ERROR, terminado=time.time(), mensaje=str(e))
+        logger.error(f"❌ Trabajo {trabajo_id} falló: {e}", exc_info=True)
+
+
+class GestorTrabajos:
+    """
+    Pool de procesos que ejecuta los trabajos encolados. Se crea una vez
+    por servidor (st.cache_resource) y lo comparten todas las sesiones.
+    """
+    def __init__(self, max_simultaneos: int = MAX_SIMULTANEOS):
+        crear_tabla()
+        self._marcar_interrumpidos()
+        # spawn: el servidor de Streamlit tiene varios hilos y fork no es seguro
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_simultaneos,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    @staticmethod
+    def _marcar_interrumpidos():
+        """Los trabajos activos de un servidor anterior ya no tienen proceso."""
+        with _conectar() as conn:
+            conn.execute(
+                f"UPDATE trabajos SET estado = ?, mensaje = ?, terminado = ? "
+                f"WHERE estado IN ({', '.join('?' for _ in ACTIVOS)})",
+                (ERROR, "Interrumpido por reinicio del servidor", time.time(), *ACTIVOS)
+            )
+
+    def lanzar(self, params: Dict[str, Any]) -> str:
+        """Encola un trabajo y lo envía al pool; devuelve su identificador."""
+        trabajo_id = encolar(params)
+        self.executor.submit(ejecutar_trabajo, trabajo_id)
+        logger.info(f"📨 Trabajo {trabajo_id} encolado")
+        return trabajo_id
+
+    def cerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
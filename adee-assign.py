@@ -1,78 +1,76 @@
-import multiprocessing
-from pymoo.core.problem import starmap_parallelized_eval
 from pymoo.algorithms.moo.nsga2 import NSGA2
 from pymoo.factory import get_crossover, get_mutation
-from pymoo.optimize import minimize
 from pymoo.visualization.scatter import Scatter
-from pymoo.core.population import Population
-from multiprocessing import Process, Manager
-from problem import ADEEProblem,AEEEFeacible,generate_ind
+from problem import ADEEProblem,AEEEFeacible,generate_ind,evaluateChunk,sharedData,setupWorker
+from seeding import HeuristicSampling
+from sharedeval import ParallelEvaluator
+import checkpoint
+import data
+import distancematrix
+import sys
 
 if __name__ == '__main__':
-    mananger = Manager()
-    q = mananger.Queue()
-    
-    #Init population on 10 group
-    process=[]
-    cp=10
-    for i in range(10):
-        print("Start group: "+str(i))
-        for index in range(cp):
-            print("Main    : create and start process %d." % index)
-            p = Process(target=generate_ind, args=(index,q))
-            process.append(p) 
-            p.start()     
-            
-        for p in process:
-            p.join()
+    #Initialize (distances with numpy haversine; --geodesic uses geopy, exact but slow to build)
+    distanceMode = distancematrix.GEODESIC if "--geodesic" in sys.argv else distancematrix.HAVERSINE
+    data.init(maxDistance=40, distanceMode=distanceMode)
 
-        print("End group: "+str(i))
+    #Init population: pop_size heuristic individuals built on 10 processes
+    #(workers started without fork load the data again with data.init)
+    pop_0 = HeuristicSampling(generate_ind, n_workers=10, seed=1,
+                              init=data.init, initArgs=(40, distanceMode))
 
-    pop_0=[]
-    while not q.empty():
-        pop_0.append(q.get())
-
-    pop_0 = Population.new("X", pop_0)
+    #Checkpoint every 10 generations; with --resume the run continues from the last one
+    #(its population is already evaluated and replaces the initial population)
+    checkpointPath = "adee-checkpoint.npz"
+    state = checkpoint.load(checkpointPath) if "--resume" in sys.argv else None
+    if state is not None:
+        pop_0 = checkpoint.population(state)
 
     # the number of processes to be used for concurrent evaluation of fitness
     n_proccess = 10
-    
-    pool = multiprocessing.Pool(n_proccess)
 
-    # define the problem by passing the starmap interface of the thread pool
-    problem = ADEEProblem(runner=pool.starmap, func_eval=starmap_parallelized_eval)
+    # the data is shared once with the workers, each generation they evaluate chunks of the population
+    arrays, values = sharedData()
+    evaluator = ParallelEvaluator(setupWorker, evaluateChunk, arrays, values, n_workers=n_proccess)
 
-    # Configure NSGA2 
-    algorithm = NSGA2(pop_size=100,sampling=pop_0,
-                crossover=get_crossover("int_exp"),
-                mutation=get_mutation("int_pm"),
-                repair=AEEEFeacible(),
-                eliminate_duplicates=True)
+    #the worker pool and its shared memory are released even if the run or the saving fails
+    try:
+        problem = ADEEProblem(evaluator=evaluator)
 
-    #Optimize
-    res = minimize(problem,
-                algorithm,
-                ('n_gen', 100),
-                seed=1,
-                verbose=True)
+        # Configure NSGA2 
+        algorithm = NSGA2(pop_size=100,sampling=pop_0,
+                    crossover=get_crossover("int_exp"),
+                    mutation=get_mutation("int_pm"),
+                    repair=AEEEFeacible(),
+                    eliminate_duplicates=True)
 
+        #Optimize
+        res = checkpoint.run(problem,
+                    algorithm,
+                    100,
+                    seed=1,
+                    path=checkpointPath,
+                    every=10,
+                    state=state,
+                    verbose=True)
 
-    f = open("result.txt", "w")
-    f.write("Time: %s" % res.exec_time)
-    f.write("Best solution found:")
-    f.write(str(res.X))
-    f.write("Function value: %s" % res.F)
-    f.write("Constraint violation: %s" % res.CV)
-    f.close()
 
-    print('Time:', res.exec_time)
+        f = open("result.txt", "w")
+        f.write("Time: %s" % res.exec_time)
+        f.write("Best solution found:")
+        f.write(str(res.X))
+        f.write("Function value: %s" % res.F)
+        f.write("Constraint violation: %s" % res.CV)
+        f.close()
 
+        print('Time:', res.exec_time)
 
-    print("Best solution found:" % res.X)
-    print("Function value: %s" % res.F)
-    print("Constraint violation: %s" % res.CV)
 
-    pool.close()
+        print("Best solution found:" % res.X)
+        print("Function value: %s" % res.F)
+        print("Constraint violation: %s" % res.CV)
+    finally:
+        evaluator.close()
 
     plot = Scatter()
     plot.add(problem.pareto_front(), plot_type="line", color="black", alpha=0.7)
@@ -1,28 +1,28 @@
 import data
-from geopy import distance
+import distancematrix
+from objetivefunctions import groupByTeacher
 
 #Compute all restrictions
 #One teacher with up to two classes with different shifts 
-def validateConstraints(X):    
+#Each class is checked against the first other class of the same teacher
+def validateConstraints(X,groups=None):
+    if groups is None:
+        groups=groupByTeacher(X)
     valid_c1=0
     valid_c2=0
     valid_c3=0
-    n_c=len(data.C)
-    for j in range(n_c):
-        c=1
-        for l in range(n_c):
-            if(j!=l and X[j]==X[l]):
-                c=c+1
-                if(c>2):#More than 2 assigs
-                    valid_c1=1    
-                    break                
-                if(data.C[j][1]==data.C[l][1]):#Not Same shifts
-                    valid_c2=1          
-                    break
-                d=distance.distance((data.E[data.C[j][4]-1][1],data.E[data.C[j][4]-1][2]),
-                                    (data.E[data.C[l][4]-1][1],data.E[data.C[l][4]-1][2])).kilometers       
-                if(d>data.Dmax):#Maximun distances exceeded
-                    valid_c3=1
-                    break
+    for assigned in groups.values():
+        if len(assigned)<2:
+            continue
+        j=assigned[0]
+        for l in assigned[1:]:
+            if(data.C[j][1]==data.C[l][1]):#Not Same shifts
+                valid_c2=1
+            elif(distancematrix.classes(j,l)>data.Dmax):#Maximun distances exceeded
+                valid_c3=1
+            elif(len(assigned)>2):#More than 2 assigs
+                valid_c1=1
+        if valid_c1 and valid_c2 and valid_c3:
+            break
             
-    return [valid_c1,valid_c2,valid_c3]
\ No newline at end of file
+    return [valid_c1,valid_c2,valid_c3]
@@ -1,7 +1,8 @@
 #data of Problem Assign Teacher
 import psycopg2
+import distancematrix
 
-def init(maxDistance):
+def init(maxDistance, distanceMode=distancematrix.HAVERSINE):
     #Maximum distance on kilometers
     global Dmax, C, D, E, CLASS_SIZE, TEACHER_SIZE, N_OBJ, N_CONSTR
     Dmax=maxDistance
@@ -33,4 +34,7 @@ def init(maxDistance):
     N_CONSTR = 3
 
     cur.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+    #Precompute establishment and teacher distances
+    distancematrix.init(E, C, D, mode=distanceMode)
\ No newline at end of file
@@ -1,25 +1,105 @@
-from pymoo.core.problem import ElementwiseProblem
+from pymoo.core.problem import Problem
 import data
 from constraint import validateConstraints
-from geopy import distance
+import distancematrix
+import numpy as np
 from random import randrange
 from pymoo.core.repair import Repair
-from objetivefunctions import f1,f2,f3
+from objetivefunctions import f1,f2,f3,groupByTeacher
 
-#Initialize
-data.init(maxDistance=40)
+#data.init(maxDistance) must run before creating the problem
 
-class ADEEProblem(ElementwiseProblem):
+#Each call evaluates the whole population, in this process or on a sharedeval.ParallelEvaluator
+class ADEEProblem(Problem):
 
-    def __init__(self, **kwargs):
+    def __init__(self, evaluator=None, **kwargs):
         super().__init__(n_var=data.CLASS_SIZE, n_obj=data.N_OBJ,
                          n_constr=data.N_CONSTR, xl=0, xu=data.TEACHER_SIZE-1, type_var=int,**kwargs)
+        self.evaluator=evaluator
 
     def _evaluate(self, x, out, *args, **kwargs):
-        e=[f1(x), f2(x)*-1, f3(x)*-1]
-        print(e)
-        out["F"] = e #For minimization context, with multiply *-1 the max f2 and f3
-        out["G"] = validateConstraints(x)
+        if self.evaluator is None:
+            F,G=evaluateChunk(x)
+        else:
+            F,G=self.evaluator(x)
+        out["F"] = F #For minimization context, with multiply *-1 the max f2 and f3
+        out["G"] = G
+
+#Evaluate a chunk of the population (one individual per row)
+def evaluateChunk(X):
+    F=[]
+    G=[]
+    for x in X:
+        groups=groupByTeacher(x) #Teacher -> classes, shared by objectives and constraints
+        F.append([f1(x), f2(x,groups)*-1, f3(x,groups)*-1])
+        G.append(validateConstraints(x,groups))
+    return np.array(F,dtype=float),np.array(G,dtype=float)
+
+#Data needed by evaluateChunk: arrays (shared memory) and values (sent once per worker)
+def sharedData():
+    arrays={"CE":distancematrix.CE,"EE":distancematrix.EE,"PE":distancematrix.PE}
+    values={"C":data.C,"D":data.D,"Dmax":data.Dmax}
+    return arrays,values
+
+#Install the shared data on a worker (see sharedeval.ParallelEvaluator)
+def setupWorker(arrays, values):
+    distancematrix.CE=arrays["CE"]
+    distancematrix.EE=arrays["EE"]
+    distancematrix.PE=arrays["PE"]
+    data.C=values["C"]
+    data.D=values["D"]
+    data.Dmax=values["Dmax"]
+    data.CLASS_SIZE=len(data.C)
+    data.TEACHER_SIZE=len(data.D)
+
+#Free classes indexed by establishment and shift, each list sorted by class index
+#Nearest queries walk the establishments in distance order (distancematrix)
+class FreeClasses:
+
+    def __init__(self, z):
+        self.free={}
+        for j in range(len(z)):
+            if z[j]==-1:
+                self.free.setdefault(int(distancematrix.CE[j]),{}).setdefault(data.C[j][1],[]).append(j)
+
+    #Mark class j as assigned
+    def take(self, j):
+        e=int(distancematrix.CE[j])
+        shifts=self.free[e]
+        shifts[data.C[j][1]].remove(j)
+        if not shifts[data.C[j][1]]:
+            del shifts[data.C[j][1]]
+        if not shifts:
+            del self.free[e]
+
+    #First free class of establishment e, optionally with a shift different from notShift
+    def first(self, e, notShift=None):
+        shifts=self.free.get(int(e))
+        if shifts is None:
+            return -1
+        classes=[l[0] for s,l in shifts.items() if notShift is None or s!=notShift]
+        return min(classes) if classes else -1
+
+    #Nearest free class to teacher i home, up to maxDistance
+    def nearestToTeacher(self, i, maxDistance=None):
+        for e in distancematrix.personOrder(i):
+            if maxDistance is not None and distancematrix.PE[i,e]>maxDistance:
+                break
+            j=self.first(e)
+            if j!=-1:
+                return j
+        return -1
+
+    #Nearest free class to class pos with another shift, up to maxDistance between establishments
+    def nearestToClass(self, pos, maxDistance):
+        e0=distancematrix.CE[pos]
+        for e in distancematrix.establishmentOrder(e0):
+            if distancematrix.EE[e0,e]>maxDistance:
+                break
+            j=self.first(e,data.C[pos][1])
+            if j!=-1:
+                return j
+        return -1
 
 class AEEEFeacible(Repair):
 
@@ -34,7 +114,8 @@ class AEEEFeacible(Repair):
         for zi in range(len(Z)):
             # the packing plan for zi
             z = Z[zi]
-            valid=validateConstraints(z)
+            groups=groupByTeacher(z)
+            valid=validateConstraints(z,groups)
             
             if valid[0]==0 and valid[1]==0 and valid[2]==0:
                 continue            
@@ -45,51 +126,39 @@ class AEEEFeacible(Repair):
             for i in range(data.TEACHER_SIZE):                
                 assign1=-1                
                 assign2=-1            
-                for j in range(len(z)):
-                    if i==z[j]:
-                        if assign1==-1:                           
-                            assign1=j
-                        elif assign2==-1:
-                            if data.C[assign1][1]==data.C[j][1]:
-                                z[j]=-1
-                                c=c-1
-                                continue
-                            d=distance.distance((data.E[data.C[assign1][4]-1][1],data.E[data.C[assign1][4]-1][2]),
-                                    (data.E[data.C[j][4]-1][1],data.E[data.C[j][4]-1][2])).kilometers       
-                            if(d>data.Dmax):#Maximun distances exceeded
-                                z[j]=-1
-                                c=c-1
-                                continue
-                            assign2=j
-                        else:
-                            c=c-1    
+                for j in groups.get(i,[]):
+                    if assign1==-1:                           
+                        assign1=j
+                    elif assign2==-1:
+                        if data.C[assign1][1]==data.C[j][1]:
                             z[j]=-1
+                            c=c-1
+                            continue
+                        d=distancematrix.classes(assign1,j)
+                        if(d>data.Dmax):#Maximun distances exceeded
+                            z[j]=-1
+                            c=c-1
+                            continue
+                        assign2=j
+                    else:
+                        c=c-1    
+                        z[j]=-1
                 if assign1>-1 and assign2==-1: #Teacher with one assign
                     teachersOne.append({"pos":assign1,"teacher":i})
                 elif assign1==-1:#Teacher don't assigned
                     teachersZero.append(i)
 
+            free=FreeClasses(z)
+
             while len(teachersOne)>0:
                 indx=randrange(len(teachersOne)) #Select a Teacher randomly
                 i=teachersOne[indx]   
                 teachersOne.remove(i)    
                 #Search another class for the same teacher that match all constraints with dist min between estableshment
-                dist2_min=999999
-                pos2_min=-1
-                for j in range(data.CLASS_SIZE): 
-                    if z[j]==-1:
-                        if data.C[j][1]!=data.C[i['pos']][1]:
-                            e1=data.C[j][4]-1
-                            e2=data.C[i['pos']][4]-1
-                            dist=distance.distance((data.E[e1][1],data.E[e1][2]),(data.E[e2][1],data.E[e2][2])).kilometers
-                            if dist<=data.Dmax:
-                                if dist<dist2_min:
-                                    dist2_min=dist    
-                                    pos2_min=j
-                                    if e1==e2:
-                                        break
+                pos2_min=free.nearestToClass(i['pos'],data.Dmax)
                 if pos2_min!=-1:
                    z[pos2_min]=i['teacher']
+                   free.take(pos2_min)
                    c=c+1                 
                 if c==data.CLASS_SIZE:
                     break
@@ -98,37 +167,20 @@ class AEEEFeacible(Repair):
                 indx=randrange(len(teachersZero)) #Select a Teacher randomly
                 i=teachersZero[indx]   
                 teachersZero.remove(i)                   
-                dist_min=999999
-                pos_min=-1
-                for j in range(data.CLASS_SIZE):
-                    if z[j]==-1:
-                        e=data.C[j][4]-1
-                        dist=distance.distance((data.E[e][1],data.E[e][2]),(data.D[i][1],data.D[i][2])).kilometers
-                        if dist<dist_min:
-                            dist_min=dist
-                            pos_min=j
+                pos_min=free.nearestToTeacher(i)
+                if pos_min==-1:
+                    break
                 z[pos_min]=i
+                free.take(pos_min)
                 c=c+1
                 if(c==data.CLASS_SIZE):
                     break
 
                 #Search another class for the same teacher that match all constraints with dist min between estableshment
-                dist2_min=999999
-                pos2_min=-1
-                for j in range(data.CLASS_SIZE): 
-                    if z[j]==-1:
-                        if data.C[j][1]!=data.C[pos_min][1]:
-                            e1=data.C[j][4]-1
-                            e2=data.C[pos_min][4]-1
-                            dist=distance.distance((data.E[e1][1],data.E[e1][2]),(data.E[e2][1],data.E[e2][2])).kilometers
-                            if dist<=data.Dmax:
-                                if dist<dist2_min:
-                                    dist2_min=dist    
-                                    pos2_min=j
-                                    if e1==e2:
-                                        break
+                pos2_min=free.nearestToClass(pos_min,data.Dmax)
                 if pos2_min!=-1:
                     z[pos2_min]=i
+                    free.take(pos2_min)
                     c=c+1   
 
         # set the design variables for the population
@@ -136,9 +188,11 @@ class AEEEFeacible(Repair):
         print("End repair")
         return pop
 
-def generate_ind(name,q): 
+#Greedy heuristic individual, used by seeding.HeuristicSampling
+def generate_ind(name): 
     print("Start generate ind "+str(name))
     ind=[-1]*data.CLASS_SIZE
+    free=FreeClasses(ind)
     teachers=[]
     for i in range(data.TEACHER_SIZE):
         teachers.append(i)
@@ -148,39 +202,20 @@ def generate_ind(name,q):
         i=teachers[indx]        
         teachers.remove(i)
         #print("Asignando docente: "+str(i)+" en hilo "+str(name)+". Disponibles: "+str(len(teachers)))
-        dist_min=999999
-        pos_min=-1
-        for j in range(data.CLASS_SIZE):
-            if ind[j]==-1:
-                e=data.C[j][4]-1
-                dist=distance.distance((data.E[e][1],data.E[e][2]),(data.D[i][1],data.D[i][2])).kilometers
-                if dist<dist_min and dist<=data.Dmax:
-                    dist_min=dist
-                    pos_min=j
+        pos_min=free.nearestToTeacher(i,data.Dmax)
         if pos_min==-1:
             continue
         ind[pos_min]=i
+        free.take(pos_min)
         c=c+1
         if(c==data.CLASS_SIZE):
             break
 
         #Search another class for the same teacher that match all constraints with dist min between estableshment
-        dist2_min=999999
-        pos2_min=-1
-        for j in range(data.CLASS_SIZE): 
-            if ind[j]==-1:
-                if data.C[j][1]!=data.C[pos_min][1]:
-                    e1=data.C[j][4]-1
-                    e2=data.C[pos_min][4]-1
-                    dist=distance.distance((data.E[e1][1],data.E[e1][2]),(data.E[e2][1],data.E[e2][2])).kilometers
-                    if dist<=data.Dmax:
-                        if dist<dist2_min:
-                            dist2_min=dist    
-                            pos2_min=j
-                            if e1==e2:
-                                break
+        pos2_min=free.nearestToClass(pos_min,data.Dmax)
         if pos2_min!=-1:
             ind[pos2_min]=i
+            free.take(pos2_min)
             c=c+1   
-    print("Ind added by process: "+str(name))
-    q.put(ind)
\ No newline at end of file
+    print("Ind generated: "+str(name))
+    return ind
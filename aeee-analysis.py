@@ -1,13 +1,8 @@
-import csv
-from re import S
 import psycopg2
-from geopy import distance
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib import cm
-import matplotlib.pyplot as plt
 import numpy as np
 import plotly.express as px
 import pandas as pd
+import pareto
 import sys
 
 print("Load results...")
@@ -17,7 +12,8 @@ print("Load results...")
 if __name__ == '__main__':
 
     global  HOST, GRADE, DATABASE, PASS
-    GRADE = 1
+    #Grade to plot (all grades are summarized)
+    GRADE = int(sys.argv[1]) if len(sys.argv) > 1 else 1
 
 
     HOST = '143.255.142.228'
@@ -27,79 +23,39 @@ if __name__ == '__main__':
     # Class
     conn = psycopg2.connect(
         "host=" + HOST + ", dbname=" + DATABASE + " user=postgres password=" + PASS + " port=5432")
-    cur = conn.cursor()
 
-    cur.execute("select * from tesis_prd.get_fo("+str(GRADE)+")")
+    #Every stored front point of every grade and iteration, streamed into arrays
+    F, grades, iterations = pareto.streamResults(conn)
+    mec = {g: pareto.loadMec(conn, int(g)) for g in np.unique(grades)}
+    conn.close()
 
-    for row in cur:
-        f1m = row[0]
-        f2m = row[1]
-        f3m = row[2]
+    #Per grade and iteration: non-dominated points, averages, hypervolume and IGD against X MEC
+    table = pareto.summary(F, grades, iterations, mec)
+    print(table.to_string(index=False))
 
-    cur.execute("select fo1, fo2, fo3 from tesis_prd.resultados_py where grado = " + str(GRADE))
+    # Non-dominated solutions of the grade (Min f1, Min f2, Max f3)
+    P = F[grades == GRADE]
+    ND = P[pareto.nonDominated(P)]
+    f1a, f2a, f3a = ND.mean(axis=0)
+    f1m, f2m, f3m = mec[GRADE]
 
-    P = set()
-    # Non-dominated solutions
-    ND = set()
-    # Search Non-dominated Solutions
-
-
-    for row in cur:
-       f1a2 = row[0]
-       f2a2 = row[1]
-       f3a2 = row[2]
-       P.add((f1a2, f2a2, f3a2, "Conjunto Pareto", 10))
-
-
-    for i1 in P:
-        isNonDominated = True
-        c = 0
-        for i2 in P:
-            if i1 != i2:
-                if i1[0] >= i2[0] and i1[1] >= i2[1] and i1[2] <= i2[2]:  # Min f1, Min f2, Max f3
-                    if i1[0] > i2[0] or i1[1] > i2[1] or i1[2] < i2[2]:
-                        c = c + 1
-        if c == 0:
-            ND.add(i1)
-
-    P = ND
-
-    f1a = 0
-    for i1 in P:
-        f1a = f1a + i1[0]
-
-    f1a = f1a / len(P)
-
-    f2a = 0
-    for i1 in P:
-        f2a = f2a + i1[1]
-
-    f2a = f2a / len(P)
-
-    f3a = 0
-    for i1 in P:
-        f3a = f3a + i1[2]
-
-    f3a = f3a / len(P)
-
-
-    # P.add((0,1,2,"Óptimo Teórico",10))
-    P.add((f1a, f2a, f3a, "ND", 10))
-    P.add((f1m, f2m, f3m, "X MEC", 10))
-
-    print("ND: " + str(len(P)))
+    print("ND: " + str(len(ND)))
     print("X_A: " + str([f1a, f2a, f3a]))
     print("X_MEC: " + str([f1m, f2m, f3m]))
 
     # creating a list of column names
-    column_values = ['f1(X)', 'f2(X)', 'f3(X)', "datos", "size"]
+    column_values = ['f1(X)', 'f2(X)', 'f3(X)']
 
     # creating the dataframe
-    df = pd.DataFrame(data=P,
-                      columns=column_values)
+    df = pd.DataFrame(data=ND, columns=column_values)
+    df["datos"] = "Conjunto Pareto"
+    # df.loc[len(df)] = [0, 1, 2, "Óptimo Teórico"]
+    df.loc[len(df)] = [f1a, f2a, f3a, "ND"]
+    df.loc[len(df)] = [f1m, f2m, f3m, "X MEC"]
+    df["size"] = 10
 
     fig = px.scatter_3d(df, x='f1(X)', y='f2(X)', z='f3(X)', color='datos', size="size", labels={
 
     })
 
-    fig.show()
\ No newline at end of file
+    fig.show()
@@ -0,0 +1,114 @@
+#Persistent best-known Pareto front of AEEE, one .npz per grade and data version
+#Each run inserts its front incrementally (only the new points are compared with the archive) and the
+#size is bounded by dropping the points with the smallest crowding distance. Only feasible points enter
+#Concurrent runs of the same grade serialize the insertion with a lock file next to the archive
+import os
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+import dominance
+try:
+    import fcntl
+except ImportError: #Windows
+    fcntl = None
+    import msvcrt
+
+#All objectives of res.F are minimized by pymoo
+MINIMIZE = np.ones(3)
+
+#Data version: hash of the classes and students of the grade (a new load from the database with the
+#same rows gives the same version)
+def dataVersion(C, P):
+    h = hashlib.sha1()
+    h.update(repr(C).encode())
+    h.update(repr(P).encode())
+    return h.hexdigest()[:12]
+
+def archivePath(grade, version, folder="."):
+    return os.path.join(folder, "aeee-front-" + str(grade) + "-" + version + ".npz")
+
+#Saved front as (F, X), empty arrays if there is none yet
+def load(path):
+    if not os.path.exists(path):
+        return np.empty((0, 3)), None
+    with np.load(path) as saved:
+        return saved["F"], saved["X"]
+
+#Exclusive lock between processes on path + ".lock" (flock on Linux/macOS, msvcrt.locking on Windows)
+#Waits until whoever holds it releases it
+@contextmanager
+def lock(path):
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: #LK_LOCK gives up after 10 attempts
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+#Crowding distance of every row of F (extremes of each objective get infinity)
+def crowding(F):
+    n, m = F.shape
+    cd = np.zeros(n)
+    for j in range(m):
+        order = np.argsort(F[:, j], kind="mergesort")
+        f = F[order, j]
+        span = f[-1] - f[0]
+        gap = np.full(n, np.inf)
+        if n > 2:
+            gap[1:-1] = (f[2:] - f[:-2]) / (span if span > 0 else 1.0)
+        cd[order] += gap
+    return cd
+
+#Insert the rows of F (and X) into the archive on path: infeasible points (CV > 0) and new points dominated
+#by the archive are discarded, archived points dominated by the new ones are removed, and above maxSize the
+#most crowded points go (one at a time, recomputing the crowding distance). Returns how many new points stayed
+#The read-merge-write runs under lock(path), so concurrent runs do not drop each other's points
+def insert(path, F, X, CV=None, maxSize=500):
+    F = np.atleast_2d(np.asarray(F, dtype=float))
+    X = np.atleast_2d(np.asarray(X)).astype(np.int32)
+    if CV is not None:
+        feasible = (np.asarray(CV, dtype=float).reshape(len(F), -1) <= 0).all(axis=1)
+        F, X = F[feasible], X[feasible]
+        if len(F) == 0:
+            return 0
+    keep = dominance.nonDominated(F, MINIMIZE)
+    F, X = F[keep], X[keep]
+
+    with lock(path):
+        return merge(path, F, X, maxSize)
+
+#Merge the non-dominated feasible rows of F (and X) with the archive on path and save it (see insert)
+def merge(path, F, X, maxSize):
+    oldF, oldX = load(path)
+    nOld = 0
+    if len(oldF):
+        new = ~dominance.dominatedBy(F, oldF) & ~(F[:, None, :] == oldF[None]).all(axis=2).any(axis=1)
+        F, X = F[new], X[new]
+        if len(F) == 0:
+            return 0
+        stay = ~dominance.dominatedBy(oldF, F)
+        F = np.concatenate([oldF[stay], F])
+        X = np.concatenate([oldX[stay], X])
+        nOld = int(stay.sum())
+
+    index = np.arange(len(F))
+    while len(index) > maxSize:
+        index = np.delete(index, np.argmin(crowding(F[index])))
+
+    tmp = path + "." + str(os.getpid()) + ".tmp.npz"
+    np.savez_compressed(tmp, F=F[index], X=X[index])
+    os.replace(tmp, path)
+    return int((index >= nOld).sum())
@@ -1,98 +1,94 @@
-import multiprocessing
-from pymoo.core.problem import starmap_parallelized_eval
 from pymoo.algorithms.moo.nsga2 import NSGA2
 from pymoo.factory import get_crossover, get_mutation
-from pymoo.optimize import minimize
 from pymoo.visualization.scatter import Scatter
-from pymoo.core.population import Population
-from pymoo.factory import get_sampling
-from multiprocessing import Process, Manager
-from problem import ADEEProblem,AEEEFeacible,generate_ind
+from problem import ADEEProblem,AEEEFeacible,generate_ind,evaluateChunk,sharedData,setupWorker
+from seeding import HeuristicSampling
+from sharedeval import ParallelEvaluator
+import checkpoint
+from results import saveFront
+import archive
 import datadb as data
+import distancematrix
 import psycopg2
 import sys
 
-#Initialize
-data.init(grade_input=sys.argv[1], iteration_input=sys.argv[2])
-
 if __name__ == '__main__':
-    mananger = Manager()
-    q = mananger.Queue()
-    
-    #Init population on 10 group
-    process=[]
-    cp=10
-    for i in range(0):
-        print("Start group: "+str(i))
-        for index in range(cp):
-            print("Main    : create and start process %d." % index)
-            p = Process(target=generate_ind, args=(index,q))
-            process.append(p) 
-            p.start()     
-            
-        for p in process:
-            p.join()
-
-        print("End group: "+str(i))
-
-    pop_0=[]
-    while not q.empty():
-        pop_0.append(q.get())
-
-    pop_0 = Population.new("X", pop_0)
+    #Initialize (distances with numpy haversine; --geodesic uses geopy, exact but slow to build)
+    distanceMode = distancematrix.GEODESIC if "--geodesic" in sys.argv else distancematrix.HAVERSINE
+    data.init(grade_input=sys.argv[1], iteration_input=sys.argv[2], distance_mode=distanceMode)
+
+    #Init population: pop_size individuals built on 10 processes
+    #(workers started without fork load the data again with data.init)
+    pop_0 = HeuristicSampling(generate_ind, n_workers=10, seed=1,
+                              init=data.init, initArgs=(sys.argv[1], sys.argv[2], distanceMode))
+
+    #Checkpoint every 10 generations; with --resume the run continues from the last one
+    #(its population is already evaluated and replaces the initial population)
+    checkpointPath = "aeee-checkpoint-" + sys.argv[1] + "-" + sys.argv[2] + ".npz"
+    state = checkpoint.load(checkpointPath) if "--resume" in sys.argv else None
+    if state is not None:
+        pop_0 = checkpoint.population(state)
 
     # the number of processes to be used for concurrent evaluation of fitness
     n_proccess = 10
-    
-    pool = multiprocessing.Pool(n_proccess)
-
-    # define the problem by passing the starmap interface of the thread pool
-    problem = ADEEProblem(runner=pool.starmap, func_eval=starmap_parallelized_eval)
-
-    # Configure NSGA2 
-    algorithm = NSGA2(pop_size=200,sampling=get_sampling('int_random'),
-                crossover=get_crossover("int_exp"),
-                mutation=get_mutation("int_pm"),
-                repair=AEEEFeacible(),
-                eliminate_duplicates=True)
-
-    #Optimize
-    res = minimize(problem,
-                algorithm,
-                ('n_gen', 200),
-                seed=1,
-                verbose=True)
-
-
-    f = open("result.txt", "w")
-    f.write("Time: %s" % res.exec_time)
-    f.write("Best solution found:")
-    f.write(str(res.X))
-    f.write("Function value: %s" % res.F)
-    f.write("Constraint violation: %s" % res.CV)
-    f.close()
-
-    print('Time:', res.exec_time)
-
-    # Class
-    conn = psycopg2.connect("host=" + data.HOST + ", dbname=" + data.DATABASE + " user=postgres password=" + data.PASS + " port=5432")
-    cur = conn.cursor()
-    sql = "insert into tesis_prd.resultados_py (fo1, fo2, fo3, grado, iteracion) values (%s,%s,%s,%s,%s)"
-
-
-    print("Best solution found: {0}'".format(res.X) )
-    print("Function value: {0}'".format(res.F))
-    print("Constraint violation: {0}'" .format(res.CV))
-
-    for i in res.F:
-        cur.execute(sql, (i[0], i[1],i[2], data.GRADE, data.ITERATION))
-        conn.commit()
-
-
-    cur.close()
-    conn.close()
 
-    pool.close()
+    # the data is shared once with the workers, each generation they evaluate chunks of the population
+    arrays, values = sharedData()
+    evaluator = ParallelEvaluator(setupWorker, evaluateChunk, arrays, values, n_workers=n_proccess)
+
+    #the worker pool and its shared memory are released even if the run or the saving fails
+    try:
+        # the problem evaluates the whole population at once (vectorized, by chunks)
+        problem = ADEEProblem(evaluator=evaluator)
+
+        # Configure NSGA2 
+        algorithm = NSGA2(pop_size=200,sampling=pop_0,
+                    crossover=get_crossover("int_exp"),
+                    mutation=get_mutation("int_pm"),
+                    repair=AEEEFeacible(),
+                    eliminate_duplicates=True)
+
+        #Optimize
+        res = checkpoint.run(problem,
+                    algorithm,
+                    200,
+                    seed=1,
+                    path=checkpointPath,
+                    every=10,
+                    state=state,
+                    verbose=True)
+
+
+        f = open("result.txt", "w")
+        f.write("Time: %s" % res.exec_time)
+        f.write("Best solution found:")
+        f.write(str(res.X))
+        f.write("Function value: %s" % res.F)
+        f.write("Constraint violation: %s" % res.CV)
+        f.close()
+
+        print('Time:', res.exec_time)
+
+        # Class
+        conn = psycopg2.connect("host=" + data.HOST + ", dbname=" + data.DATABASE + " user=postgres password=" + data.PASS + " port=5432")
+
+
+        print("Best solution found: {0}'".format(res.X) )
+        print("Function value: {0}'".format(res.F))
+        print("Constraint violation: {0}'" .format(res.CV))
+
+        # whole front (objectives and compressed decision vectors) in one insert and one commit
+        saved = saveFront(conn, res.F, res.X, data.GRADE, data.ITERATION)
+        print("Front saved: {0} solutions".format(saved))
+
+        #best-known front of the grade across runs and iterations (same data version, feasible points only)
+        frontPath = archive.archivePath(data.GRADE, archive.dataVersion(data.C, data.P))
+        added = archive.insert(frontPath, res.F, res.X, res.CV)
+        print("Archived front: {0} new solutions ({1})".format(added, frontPath))
+
+        conn.close()
+    finally:
+        evaluator.close()
 
     plot = Scatter()
     plot.add(problem.pareto_front(), plot_type="line", color="black", alpha=0.7)
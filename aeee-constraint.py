@@ -1,18 +1,18 @@
 import datadb as data
+import numpy as np
 
 #Compute all restrictions
 def validateConstraints(X):    
-    valid_c1=0
-    valid_c2 = 0
-    n_p=len(data.P)
-    for j in range(n_p):
-        c=1
-        class_index = X[j]
-        if (data.P[j][3] != data.C[class_index][0]):  # The class should be the same grade as the student requered
-            valid_c1 = 1
-            break
-        if  not X[j] : #All the students should be assign
-            valid_c2 = 1
+    return validatePopulation(np.atleast_2d(X))[0].tolist()
+
+#Compute all restrictions for a whole population, one individual per row
+def validatePopulation(X):
+    X = np.asarray(X, dtype=int)
+    # The class should be the same grade as the student requered
+    wrong = data.PERSON_GRADE != data.CLASS_GRADE[X]
+    valid_c1 = wrong.any(axis=1)
+    # All the students should be assign (-1 marks a student without class)
+    valid_c2 = (X < 0).any(axis=1)
   ##      for l in range(n_p):
   #          if(j!=l and X[j]==X[l]):
   #              c=c+1
@@ -20,5 +20,4 @@ def validateConstraints(X):
   #                  valid_c2=1
   #                  break
 
-
-    return [valid_c1, valid_c2]
\ No newline at end of file
+    return np.column_stack([valid_c1, valid_c2]).astype(int)
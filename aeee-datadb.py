@@ -1,9 +1,12 @@
 # data of Problem Assign Studen
 import psycopg2
+import numpy as np
+import distancematrix
 
 
-def init(grade_input, iteration_input):
+def init(grade_input, iteration_input, distance_mode=distancematrix.HAVERSINE):
     global  C, P, E, CLASS_SIZE, PERSON_SIZE, ESTABLISMENT_SIZE, N_OBJ, N_CONSTR, HOST, GRADE, ITERATION, DATABASE, PASS
+    global  CLASS_QUALITY, CLASS_GRADE, PERSON_GRADE
     GRADE = grade_input
     ITERATION = iteration_input
 
@@ -48,3 +51,12 @@ def init(grade_input, iteration_input):
 
     cur.close()
     conn.close()
+
+    # Precompute establishment and student distances
+    distancematrix.init(E, C, P, mode=distance_mode)
+
+    # Per class arrays: average quality of its establishment and grade
+    CLASS_QUALITY = np.array([(float(E[k][3]) + float(E[k][4]) + float(E[k][5])) / 3
+                              for k in (int(c[4] - 1) for c in C)], dtype=float)
+    CLASS_GRADE = np.array([c[0] for c in C])
+    PERSON_GRADE = np.array([p[3] for p in P])
@@ -0,0 +1,44 @@
+#Pareto dominance of 3-objective sets (NumPy only, shared by aeee-pareto and aeee-archive)
+#Objectives: min f1, min f2, max f3 (f3 is negated internally to minimize all)
+import bisect
+import numpy as np
+
+SENSE = np.array([1.0, 1.0, -1.0])
+
+#True where row i of A is dominated by some row of B (minimization), comparing by blocks of A
+def dominatedBy(A, B, cells=20000000):
+    dominated = np.zeros(len(A), dtype=bool)
+    if len(A) == 0 or len(B) == 0:
+        return dominated
+    step = max(1, cells // (len(B) * A.shape[1]))
+    for i in range(0, len(A), step):
+        a = A[i:i + step, None, :]
+        dominated[i:i + step] = ((B[None] <= a).all(axis=2) & (B[None] < a).any(axis=2)).any(axis=1)
+    return dominated
+
+#Indices of the non-dominated rows of F (3 objectives with the given senses, repeated points kept once)
+#Kung's sweep: in lexicographic order a point can only be dominated by an earlier one, and it is iff
+#an earlier point is not worse in f2 and f3, which is looked up by bisection on the 2D staircase
+#(f2 ascending, f3 descending) of the points kept so far
+def nonDominated(F, sense=SENSE):
+    F = np.asarray(F, dtype=float) * sense
+    if len(F) == 0:
+        return np.empty(0, dtype=int)
+    _, first = np.unique(F, axis=0, return_index=True)
+    order = first[np.lexsort(F[first].T[::-1])]
+
+    keep = np.zeros(len(F), dtype=bool)
+    stairY = []
+    stairZ = []
+    for i, y, z in zip(order.tolist(), F[order, 1].tolist(), F[order, 2].tolist()):
+        k = bisect.bisect_right(stairY, y)
+        if k > 0 and stairZ[k - 1] <= z:
+            continue
+        keep[i] = True
+        #drop the steps now dominated in (f2, f3): from k on while their f3 is not better
+        end = k
+        while end < len(stairZ) and stairZ[end] >= z:
+            end += 1
+        stairY[k:end] = [y]
+        stairZ[k:end] = [z]
+    return np.flatnonzero(keep)
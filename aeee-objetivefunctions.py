@@ -1,54 +1,36 @@
 import datadb
-from geopy import distance
+import distancematrix
 import datadb as data
+import numpy as np
 #X is a vector of all the students and with have the class asignment as data
 #Calculate f1(X) - Average assigments per class
 def f1(X):
-    result=0
-    for i in range(len(data.C)):
-        count_student_assigned = 0
-
-        for j in range(len(X)):
-            if i==X[j]:
-                count_student_assigned=count_student_assigned+1
-
-        distance = abs(30-count_student_assigned)
-
-        result=result+distance
-
-    result=result/data.CLASS_SIZE
-    round(result, 6)
-    return float(result)
+    return float(evaluatePopulation(np.atleast_2d(X))[0, 0])
 
 #Calculate f2(X) - Average distance between Student Home and Establishment
 def f2(X):
-    result=0
-    n_p=len(data.P)
-    for j in range(n_p):
-        #id of class
-        i=X[j]
-        #Establisment ID
-        k=int(data.C[i][4] - 1)
-        #Add distance between Student Home and Establishment
-        d=distance.distance((data.P[j][1],data.P[j][2]),(data.E[k][1],data.E[k][2])).kilometers
-        result=result+d
-    result=result/n_p
-    round(result, 6)
-    return float(result)
+    return float(evaluatePopulation(np.atleast_2d(X))[0, 1])
 
 #Calculate f3(X) - Average quality of establishments assigments
 def f3(X):
-    result = 0
-    n_p = len(data.P)
-    for j in range(n_p):
-        # id of class
-        i = X[j]
-        # Establisment ID
-        k = data.C[i][4] - 1
-        ##sum the valoration of the establishment per area and divide by 3 to get the average
-        quality = data.E[k][3] + data.E[k][4] + data.E[k][5]
-        result = result + (quality/3)
+    return float(evaluatePopulation(np.atleast_2d(X))[0, 2])
+
+#Calculate [f1, f2, f3] for a whole population, one individual per row
+def evaluatePopulation(X):
+    X = np.asarray(X, dtype=int)
+    n_x, n_p = X.shape
+    n_c = data.CLASS_SIZE
+
+    #f1: students per class with a bincount per row (values out of range are not counted)
+    valid = (X >= 0) & (X < n_c)
+    rows = np.broadcast_to(np.arange(n_x)[:, None], X.shape)
+    count = np.bincount((rows * n_c + X)[valid], minlength=n_x * n_c).reshape(n_x, n_c)
+    f1 = np.abs(30 - count).sum(axis=1) / n_c
+
+    #f2: distance between Student Home and the Establishment of the class
+    f2 = distancematrix.PE[np.arange(n_p), distancematrix.CE[X]].sum(axis=1) / n_p
+
+    #f3: quality of the Establishment of the class
+    f3 = data.CLASS_QUALITY[X].sum(axis=1) / n_p
 
-    result = result / n_p
-    round(result,6)
-    return float(result)
\ No newline at end of file
+    return np.column_stack([f1, f2, f3])
@@ -0,0 +1,103 @@
+#Pareto analytics of the AEEE results stored in tesis_prd.resultados_py
+#Results are streamed with a server-side cursor into NumPy arrays, the non-dominated filter works on
+#sorted blocks (no Python loop over pairs, see aeee-dominance) and hypervolume/IGD are measured against
+#the MEC assignment from tesis_prd.get_fo. Objectives: min f1, min f2, max f3 (f3 is negated internally
+#to minimize all)
+import numpy as np
+import pandas as pd
+from dominance import SENSE, nonDominated
+
+#Rows of resultados_py as arrays F (n x 3), grade (n) and iteration (n), fetched `chunk` rows at a time
+#with a named (server-side) cursor so the whole table is never held as Python tuples
+def streamResults(conn, grade=None, iteration=None, chunk=100000):
+    sql = "select fo1, fo2, fo3, grado, iteracion from tesis_prd.resultados_py"
+    cond = []
+    args = []
+    if grade is not None:
+        cond.append("grado = %s")
+        args.append(grade)
+    if iteration is not None:
+        cond.append("iteracion = %s")
+        args.append(iteration)
+    if cond:
+        sql = sql + " where " + " and ".join(cond)
+
+    cur = conn.cursor(name="aeee_pareto")
+    cur.itersize = chunk
+    cur.execute(sql, args)
+    blocks = []
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            break
+        blocks.append(np.array(rows, dtype=float))
+    cur.close()
+    conn.commit()
+
+    data = np.concatenate(blocks) if blocks else np.empty((0, 5))
+    return data[:, :3], data[:, 3].astype(int), data[:, 4].astype(int)
+
+#MEC objective values (f1, f2, f3) of a grade
+def loadMec(conn, grade):
+    cur = conn.cursor()
+    cur.execute("select * from tesis_prd.get_fo(%s)", (grade,))
+    row = cur.fetchone()
+    cur.close()
+    return np.array(row[:3], dtype=float)
+
+#Exact hypervolume of a 3-objective set (given senses) with respect to ref
+#Slices along f3: the area of each slice is the 2D staircase of the points below it, computed for
+#`block` slices at once with a running minimum over the points sorted by f1
+def hypervolume(F, ref, sense=SENSE, block=256):
+    F = np.asarray(F, dtype=float) * sense
+    ref = np.asarray(ref, dtype=float) * sense
+    F = F[(F < ref).all(axis=1)]
+    if len(F) == 0:
+        return 0.0
+    F = F[np.argsort(F[:, 2])]
+    byX = np.argsort(F[:, 0])
+    x = F[byX, 0]
+    width = np.diff(np.append(x, ref[0]))
+    z = np.append(F[:, 2], ref[2])
+
+    volume = 0.0
+    for s in range(0, len(F), block):
+        slices = np.arange(s, min(s + block, len(F)))
+        #y of the points already below each slice (in f1 order), ref otherwise
+        y = np.where(byX[None, :] <= slices[:, None], F[byX, 1][None, :], ref[1])
+        area = ((ref[1] - np.minimum.accumulate(y, axis=1)) * width).sum(axis=1)
+        volume += (area * (z[slices + 1] - z[slices])).sum()
+    return float(volume)
+
+#Inverted generational distance: mean distance from each reference point to its nearest point of F
+def igd(F, reference, sense=SENSE, block=2000):
+    F = np.asarray(F, dtype=float) * sense
+    R = np.atleast_2d(np.asarray(reference, dtype=float)) * sense
+    if len(F) == 0:
+        return np.inf
+    d = np.empty(len(R))
+    for i in range(0, len(R), block):
+        d[i:i + block] = np.sqrt(((R[i:i + block, None, :] - F[None]) ** 2).sum(axis=2)).min(axis=1)
+    return float(d.mean())
+
+#One row per grade and iteration (and per grade, iteration -1, for all its iterations together):
+#stored points, non-dominated points, mean objectives of the front, hypervolume with the MEC point as
+#reference, IGD to the MEC point and IGD to the front of the whole grade
+def summary(F, grades, iterations, mec):
+    rows = []
+    for g in np.unique(grades):
+        inGrade = grades == g
+        gradeF = F[inGrade]
+        gradeFront = gradeF[nonDominated(gradeF)]
+        groups = [(-1, np.ones(len(gradeF), dtype=bool))]
+        groups += [(it, iterations[inGrade] == it) for it in np.unique(iterations[inGrade])]
+        for it, mask in groups:
+            P = gradeF[mask]
+            front = P[nonDominated(P)]
+            m = mec.get(g)
+            rows.append({"grado": g, "iteracion": it, "puntos": len(P), "nd": len(front),
+                         "f1": front[:, 0].mean(), "f2": front[:, 1].mean(), "f3": front[:, 2].mean(),
+                         "hv_mec": np.nan if m is None else hypervolume(front, m),
+                         "igd_mec": np.nan if m is None else igd(front, m),
+                         "igd_grado": igd(front, gradeFront)})
+    return pd.DataFrame(rows)
@@ -1,75 +1,128 @@
-from pymoo.core.problem import ElementwiseProblem
+from pymoo.core.problem import Problem
 import datadb as data
-from constraint import validateConstraints
-from geopy import distance
+import distancematrix
+import numpy as np
+from constraint import validatePopulation
 from random import randrange
 from pymoo.core.repair import Repair
-from objetivefunctions import f1,f2,f3
+from objetivefunctions import evaluatePopulation
 
 
-class ADEEProblem(ElementwiseProblem):
+#Vectorized: each call evaluates the whole population (one individual per row),
+#in this process or by chunks on a sharedeval.ParallelEvaluator
+class ADEEProblem(Problem):
 
-    def __init__(self, **kwargs):
+    def __init__(self, evaluator=None, **kwargs):
         super().__init__(n_var=data.PERSON_SIZE, n_obj=data.N_OBJ,
                          n_constr=0, xl=0, xu=data.CLASS_SIZE-1, type_var=int,**kwargs)
+        self.evaluator = evaluator
 
     def _evaluate(self, x, out, *args, **kwargs):
-        e=[f1(x), f2(x), f3(x)*-1]
-        print(e)
-        out["F"] = e #For minimization context, with multiply *-1
-        out["G"] = validateConstraints(x)
-
+        if self.evaluator is None:
+            F, G = evaluateChunk(x)
+        else:
+            F, G = self.evaluator(x)
+        out["F"] = F #For minimization context, with multiply *-1
+        out["G"] = G
+
+#Evaluate a chunk of the population (one individual per row)
+def evaluateChunk(X):
+    e=evaluatePopulation(X)
+    e[:, 2]=e[:, 2]*-1
+    return e, validatePopulation(X)
+
+#Data needed by evaluateChunk: arrays (shared memory) and values (sent once per worker)
+def sharedData():
+    arrays = {"CE": distancematrix.CE, "PE": distancematrix.PE, "CLASS_QUALITY": data.CLASS_QUALITY,
+              "CLASS_GRADE": data.CLASS_GRADE, "PERSON_GRADE": data.PERSON_GRADE}
+    values = {"CLASS_SIZE": data.CLASS_SIZE}
+    return arrays, values
+
+#Install the shared data on a worker (see sharedeval.ParallelEvaluator)
+def setupWorker(arrays, values):
+    distancematrix.CE = arrays["CE"]
+    distancematrix.PE = arrays["PE"]
+    data.CLASS_QUALITY = arrays["CLASS_QUALITY"]
+    data.CLASS_GRADE = arrays["CLASS_GRADE"]
+    data.PERSON_GRADE = arrays["PERSON_GRADE"]
+    data.CLASS_SIZE = values["CLASS_SIZE"]
+
+#Reassign every student without a class of its grade in one pass over the population
+#nearest=False: random eligible class; nearest=True: nearest eligible class with free capacity
 class AEEEFeacible(Repair):
 
+    def __init__(self, nearest=False, **kwargs):
+        super().__init__(**kwargs)
+        self.nearest = nearest
+        # grade -> eligible classes (classes of the same grade)
+        self.eligible = {g: np.flatnonzero(data.CLASS_GRADE == g) for g in np.unique(data.PERSON_GRADE)}
+        self.capacity = np.array([c[5] for c in data.C], dtype=int)
+
     def _do(self, problem, pop, **kwargs):
 
         print("Start repair")
 
         # the packing plan for the whole population (each row one individual)
-        Z = pop.get("X")
-
-        # now repair each indvidiual zi
-        for zi in range(len(Z)):
-            # the packing plan for zi
-            z = Z[zi]
-
-            valid=validateConstraints(z)
-            
-            if valid[0]==0 and valid[1]==0:
-                continue
-
-
-            for j in range(len(z)):
-                class_index = z[j]
-                # if the student is assigned to a diferent grade
-                if data.P[j][3] != data.C[class_index][0]:
-                    z[j] = -1
-                    continue
-
-            #searh over the students with not assignments
-            for j in range(len(z)):
-
-
-                if z[j]==-1:
-                    class_index = randrange(data.CLASS_SIZE)
-                    z[j] = class_index
-
-
-       # set the design variables for the population
+        Z = np.asarray(pop.get("X"), dtype=int)
+
+        # students not assigned or assigned to a diferent grade
+        out = (Z < 0) | (Z >= data.CLASS_SIZE)
+        wrong = out | (data.PERSON_GRADE != data.CLASS_GRADE[np.where(out, 0, Z)])
+
+        if wrong.any():
+            if self.nearest:
+                self._nearest(Z, wrong)
+            else:
+                for g, classes in self.eligible.items():
+                    if len(classes) == 0: #No class for this grade, can't be repaired
+                        continue
+                    mask = wrong & (data.PERSON_GRADE == g)
+                    Z[mask] = classes[np.random.randint(len(classes), size=mask.sum())]
+
+        # set the design variables for the population
         pop.set("X", Z)
         print("End repair")
         return pop
 
-def generate_ind(name,q): 
-    print("Start generate ind "+str(name))
-    ind=[-1]*data.PERSON_SIZE
-
-
-
-    for j in range(data.PERSON_SIZE):
-        indx = randrange(data.CLASS_SIZE)
-        ind[j] = indx
-
-
-    print("Ind added by process: "+str(name))
-    q.put(ind)
\ No newline at end of file
+    def _nearest(self, Z, wrong):
+        n_c = data.CLASS_SIZE
+        for zi in np.flatnonzero(wrong.any(axis=1)):
+            # free capacity left by the students already well assigned
+            free = self.capacity - np.bincount(Z[zi][~wrong[zi]], minlength=n_c)
+            for j in np.flatnonzero(wrong[zi]):
+                i = nearestClass(j, self.eligible[data.PERSON_GRADE[j]], free)
+                if i < 0:
+                    continue
+                Z[zi, j] = i
+                free[i] = free[i] - 1
+
+#Nearest class to student j home among the eligible classes with free capacity
+#(the nearest eligible class if every one is full, -1 if there is none)
+#Scans establishments by distance (distancematrix.personOrder) and stops at the first free class
+def nearestClass(j, classes, free):
+    if len(classes) == 0:
+        return -1
+    column = distancematrix.CE[classes]
+    available = free[classes] > 0
+    if not available.any():
+        return classes[np.argmin(distancematrix.PE[j, column])]
+    for k in distancematrix.personOrder(j):
+        here = classes[(column == k) & available]
+        if len(here):
+            return here[0]
+
+#Heuristic individual, used by seeding.HeuristicSampling: students in random order,
+#each one to the nearest class of its grade with free capacity (see nearestClass)
+def generate_ind(name):
+    eligible = {g: np.flatnonzero(data.CLASS_GRADE == g) for g in np.unique(data.PERSON_GRADE)}
+    free = np.array([c[5] for c in data.C], dtype=int)
+    ind = [-1]*data.PERSON_SIZE
+
+    for j in np.random.permutation(data.PERSON_SIZE):
+        i = nearestClass(j, eligible[data.PERSON_GRADE[j]], free)
+        if i < 0: #No class for this grade, left to the repair
+            i = randrange(data.CLASS_SIZE)
+        ind[j] = int(i)
+        free[i] = free[i] - 1
+
+    return ind
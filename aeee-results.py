@@ -0,0 +1,65 @@
+#Pareto front persistence on tesis_prd.resultados_py
+#The whole front goes in one statement and one commit, with the decision vectors compressed
+import zlib
+import numpy as np
+import psycopg2
+import psycopg2.extras
+
+#Set once the x column is known to exist, so the catalog is only checked once per process
+_schemaReady = False
+
+#Column with the compressed decision vector (int32 + zlib), created if missing
+def ensureSchema(cur):
+    global _schemaReady
+    if _schemaReady:
+        return
+    cur.execute("select 1 from information_schema.columns"
+                " where table_schema = 'tesis_prd' and table_name = 'resultados_py' and column_name = 'x'")
+    if cur.fetchone() is None:
+        cur.execute("alter table tesis_prd.resultados_py add column if not exists x bytea")
+        cur.connection.commit() #Kept even if the insert that follows is rolled back
+    _schemaReady = True
+
+def packX(x):
+    return zlib.compress(np.asarray(x, dtype=np.int32).tobytes(), 6)
+
+def unpackX(b):
+    return np.frombuffer(zlib.decompress(bytes(b)), dtype=np.int32)
+
+#Insert every row of F (and X) for grade/iteration in one round trip
+def saveFront(conn, F, X, grade, iteration):
+    F = np.atleast_2d(F)
+    X = np.atleast_2d(X)
+    rows = [(float(f[0]), float(f[1]), float(f[2]), grade, iteration, psycopg2.Binary(packX(x)))
+            for f, x in zip(F, X)]
+    cur = conn.cursor()
+    try:
+        ensureSchema(cur)
+        psycopg2.extras.execute_values(
+            cur,
+            "insert into tesis_prd.resultados_py (fo1, fo2, fo3, grado, iteracion, x) values %s",
+            rows, page_size=max(1, len(rows)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return len(rows)
+
+#Read back the front of grade (and iteration); returns F (n x 3) and the list of decision vectors
+def loadFront(conn, grade, iteration=None):
+    cur = conn.cursor()
+    sql = "select fo1, fo2, fo3, x from tesis_prd.resultados_py where grado = %s"
+    args = [grade]
+    if iteration is not None:
+        sql = sql + " and iteracion = %s"
+        args.append(iteration)
+    cur.execute(sql, args)
+    F = []
+    X = []
+    for row in cur:
+        F.append(row[:3])
+        X.append(unpackX(row[3]) if row[3] is not None else None)
+    cur.close()
+    return np.array(F, dtype=float).reshape(-1, 3), X
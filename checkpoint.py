@@ -0,0 +1,83 @@
+#Checkpoint and resume for the NSGA2 runs of ADEE and AEEE
+#Every k generations the population (X, F, G), the random generators and the generation
+#counter are written to a compressed .npz; a run started with the same file continues from it
+import os
+import random
+import numpy as np
+from pymoo.core.population import Population
+from pymoo.core.problem import calc_constr
+
+#Write the current population and random state (temporary file + rename, never half written)
+def save(path, algorithm, summary=None):
+    X, F, G = algorithm.pop.get("X", "F", "G")
+    _, keys, pos, hasGauss, gauss = np.random.get_state()
+    version, pyState, pyGauss = random.getstate()
+    tmp = path + "." + str(os.getpid()) + ".tmp.npz"
+    np.savez_compressed(tmp,
+                        X=np.asarray(X).astype(np.int32),
+                        F=np.asarray(F, dtype=float),
+                        G=np.asarray(G, dtype=float),
+                        n_gen=algorithm.n_gen,
+                        n_eval=algorithm.evaluator.n_eval,
+                        np_keys=keys, np_pos=pos, np_gauss=np.array([hasGauss, gauss], dtype=float),
+                        py_version=version, py_state=np.array(pyState, dtype=np.uint64),
+                        py_gauss=np.nan if pyGauss is None else pyGauss,
+                        summary=np.zeros((0, 0)) if summary is None else np.asarray(summary))
+    os.replace(tmp, path)
+
+#Saved state as a dict of arrays, None if there is no checkpoint yet
+def load(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return {k: saved[k] for k in saved.files}
+
+#Already evaluated population to be used as sampling of the resumed algorithm
+def population(state):
+    G = state["G"]
+    CV = calc_constr(G)
+    pop = Population.new("X", state["X"], "F", state["F"], "G", G, "CV", CV, "feasible", CV <= 0)
+    for ind in pop:
+        ind.evaluated = {"F", "G", "CV", "feasible"}
+    return pop
+
+def restoreRandom(state):
+    hasGauss, gauss = state["np_gauss"]
+    np.random.set_state(("MT19937", state["np_keys"], int(state["np_pos"]), int(hasGauss), float(gauss)))
+    pyGauss = float(state["py_gauss"])
+    random.setstate((int(state["py_version"]), tuple(int(v) for v in state["py_state"]),
+                     None if np.isnan(pyGauss) else pyGauss))
+
+#One row per generation: n_gen, n_eval, cv_min, cv_avg, feasible, min of each objective
+#(bounded history, instead of keeping a copy of the algorithm every generation)
+def summaryRow(algorithm):
+    F, CV = algorithm.pop.get("F", "CV")
+    cv = CV[:, 0]
+    return [algorithm.n_gen, algorithm.evaluator.n_eval, cv.min(), cv.mean(), (cv <= 0).sum(), *F.min(axis=0)]
+
+#Same as minimize(problem, algorithm, ('n_gen', n_gen), seed=seed, verbose=verbose) with checkpoints
+#every `every` generations on `path`; with state (from load) the algorithm must have been created with
+#sampling=population(state), the first step only sorts that population and the run goes on from state n_gen
+#The result has res.summary with the bounded history
+def run(problem, algorithm, n_gen, seed=1, path=None, every=10, state=None, verbose=True):
+    algorithm.setup(problem, termination=('n_gen', n_gen), seed=seed, verbose=verbose)
+    summary = []
+    if state is not None:
+        algorithm.next()
+        algorithm.n_gen = int(state["n_gen"])
+        algorithm.evaluator.n_eval = int(state["n_eval"])
+        algorithm.has_terminated = not algorithm.termination.do_continue(algorithm)
+        summary = [list(r) for r in state["summary"]]
+        restoreRandom(state)
+        print("Resumed from generation " + str(algorithm.n_gen))
+
+    while algorithm.has_next():
+        algorithm.next()
+        summary.append(summaryRow(algorithm))
+        if path is not None and (algorithm.n_gen % every == 0 or not algorithm.has_next()):
+            save(path, algorithm, summary)
+
+    res = algorithm.result()
+    res.algorithm = algorithm
+    res.summary = np.array(summary)
+    return res
@@ -0,0 +1,102 @@
+#Precomputed distances (km) shared by ADEE and AEEE
+#Call init() once after data.init()/datadb.init(); afterwards every lookup is O(1)
+import numpy as np
+from geopy import distance
+from random import randrange
+
+GEODESIC = "geodesic"   #Same values as geopy.distance.distance (slow to build on large sets)
+HAVERSINE = "haversine" #Spherical approximation, built with numpy
+
+EARTH_RADIUS = 6371.0
+
+def init(E, C, P, mode=GEODESIC):
+    #E: establishments [id, lat, long, ...]
+    #C: classes, establishment of class j is E[C[j][4]-1]
+    #P: persons (teachers on ADEE, students on AEEE) [id, lat, long, ...]
+    global MODE, CE, EE, PE, EE_ORDER, PE_ORDER
+    if mode not in (GEODESIC, HAVERSINE):
+        raise ValueError("Unknown distance mode: " + str(mode))
+    MODE = mode
+    EE_ORDER = None
+    PE_ORDER = None
+
+    #Only the establishments used by some class are kept as columns
+    column = {}
+    CE = np.empty(len(C), dtype=np.int64)
+    for j in range(len(C)):
+        k = int(C[j][4] - 1)
+        if k not in column:
+            column[k] = len(column)
+        CE[j] = column[k]
+    est = [E[k] for k in column]
+
+    ll_e = np.array([[float(e[1]), float(e[2])] for e in est]).reshape(-1, 2)
+    ll_p = np.array([[float(p[1]), float(p[2])] for p in P]).reshape(-1, 2)
+
+    if MODE == HAVERSINE:
+        EE = haversine(ll_e[:, None, 0], ll_e[:, None, 1], ll_e[None, :, 0], ll_e[None, :, 1])
+        PE = haversine(ll_p[:, None, 0], ll_p[:, None, 1], ll_e[None, :, 0], ll_e[None, :, 1])
+    else:
+        ll_e = [tuple(x) for x in ll_e]
+        ll_p = [tuple(x) for x in ll_p]
+        n_e = len(ll_e)
+        EE = np.zeros((n_e, n_e))
+        for a in range(n_e):
+            for b in range(a + 1, n_e):
+                EE[a, b] = EE[b, a] = distance.distance(ll_e[a], ll_e[b]).kilometers
+        PE = np.empty((len(ll_p), n_e))
+        for i in range(len(ll_p)):
+            for a in range(n_e):
+                PE[i, a] = distance.distance(ll_p[i], ll_e[a]).kilometers
+
+def haversine(lat1, lon1, lat2, lon2):
+    #Degrees in, kilometers out; works on numpy arrays
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+#Distance between the establishments of classes j and l
+def classes(j, l):
+    return EE[CE[j], CE[l]]
+
+#Distance between person i home and the establishment of class j
+def personClass(i, j):
+    return PE[i, CE[j]]
+
+#Neighbour index: establishment columns sorted by distance (built on first use)
+#Scanning it in order and stopping at the first match or at a maximum distance
+#answers nearest-feasible queries without visiting far establishments
+
+#Columns sorted by distance from establishment column k
+def establishmentOrder(k):
+    global EE_ORDER
+    if EE_ORDER is None:
+        EE_ORDER = np.argsort(EE, axis=1, kind="stable")
+    return EE_ORDER[k]
+
+#Columns sorted by distance from person i home
+def personOrder(i):
+    global PE_ORDER
+    if PE_ORDER is None:
+        PE_ORDER = np.argsort(PE, axis=1, kind="stable")
+    return PE_ORDER[i]
+
+#Compare random lookups against geopy; raises AssertionError out of tolerance
+#Haversine differs from the WGS-84 geodesic by up to ~0.6%
+def checkTolerance(E, C, P, samples=200, rtol=0.006, atol=1e-6):
+    worst = 0.0
+    for _ in range(samples):
+        j = randrange(len(C))
+        l = randrange(len(C))
+        i = randrange(len(P))
+        e1 = E[int(C[j][4] - 1)]
+        e2 = E[int(C[l][4] - 1)]
+        ref = distance.distance((e1[1], e1[2]), (e2[1], e2[2])).kilometers
+        err = abs(classes(j, l) - ref)
+        assert err <= atol + rtol * ref, "Class distance out of tolerance: %s vs %s" % (classes(j, l), ref)
+        worst = max(worst, err)
+        ref = distance.distance((P[i][1], P[i][2]), (e1[1], e1[2])).kilometers
+        err = abs(personClass(i, j) - ref)
+        assert err <= atol + rtol * ref, "Person distance out of tolerance: %s vs %s" % (personClass(i, j), ref)
+        worst = max(worst, err)
+    return worst
@@ -0,0 +1,44 @@
+#Initial population built with a heuristic generator on a process pool (ADEE and AEEE)
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pymoo.core.sampling import Sampling
+
+#Generator of the current worker, set by _initWorker
+_generate = None
+
+#Runs once per worker: load the data if it was not inherited and keep the generator
+def _initWorker(generate, init, initArgs):
+    global _generate
+    if init is not None:
+        init(*initArgs)
+    _generate = generate
+
+#Individual k uses seed+k, so the population does not depend on which worker builds it
+def _seededIndividual(k, seed):
+    random.seed(seed + k)
+    np.random.seed((seed + k) % 2**32)
+    return _generate(k)
+
+class HeuristicSampling(Sampling):
+
+    #generate(k) returns one individual (list of n_var values)
+    #init(*initArgs) loads the problem data on workers that do not inherit it (spawn start method)
+    def __init__(self, generate, n_workers=10, seed=1, init=None, initArgs=()):
+        super().__init__()
+        self.generate = generate
+        self.n_workers = n_workers
+        self.seed = seed
+        self.init = init
+        self.initArgs = initArgs
+
+    def _do(self, problem, n_samples, **kwargs):
+        inherited = multiprocessing.get_start_method() == "fork"
+        init = None if inherited else self.init
+        chunk = max(1, n_samples // (4 * self.n_workers))
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_initWorker,
+                                 initargs=(self.generate, init, self.initArgs)) as executor:
+            X = list(executor.map(_seededIndividual, range(n_samples), [self.seed] * n_samples, chunksize=chunk))
+        print("Initial population generated: " + str(len(X)))
+        return np.array(X, dtype=int)
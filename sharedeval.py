@@ -0,0 +1,74 @@
+#Parallel evaluation of population chunks against data shared once with the workers (ADEE and AEEE)
+#Numeric arrays (distance matrices, per class arrays) are placed in multiprocessing.shared_memory,
+#anything else is sent once per worker; every generation only the chunks of X and the results travel
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+#State of the current worker, set by _initWorker
+_blocks = []
+_evaluate = None
+
+#Copy the numeric arrays to shared memory blocks; returns (blocks, specs, others)
+def share(arrays):
+    blocks = []
+    specs = {}
+    others = {}
+    for name, arr in arrays.items():
+        arr = np.asarray(arr)
+        if arr.dtype.kind not in "biuf" or arr.nbytes == 0:
+            others[name] = arr
+            continue
+        shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs, others
+
+#Open the shared blocks as read only arrays (the blocks stay referenced in blocks)
+def attach(specs, blocks):
+    arrays = {}
+    for name, (shmName, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shmName)
+        blocks.append(shm)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        arrays[name] = arr
+    return arrays
+
+def _initWorker(specs, others, values, setup, evaluate):
+    global _evaluate
+    arrays = attach(specs, _blocks)
+    arrays.update(others)
+    setup(arrays, values)
+    _evaluate = evaluate
+
+def _evaluateChunk(X):
+    return _evaluate(X)
+
+class ParallelEvaluator:
+
+    #setup(arrays, values) runs once in each worker and installs the data where evaluate reads it
+    #evaluate(X) returns (F, G) for a chunk of the population, one individual per row
+    def __init__(self, setup, evaluate, arrays, values, n_workers=10):
+        self.n_workers = n_workers
+        self.blocks, specs, others = share(arrays)
+        self.pool = multiprocessing.Pool(n_workers, initializer=_initWorker,
+                                         initargs=(specs, others, values, setup, evaluate))
+
+    def __call__(self, X):
+        X = np.asarray(X)
+        chunks = [c for c in np.array_split(X, self.n_workers) if len(c) > 0]
+        results = self.pool.map(_evaluateChunk, chunks)
+        F = np.concatenate([r[0] for r in results])
+        G = np.concatenate([r[1] for r in results])
+        return F, G
+
+    #Stop the workers and release the shared memory
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
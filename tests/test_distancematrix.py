@@ -0,0 +1,57 @@
+#Checks the precomputed distance lookups against geopy on a small synthetic instance
+import os
+import sys
+
+import pytest
+from geopy import distance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import distancematrix
+
+#Establishments [id, lat, long], around Asuncion and one far away (Encarnacion)
+E = [[1, -25.2637, -57.5759],
+     [2, -25.3006, -57.6359],
+     [3, -25.3400, -57.5100],
+     [4, -27.3306, -55.8667]]
+#Classes [grade, shift, section, institution, establishment (1-based)]
+C = [[1, 1, 1, 1, 1],
+     [1, 2, 1, 1, 1],
+     [1, 1, 1, 2, 2],
+     [2, 1, 1, 3, 4],
+     [2, 1, 2, 3, 3]]
+#Persons [id, lat, long]
+P = [[1, -25.2800, -57.6000],
+     [2, -25.3100, -57.5500],
+     [3, -26.0000, -56.5000]]
+
+def reference(a, b):
+    return distance.distance((a[1], a[2]), (b[1], b[2])).kilometers
+
+def establishment(j):
+    return E[int(C[j][4] - 1)]
+
+@pytest.mark.parametrize("mode, rtol", [(distancematrix.GEODESIC, 1e-9), (distancematrix.HAVERSINE, 0.006)])
+def test_lookups_match_geopy(mode, rtol):
+    distancematrix.init(E, C, P, mode=mode)
+    for j in range(len(C)):
+        for l in range(len(C)):
+            assert distancematrix.classes(j, l) == pytest.approx(reference(establishment(j), establishment(l)), rel=rtol, abs=1e-6)
+        for i in range(len(P)):
+            assert distancematrix.personClass(i, j) == pytest.approx(reference(P[i], establishment(j)), rel=rtol, abs=1e-6)
+
+@pytest.mark.parametrize("mode", [distancematrix.GEODESIC, distancematrix.HAVERSINE])
+def test_check_tolerance(mode):
+    distancematrix.init(E, C, P, mode=mode)
+    assert distancematrix.checkTolerance(E, C, P, samples=50) <= 0.006 * reference(E[0], E[3])
+
+def test_orders_are_sorted_by_distance():
+    distancematrix.init(E, C, P, mode=distancematrix.HAVERSINE)
+    for i in range(len(P)):
+        d = distancematrix.PE[i, distancematrix.personOrder(i)]
+        assert list(d) == sorted(d)
+    for k in range(len(distancematrix.EE)):
+        assert distancematrix.establishmentOrder(k)[0] == k
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        distancematrix.init(E, C, P, mode="euclidean")